@@ -0,0 +1,68 @@
+# benchmarks/bench_html_extract.py
+"""
+Extraction cost per article for the saved fixture pages.
+
+Compares the lxml fast path (processor.html_extract) with the BeautifulSoup
+walker of scrape_and_download and prints milliseconds per page:
+
+    python benchmarks/bench_html_extract.py [--runs 20] [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from processor.html_extract import extract_elements as extract_with_lxml  # noqa: E402
+from scrape_and_download import extract_elements as extract_with_soup  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "tests", "processor", "fixtures", "html")
+BASE_URL = "https://example.com/article"
+
+
+def measure(extractor, html, runs):
+    """Best-of-``runs`` time in milliseconds, or the error raised."""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            extractor(html, BASE_URL)
+        except RecursionError:
+            return "RecursionError"
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML extraction")
+    parser.add_argument("--runs", type=int, default=20, help="runs per page, the best is kept")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        results.append({
+            "page": os.path.basename(path),
+            "kb": round(len(html) / 1024, 1),
+            "lxml_ms": measure(extract_with_lxml, html, args.runs),
+            "soup_ms": measure(extract_with_soup, html, args.runs),
+        })
+
+    print(f"{'page':<24}{'KB':>8}{'lxml ms':>12}{'soup ms':>16}")
+    for row in results:
+        print(f"{row['page']:<24}{row['kb']:>8}{row['lxml_ms']:>12}{row['soup_ms']!s:>16}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
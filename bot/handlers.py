@@ -1,5 +1,5 @@
 # bot/handlers.py
-from config.db import get_accounts, add_account, remove_account
+from config.repositories import repositories
 from keyboards import account_list_keyboard, service_selection_keyboard
 import json
 
@@ -49,7 +49,7 @@ async def manage_accounts_entry(update, context) -> int:
     """Entry point for managing accounts."""
     query = update.callback_query
     await query.answer()
-    accounts = get_accounts(query.from_user.id)
+    accounts = await repositories.users.get_accounts(query.from_user.id)
     await query.edit_message_text(
         "Here are your current accounts:",
         reply_markup=account_list_keyboard(accounts)
@@ -78,7 +78,7 @@ async def add_account_service(update, context) -> int:
 async def add_account_credentials(update, context) -> int:
     """Save account credentials provided by the user."""
     creds = json.loads(update.message.text)
-    add_account(update.message.from_user.id, context.user_data['new_service'], creds)
+    await repositories.users.add_account(update.message.from_user.id, context.user_data['new_service'], creds)
     await update.message.reply_text("Account added!")
     return ConversationHandler.END
 
@@ -87,6 +87,6 @@ async def remove_account_choice(update, context) -> int:
     query = update.callback_query
     await query.answer()
     service, idx = query.data.split("|")  # callback_data="twitter|1"
-    remove_account(query.from_user.id, service, int(idx))
+    await repositories.users.remove_account(query.from_user.id, service, int(idx))
     await query.edit_message_text("Removed. Back to main menu.")
     return ConversationHandler.END
@@ -2,12 +2,10 @@
 # This adds support for our workflow types to the existing interface_beta3.py
 
 # Add these imports
-from processor.workflow_manager import WorkflowManager
+import asyncio
+from processor.workflow_manager import get_workflow_manager
 from datetime import datetime
 
-# Initialize the workflow manager
-workflow_manager = WorkflowManager()
-
 # Add these functions to your bot interface
 
 async def select_workflow_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -133,11 +131,12 @@ async def create_and_start_workflow(update: Update, context: ContextTypes.DEFAUL
     if state.get("type") == "history" and "start_date" in state:
         workflow_config["start_date"] = state["start_date"]
     
-    # Create the workflow
-    workflow_id = workflow_manager.create_workflow(workflow_config)
+    # Create the workflow (off the event loop: WorkflowManager is synchronous
+    # and its first use connects to MongoDB and primes the workflow cache)
+    workflow_id = await asyncio.to_thread(lambda: get_workflow_manager().create_workflow(workflow_config))
     
     # Start the workflow
-    success = workflow_manager.start_workflow(workflow_id)
+    success = await asyncio.to_thread(lambda: get_workflow_manager().start_workflow(workflow_id))
     
     if success:
         await query.edit_message_text(
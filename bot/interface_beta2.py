@@ -14,13 +14,7 @@ from telegram.ext import (
     ContextTypes,
 )
 from telegram.error import BadRequest
-from config.db import (
-    register_user,
-    get_accounts,
-    add_account,
-    remove_account,
-    get_workflows,
-)
+from config.repositories import repositories
 from keyboards import (
     account_list_keyboard,
     service_selection_keyboard,
@@ -64,7 +58,7 @@ logging.basicConfig(level=logging.INFO)
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /start: register user and show entry button."""
     user = update.effective_user
-    register_user(user.id, user.username)
+    await repositories.users.register(user.id, user.username)
     keyboard = [[InlineKeyboardButton("Start", callback_data=CB_START)]]
     await update.message.reply_text(
         "Welcome to the Reposting Bot! Tap Start to continue:",
@@ -338,7 +332,7 @@ async def repost_queue_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def manage_workflows_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
-    workflows = get_workflows(query.from_user.id)
+    workflows = await repositories.workflows.list_for_user(query.from_user.id)
     keyboard = workflow_list_keyboard(workflows)
     await query.edit_message_text(
         "Your Workflows:",
@@ -349,7 +343,7 @@ async def manage_workflows_cb(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def manage_accounts_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
-    accounts = get_accounts(query.from_user.id)
+    accounts = await repositories.users.get_accounts(query.from_user.id)
     keyboard = account_list_keyboard(accounts)
     await query.edit_message_text(
         "Here are your accounts:",
@@ -370,14 +364,14 @@ async def save_account_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await query.answer()
     service = query.data
     creds = {"placeholder": True}
-    add_account(query.from_user.id, service, creds)
+    await repositories.users.add_account(query.from_user.id, service, creds)
     await query.edit_message_text(f"Added {service} account.")
 
 async def remove_account_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
     service, idx = query.data.split("|")
-    remove_account(query.from_user.id, service, int(idx))
+    await repositories.users.remove_account(query.from_user.id, service, int(idx))
     await query.edit_message_text(f"Removed {service} account #{int(idx)+1}.")
 
 # --- Main Setup ---
@@ -5,6 +5,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
 from telegram import (
@@ -21,15 +22,9 @@ from telegram.ext import (
     ContextTypes,
 )
 from telegram.error import BadRequest
-from processor.workflow_manager import workflow_manager
-
-from config.db import (
-    register_user,
-    get_accounts,
-    add_account,
-    remove_account,
-    get_workflows,
-)
+from processor.workflow_manager import get_workflow_manager
+
+from config.repositories import repositories
 from keyboards import (
     account_list_keyboard,
     service_selection_keyboard,
@@ -71,7 +66,7 @@ logging.basicConfig(level=logging.INFO)
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /start: register user and show entry button."""
     user = update.effective_user
-    register_user(user.id, user.username)
+    await repositories.users.register(user.id, user.username)
     keyboard = [[InlineKeyboardButton("Start", callback_data=CB_START)]]
     await update.message.reply_text(
         "Welcome to the Reposting Bot! Tap Start to continue:",
@@ -254,8 +249,8 @@ async def handle_reposting_target(update: Update, context: ContextTypes.DEFAULT_
     duplicate_check = state.get("duplicate", False)
     mod_prompt = state.get("mod_prompt", "")
 
-    # Create workflow
-    workflow = workflow_manager.create_workflow(
+    # Create workflow (off the event loop, WorkflowManager is synchronous)
+    workflow = await asyncio.to_thread(lambda: get_workflow_manager().create_workflow(
         user_id=uid,
         sources=sources,
         filter_prompt=filter_prompt,
@@ -263,10 +258,10 @@ async def handle_reposting_target(update: Update, context: ContextTypes.DEFAULT_
         destinations=destinations,
         duplicate_check=duplicate_check,
         mod_prompt=mod_prompt,
-    )
+    ))
 
     # (Optional) Start it immediately
-    workflow_manager.start_workflow(workflow._id)
+    await asyncio.to_thread(lambda: get_workflow_manager().start_workflow(workflow._id))
 
     await query.edit_message_text(
         f"✅ Repost target: {target}\n\n"
@@ -280,7 +275,7 @@ async def handle_reposting_target(update: Update, context: ContextTypes.DEFAULT_
 async def manage_workflows_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
-    workflows = get_workflows(query.from_user.id)
+    workflows = await repositories.workflows.list_for_user(query.from_user.id)
     keyboard = workflow_list_keyboard(workflows)
     await query.edit_message_text(
         "Your Workflows:", reply_markup=InlineKeyboardMarkup(keyboard)
@@ -290,7 +285,7 @@ async def manage_workflows_cb(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def manage_accounts_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
-    accounts = get_accounts(query.from_user.id)
+    accounts = await repositories.users.get_accounts(query.from_user.id)
     keyboard = account_list_keyboard(accounts)
     await query.edit_message_text("Here are your accounts:", reply_markup=keyboard)
 
@@ -308,7 +303,7 @@ async def save_account_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     query = update.callback_query
     await query.answer()
     service = query.data
-    add_account(query.from_user.id, service, {"placeholder": True})
+    await repositories.users.add_account(query.from_user.id, service, {"placeholder": True})
     await query.edit_message_text(f"Added {service} account.")
 
 
@@ -316,7 +311,7 @@ async def remove_account_cb(update: Update, context: ContextTypes.DEFAULT_TYPE)
     query = update.callback_query
     await query.answer()
     service, idx = query.data.split("|")
-    remove_account(query.from_user.id, service, int(idx))
+    await repositories.users.remove_account(query.from_user.id, service, int(idx))
     await query.edit_message_text(f"Removed {service} account #{int(idx)+1}.")
 
 
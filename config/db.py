@@ -1,71 +1,42 @@
-from pymongo import MongoClient
+# config/db.py
+# Synchronous helpers kept for Flask and scripts. They run on the shared async
+# repositories (config/repositories.py); async code should await those directly.
 from dotenv import load_dotenv
-import os
+from pymongo import MongoClient
 import logging
 
 # Load environment variables
 load_dotenv()
 
+from config.repositories import DB_NAME, MONGO_URI, sync_repositories
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-try:
-    client = MongoClient(MONGO_URI)
-    db = client["social_manager"]
-    users = db["users"]
-    workflows_col = db["workflows"]  # Add workflows collection
-    logger.info("Connected to MongoDB successfully!")
-except Exception as e:
-    logger.error(f"Failed to connect to MongoDB: {e}")
-    raise
+# Blocking collections, kept for scripts that query them directly. The client
+# connects lazily, so importing this module does not wait for MongoDB.
+client = MongoClient(MONGO_URI)
+db = client[DB_NAME]
+users = db["users"]
+workflows_col = db["workflows"]
 
 # Helper functions
 def register_user(telegram_id, username):
-    if not users.find_one({"telegram_id": telegram_id}):
-        users.insert_one({
-            "telegram_id": telegram_id,
-            "username": username,
-            "plan": "free",
-            "accounts": {
-                "telegram": [],
-                "twitter": [],
-                "openai": []
-            }
-        })
+    sync_repositories.users.register(telegram_id, username)
 
 def get_accounts(telegram_id):
     """Retrieve accounts for a user."""
-    user = users.find_one({"telegram_id": telegram_id})
-    return user.get("accounts", {}) if user else {}
+    return sync_repositories.users.get_accounts(telegram_id)
 
 def add_account(telegram_id, service, account_data):
     """Add an account for a user."""
-    users.update_one(
-        {"telegram_id": telegram_id},
-        {"$push": {"accounts": {service: account_data}}},
-        upsert=True
-    )
+    sync_repositories.users.add_account(telegram_id, service, account_data)
 
 def remove_account(telegram_id, service, index):
     """Remove an account for a user."""
-    user = users.find_one({"telegram_id": telegram_id})
-    if user and "accounts" in user:
-        accounts = user["accounts"]
-        if service in accounts and len(accounts[service]) > index:
-            del accounts[service][index]
-            users.update_one({"telegram_id": telegram_id}, {"$set": {"accounts": accounts}})
+    sync_repositories.users.remove_account(telegram_id, service, index)
 
 def get_workflows(telegram_id: int) -> list:
     """Retrieve all workflows belonging to a specific user."""
-    docs = workflows_col.find({"telegram_id": telegram_id})
-    workflows = []
-    for doc in docs:
-        workflows.append({
-            "id": str(doc.get("_id")),
-            "name": doc.get("name", "<unnamed>"),
-            "status": doc.get("status", "unknown")
-        })
-    return workflows
\ No newline at end of file
+    return sync_repositories.workflows.list_for_user(telegram_id)
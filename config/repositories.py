@@ -0,0 +1,254 @@
+# config/repositories.py
+"""
+Async data-access layer on top of Motor.
+
+Bot handlers and workflow loops await the repositories directly, so database
+I/O never blocks the event loop. Flask and other synchronous callers use
+``SyncRepositories``, which runs the same repository code on a private
+background loop.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from datetime import datetime
+from typing import List, Optional
+
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("MONGO_DB_NAME", "social_manager")
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+
+
+class UserRepository:
+    def __init__(self, db):
+        self.collection = db["users"]
+
+    async def register(self, telegram_id: int, username: Optional[str]) -> None:
+        """Create the user document on first contact; a no-op afterwards."""
+        await self.collection.update_one(
+            {"telegram_id": telegram_id},
+            {"$setOnInsert": {
+                "telegram_id": telegram_id,
+                "username": username,
+                "plan": "free",
+                "accounts": {
+                    "telegram": [],
+                    "twitter": [],
+                    "openai": []
+                }
+            }},
+            upsert=True
+        )
+
+    async def get_accounts(self, telegram_id: int) -> dict:
+        """Retrieve accounts for a user."""
+        user = await self.collection.find_one({"telegram_id": telegram_id}, {"accounts": 1})
+        return user.get("accounts", {}) if user else {}
+
+    async def add_account(self, telegram_id: int, service: str, account_data: dict) -> None:
+        """Add an account for a user."""
+        await self.collection.update_one(
+            {"telegram_id": telegram_id},
+            {"$push": {f"accounts.{service}": account_data}},
+            upsert=True
+        )
+
+    async def remove_account(self, telegram_id: int, service: str, index: int) -> None:
+        """Remove an account for a user."""
+        user = await self.collection.find_one({"telegram_id": telegram_id}, {"accounts": 1})
+        if user and "accounts" in user:
+            accounts = user["accounts"]
+            if service in accounts and len(accounts[service]) > index:
+                del accounts[service][index]
+                await self.collection.update_one(
+                    {"telegram_id": telegram_id}, {"$set": {"accounts": accounts}}
+                )
+
+
+class WorkflowRepository:
+    def __init__(self, db):
+        self.collection = db["workflows"]
+
+    async def get(self, workflow_id: str) -> Optional[dict]:
+        """Get a workflow document by its ID."""
+        return await self.collection.find_one({"_id": ObjectId(workflow_id)})
+
+    async def list_for_user(self, telegram_id: int) -> List[dict]:
+        """Retrieve all workflows belonging to a specific user."""
+        cursor = self.collection.find(
+            {"telegram_id": telegram_id}, {"name": 1, "status": 1}
+        )
+        return [
+            {
+                "id": str(doc.get("_id")),
+                "name": doc.get("name", "<unnamed>"),
+                "status": doc.get("status", "unknown")
+            }
+            async for doc in cursor
+        ]
+
+    async def list_all(self) -> List[dict]:
+        """Retrieve every workflow document."""
+        return await self.collection.find().to_list(length=None)
+
+    async def set_status(self, workflow_id: str, status: str) -> None:
+        """Update the status of a workflow."""
+        await self.collection.update_one(
+            {"_id": ObjectId(workflow_id)},
+            {"$set": {"status": status, "updated_at": datetime.now()}}
+        )
+
+
+class MessageRepository:
+    """
+    Read access to ``workflow_messages``.
+
+    Records are written only by ``processor.message_logger.MessageLogger``,
+    which versions status transitions and maintains the hourly rollups.
+    """
+
+    def __init__(self, db):
+        self.collection = db["workflow_messages"]
+
+    async def recent(self, workflow_id: str, limit: int = 100) -> List[dict]:
+        """Most recent message records of a workflow, newest first."""
+        cursor = self.collection.find({"workflow_id": workflow_id}).sort("timestamp", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+
+class WatermarkRepository:
+    def __init__(self, db):
+        self.collection = db["instagram_watermarks"]
+
+    async def load_all(self) -> dict:
+        """Watermarks of every source, keyed by username."""
+        cursor = self.collection.find()
+        return {doc["_id"]: doc async for doc in cursor}
+
+    async def save(self, username: str, posts: int, stories: int, rate: Optional[float] = None) -> None:
+        """Advance the watermarks of a source; they never move backwards."""
+        update = {
+            "$max": {"posts": posts, "stories": stories},
+            "$set": {"updated_at": datetime.now()}
+        }
+        if rate is not None:
+            update["$set"]["rate"] = rate
+        await self.collection.update_one({"_id": username}, update, upsert=True)
+
+
+class TweetHistoryRepository:
+    def __init__(self, db):
+        self.collection = db["tweet_history"]
+
+    async def ensure_indexes(self) -> None:
+        """Index the records by creation time for ``recent``."""
+        await self.collection.create_index("created_at")
+
+    async def save(self, record: dict) -> None:
+        """Upsert the record of one generated tweet, keyed by its ``_id``."""
+        record = dict(record)
+        key = record.pop("_id")
+        await self.collection.update_one({"_id": key}, {"$set": record}, upsert=True)
+
+    async def recent(self, limit: int = 15) -> List[dict]:
+        """Most recent tweet records, newest first."""
+        cursor = self.collection.find().sort("created_at", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+
+class Repositories:
+    """
+    Entry point to the async repositories.
+
+    Motor clients are bound to the event loop they are first used on, so one
+    pooled client is kept per running loop.
+    """
+
+    def __init__(self, mongo_uri: str = MONGO_URI, db_name: str = DB_NAME):
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _db(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = AsyncIOMotorClient(
+                self.mongo_uri, maxPoolSize=MAX_POOL_SIZE, minPoolSize=MIN_POOL_SIZE
+            )
+            self._clients[loop] = client
+        return client[self.db_name]
+
+    @property
+    def users(self) -> UserRepository:
+        return UserRepository(self._db())
+
+    @property
+    def workflows(self) -> WorkflowRepository:
+        return WorkflowRepository(self._db())
+
+    @property
+    def messages(self) -> MessageRepository:
+        return MessageRepository(self._db())
+
+    @property
+    def watermarks(self) -> WatermarkRepository:
+        return WatermarkRepository(self._db())
+
+    @property
+    def tweet_history(self) -> TweetHistoryRepository:
+        return TweetHistoryRepository(self._db())
+
+
+class _SyncRepository:
+    """Blocking proxy for one repository of a ``SyncRepositories`` facade."""
+
+    def __init__(self, facade, name):
+        self._facade = facade
+        self._name = name
+
+    def __getattr__(self, method):
+        def call(*args, **kwargs):
+            async def run():
+                repository = getattr(self._facade.repositories, self._name)
+                return await getattr(repository, method)(*args, **kwargs)
+            return self._facade.run(run())
+        return call
+
+
+class SyncRepositories:
+    """
+    Synchronous facade for Flask and scripts.
+
+    Calls are executed on a private event loop running in a daemon thread, so
+    the same pooled Motor client serves every request thread.
+    """
+
+    def __init__(self, repositories: Optional[Repositories] = None):
+        self.repositories = repositories or Repositories()
+        self._loop = None
+        self._lock = threading.Lock()
+        self.users = _SyncRepository(self, "users")
+        self.workflows = _SyncRepository(self, "workflows")
+        self.messages = _SyncRepository(self, "messages")
+
+    def run(self, coroutine, timeout=30):
+        """Run a coroutine on the facade's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result(timeout)
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="sync-repositories", daemon=True
+                ).start()
+            return self._loop
+
+
+repositories = Repositories()
+sync_repositories = SyncRepositories(repositories)
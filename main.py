@@ -1,131 +1,150 @@
-from collections import defaultdict
 import asyncio
 import os
-import tweepy
-import openai
-from telethon import TelegramClient, events
-from telethon.tl.types import MessageMediaPhoto
-from telethon.sessions import StringSession
-import datetime
-import shutil
 import time
 import json
 import re
 from difflib import SequenceMatcher
 
-# Load API keys from environment variables
-API_KEY = os.getenv('TWITTER_API_KEY')
-API_SECRET_KEY = os.getenv('TWITTER_API_SECRET_KEY')
-BEARER_TOKEN = os.getenv('TWITTER_BEARER_TOKEN')
-ACCESS_TOKEN = os.getenv('TWITTER_ACCESS_TOKEN')
-ACCESS_TOKEN_SECRET = os.getenv('TWITTER_ACCESS_TOKEN_SECRET')
+from processor import metrics, tracing
+from processor.pipeline_context import (
+    FULL_INPUT_FILE, ORIGINAL_MESSAGE_FILE, TWEET_TEXT_FILE, PipelineContext
+)
 
+# Load API keys from environment variables (Twitter keys are read by TwitterPoster)
 API_ID = os.getenv('TELEGRAM_API_ID')
 API_HASH = os.getenv('TELEGRAM_API_HASH')
 SESSION_STRING = os.getenv('TELEGRAM_SESSION_STRING')
 
 # OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 OPENAI_API_KEY =os.getenv('OPENAI_API_KEY')
-openai.api_key = OPENAI_API_KEY
-
-# Authenticate with Twitter API v2 using Tweepy
-client_v2 = tweepy.Client(bearer_token=BEARER_TOKEN,
-                          consumer_key=API_KEY,
-                          consumer_secret=API_SECRET_KEY,
-                          access_token=ACCESS_TOKEN,
-                          access_token_secret=ACCESS_TOKEN_SECRET)
-
-# For v1.1 media upload
-auth = tweepy.OAuthHandler(API_KEY, API_SECRET_KEY)
-auth.set_access_token(ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
-api_v1 = tweepy.API(auth)
-
-# --- Make Telethon more resilient ---
-client = TelegramClient(
-    StringSession(SESSION_STRING),
-    API_ID,
-    API_HASH,
-    connection_retries=-1,  # unlimited retries
-    auto_reconnect=True
-)
 
+# Also record every generated tweet in the MongoDB tweet_history collection
+TWEET_HISTORY_STORE = os.getenv('TWEET_HISTORY_STORE', '').lower() in ('1', 'true', 'yes', 'mongo')
+CLASSIFICATION_LOG = "classification_feedback.json"
+
+# Telegram channel the generated posts are mirrored to
+TELEGRAM_REPOST_CHANNEL = os.getenv('TELEGRAM_REPOST_CHANNEL', '@tradeducky')
+
+SOURCE_CHATS = ['@forklog','@unfolded','@unfolded_defi', '@decenter', '@tradeduckydemo', '@cryptoquant_official',"@cryptodaily","@glassnode",
+                "@crypto02eth","@RBCCrypto","@crypto_headlines","@decryptnews","@incrypted"]
+
+# API clients are built by build_clients() when the bot starts, so importing
+# this module needs neither credentials nor the heavy client libraries.
+client = None
+router = None  # SinkRouter publishing to Twitter and the Telegram repost channel
+downloads = None  # DownloadManager bounding concurrent media downloads
+image_analyzer = None  # ImageAnalyzer with the image analysis cache
+tweet_history = None  # TweetHistoryRepository, when TWEET_HISTORY_STORE is set
+albums = None  # AlbumAggregator queueing complete albums for processing
+tweet_pipeline = None  # Pipeline built from the tweet_generation preset
+
+# Message groups generated at once
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '2'))
+
+
+def get_openai():
+    """The openai module, imported and configured on first use."""
+    import openai
+    openai.api_key = OPENAI_API_KEY
+    return openai
+
+
+def get_downloads():
+    """The DownloadManager shared by all message groups, created on first use."""
+    global downloads
+    if downloads is None:
+        from processor.download_manager import DownloadManager
+        downloads = DownloadManager()
+    return downloads
+
+
+def get_albums():
+    """The AlbumAggregator fed by the message handler, created on first use."""
+    global albums
+    if albums is None:
+        from processor.album_aggregator import AlbumAggregator
+        albums = AlbumAggregator()
+    return albums
+
+
+async def get_tweet_history():
+    """The indexed tweet history store, or None when it is disabled."""
+    global tweet_history
+    if tweet_history is None and TWEET_HISTORY_STORE:
+        from config.repositories import Repositories
+        repository = Repositories().tweet_history
+        try:
+            await repository.ensure_indexes()
+        except Exception as e:
+            print(f"Tweet history store unavailable: {e}")
+            return None
+        tweet_history = repository
+    return tweet_history
+
+
+def append_classification_log(record):
+    with open(CLASSIFICATION_LOG, "a", encoding="utf-8") as log_file:
+        log_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def build_clients():
+    """Create the Telegram client, the destination router and register the message handler."""
+    global client, router
+    from telethon import TelegramClient, events
+    from telethon.sessions import StringSession
+    from processor.sinks import SinkRouter, TelegramSink, TwitterSink
+    from processor.twitter_utils import TwitterPoster
+
+    # --- Make Telethon more resilient ---
+    client = TelegramClient(
+        StringSession(SESSION_STRING),
+        API_ID,
+        API_HASH,
+        connection_retries=-1,  # unlimited retries
+        auto_reconnect=True
+    )
+    client.add_event_handler(handler, events.NewMessage(chats=SOURCE_CHATS))
+
+    sinks = [TwitterSink(TwitterPoster())]
+    if TELEGRAM_REPOST_CHANNEL:
+        sinks.append(TelegramSink(client, TELEGRAM_REPOST_CHANNEL, parse_mode=None))
+    router = SinkRouter(sinks)
+    return client
 
-# Global dictionaries and sets for grouping messages
-grouped_media = defaultdict(list)  # grouped by grouped_id
-group_processing = set()           # groups currently being processed
 
-@client.on(events.NewMessage(chats=['@forklog','@unfolded','@unfolded_defi', '@decenter', '@tradeduckydemo', '@cryptoquant_official',"@cryptodaily","@glassnode",
-                                     "@crypto02eth","@RBCCrypto","@crypto_headlines","@decryptnews","@incrypted"]))
 async def handler(event):
     print("\n------------------------------STEP_0_event initiated------------------------------\n")
     message = event.message
-    grouped_id = getattr(message, "grouped_id", None)
     print("\n------------------------------STEP_1_recieving_message------------------------------\n")
-    if grouped_id:
-        # Add message to its group
-        print("\n------------------------------STEP_1_1_recieving_grouped_message------------------------------\n")
-        grouped_media[grouped_id].append(message)
-        if grouped_id not in group_processing:
-            # grouped_id = f"single_{timestamp_str}" # EXPIEREMENTAL LINE TO NORMALIZE FOLDER NAMES
-            group_processing.add(grouped_id)
-            await process_group_id(grouped_id)
-    else:
-        # For a single message create a unique grouped_id
-        print("\n------------------------------STEP_1_2_recieving_single_message------------------------------\n")
-        # For a single message create a unique grouped_id
-        timestamp_str = datetime.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        grouped_id = f"single_{timestamp_str}"
-        grouped_media[grouped_id].append(message)
-        if grouped_id not in group_processing:
-            print("\n------------------------------STEP_1_2_2")
-            group_processing.add(grouped_id)
-            print("\n------------------------------STEP_1_2_3")
-            await process_group_id(grouped_id)
-
-async def process_group_id(grouped_id):
-    messages = grouped_media[grouped_id]
-    earliest_message = min(messages, key=lambda msg: msg.date)
+    # Album parts are held until the album is complete; single messages are queued at once
+    key = await get_albums().add(message)
+    print(f"\n------------------------------STEP_1_1_message {message.id} added to group {key}------------------------------\n")
+
+async def process_album(album):
+    await process_group_id(album.key, album.messages)
+
+async def process_group_id(grouped_id, messages):
     print(f"\n------------------------------STEP_2_0_processing group {grouped_id} with {len(messages)} messages------------------------------\n")
 
     # Create a directory for this tweet’s data
-    dir_name = f"tweet_history/{grouped_id}" #group Id for multiple files is abitratry number while for sinlg messages its dates
+    dir_name = f"tweet_history/{grouped_id}" # album_<chat>_<grouped_id> or single_<chat>_<message id>
     if not os.path.exists(dir_name):
         os.makedirs(dir_name)
 
-    media_paths = []
-    text = earliest_message.text if earliest_message.text else ""
-
-    # Download media files for all messages in the group
-    for idx, msg in enumerate(messages):
-        if msg.media:
-            try:
-                print(f"\n------------------------------STEP_2_1_Downloading media for message ID {msg.id}------------------------------\n")
-                media = await msg.download_media()
-                if media:
-                    file_ext = os.path.splitext(media)[1]
-                    new_filename = f"{grouped_id}_{idx}{file_ext}"
-                    new_path = os.path.join(dir_name, new_filename)
-                    shutil.move(media, new_path)
-                    media_paths.append(new_path)
-                    print(f"\n------------------------------STEP_2_2_Media downloaded and moved to: {new_path}------------------------------\n")
-                else:
-                    print("\n------------------------------STEP_2_2_Media download returned None i.e media==False ------------------------------\n")
-            except Exception as e:
-                print(f"\n------------------------------STEP_2_1_Error downloading media for message ID {msg.id}: {e}------------------------------\n")
-
-    # Save the original text
-    text_file_path = os.path.join(dir_name, "original_message.txt")
-    with open(text_file_path, "w", encoding="utf-8") as f:
-        f.write(text)
-    print(f"\n------------------------------STEP_3_0_Original tweet text saved to {text_file_path}\nORIGINAL MESSAGE TEXT: {text}------------------------------\n")
-
-    # Process the group: generate tweet, analyze media/links, and post tweet
-    await generate_and_post_tweet(text, media_paths, dir_name)
-    print(f"\n------------------------------STEP_5_0_Tweet posted saved to {text_file_path}\nORIGINAL MESSAGE TEXT: {text}------------------------------\n")
-
-    # Cleanup the processed group
-    del grouped_media[grouped_id]
-    group_processing.remove(grouped_id)
+    # The caption of an album may sit on any of its parts
+    text = next((msg.text for msg in sorted(messages, key=lambda msg: msg.date) if msg.text), "")
+    context = PipelineContext(grouped_id, text, dir_name=dir_name, history=await get_tweet_history(), messages=messages)
+    # Saved in the background; the duplicate check waits for it
+    context.persist(ORIGINAL_MESSAGE_FILE, text)
+
+    # Process the group: download media, analyze media/links, generate and post the tweet.
+    # One trace covers the pipeline and the history write.
+    with tracing.message_span(grouped_id, workflow="tweet_generation"):
+        try:
+            await generate_and_post_tweet(context)
+        finally:
+            await context.save()
+    print(f"\n------------------------------STEP_5_0_Tweet processed for {dir_name}\nORIGINAL MESSAGE TEXT: {text}------------------------------\n")
 
 ###############################
 # URL and Media Analysis Helpers
@@ -138,54 +157,74 @@ def analyze_twitter_link(link):
     """
     return f"Analysis for Twitter link {link}: [Placeholder analysis output]"
 
-def analyze_website(url):
+async def analyze_website(url, context):
     """
-    Placeholder: Analyze a website link.
-    TODO: Replace with actual implementation.
+    Scrape a website link into text with media placeholders.
+    Uses the shared async scraper, so links are fetched concurrently with
+    pooled connections, timeouts and a page cache. Media files the text
+    points to are held by the context until the message is done.
     """
     try:
-        from scrape_and_download import scrape_and_download
-        return scrape_and_download(url)
+        from processor.web_scraper import get_scraper
+        text, media = await get_scraper().scrape(url)
     except Exception as e:
         print(f"Error analyzing website {url}: {e}")
         return f"Error analyzing website {url}: {e}"
+    context.link_media.extend(media)
+    return text
+
+async def analyze_link(url, context):
+    """Analyze one link found in a message."""
+    if "twitter.com" in url.lower():
+        return analyze_twitter_link(url)
+    return await analyze_website(url, context)
+
+IMAGE_PROMPT = ("Analyze an image for the iinformation that can be used in tweet post that descirbe this image. "
+                "If any Cyrillic (Russian) characters are detected in the result prefix the analysis with 'RUSSSIAN:' ")
 
-def analyze_image(image_path):
+
+def get_image_analyzer():
+    """The ImageAnalyzer shared by all messages (and its cache), created on first use."""
+    global image_analyzer
+    if image_analyzer is None:
+        from processor.vision import ImageAnalyzer
+        image_analyzer = ImageAnalyzer(prompt=IMAGE_PROMPT)
+    return image_analyzer
+
+async def analyze_image(image_path):
     """
     Analyze an image. If any Cyrillic (Russian) characters are detected in the result,
     prefix the analysis with 'RUSSSIAN:'.
+    Images are downscaled before upload and analyses are cached, so the same
+    picture reposted by several channels is analyzed once.
     """
-    import base64
-    def encode_image(image_path):
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
-
-    base64_image = encode_image(image_path)
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Analyze an image for the iinformation that can be used in tweet post that descirbe this image. If any Cyrillic (Russian) characters are detected in the result prefix the analysis with 'RUSSSIAN:' "},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
-                    ],
-                }
-            ],
-        )
-        analysis = response.choices[0].message.content
+        analysis = await get_image_analyzer().analyze(image_path)
     except Exception as e:
         analysis = f"Error analyzing image: {e}"
     
     # If any Cyrillic letters are found, add the 'RUSSSIAN:' prefix.
-    if re.search(r'[\u0400-\u04FF]', analysis):
+    if re.search(r'[\u0400-\u04FF]', analysis) and not analysis.startswith("RUSSSIAN:"):
         analysis = "RUSSSIAN: " + analysis
 
     filename = os.path.basename(image_path)
     print(f"\n-----------Analysis for media file {filename}: {analysis}")
     return analysis
 
+async def analyze_media(media):
+    """Analyze one attached media file according to its type."""
+    import mimetypes
+    mime_type, _ = mimetypes.guess_type(media)
+    if mime_type:
+        if mime_type.startswith("image/"):
+            return await analyze_image(media)
+        if mime_type.startswith("audio/"):
+            return analyze_audi(media)
+        return (f"Media file {os.path.basename(media)} of type '{mime_type}' "
+                f"is attached and will be reposted with the processed text.")
+    return (f"Media file {os.path.basename(media)} (unknown type) "
+            f"is attached and will be reposted with the processed text.")
+
 def analyze_audi(audio_path):
     """
     Placeholder: Analyze an audio file.
@@ -200,7 +239,7 @@ import os
 import re
 # (Assuming OpenAI is already imported above)
 
-def fetch_recent_tweet_history(history_dir="tweet_history", limit=15):
+def fetch_recent_tweet_history(history_dir="tweet_history", limit=15, exclude=None):
     """
     Scans the tweet_history folder for subdirectories that contain an 'original_message.txt' file.
     For each folder, it reads the original message and gathers associated media file details (file extension and file size)
@@ -211,7 +250,9 @@ def fetch_recent_tweet_history(history_dir="tweet_history", limit=15):
       - 'media_info': a list of dictionaries, one per associated media file.
     
     The list is sorted by the modification time of original_message.txt (most recent first)
-    and only the latest 'limit' entries are returned.
+    and only the latest 'limit' entries are returned. The folder named 'exclude' (the one of
+    the message being checked) is skipped; other messages may be in progress concurrently,
+    so the newest folder is not necessarily the current one.
     """
     tweet_entries = []
     if not os.path.exists(history_dir):
@@ -220,6 +261,8 @@ def fetch_recent_tweet_history(history_dir="tweet_history", limit=15):
     # Iterate over each subdirectory in tweet_history.
     for folder in os.listdir(history_dir):
         folder_path = os.path.join(history_dir, folder)
+        if folder == exclude:
+            continue
         if os.path.isdir(folder_path):
             original_file = os.path.join(folder_path, "original_message.txt")
             if os.path.exists(original_file):
@@ -250,7 +293,7 @@ def fetch_recent_tweet_history(history_dir="tweet_history", limit=15):
     tweet_entries.sort(key=lambda x: x[0], reverse=True)
     
     # Return only the latest 'limit' entries (extract only the dictionary part)
-    recent_tweets = [entry for mtime, entry in tweet_entries[1:limit+1]]
+    recent_tweets = [entry for mtime, entry in tweet_entries[:limit]]
     return recent_tweets
 
 def normalized_media_info(media_info):
@@ -307,7 +350,7 @@ def format_media_info(media_info):
         )
     return ", ".join(formatted_items)
 
-def is_duplicate_tweet(current_message, current_media_info):
+def is_duplicate_tweet(current_message, current_media_info, current_dir=None):
     """
     Compares the current original message (and its associated media file details)
     with each of the last 15 original messages stored in tweet_history.
@@ -320,8 +363,11 @@ def is_duplicate_tweet(current_message, current_media_info):
     of the new message as well as the details of all 15 past messages. It then calls ChatGPT one time
     to decide whether the new message is semantically similar to any of the past messages.
     If ChatGPT returns "Yes", this function returns True.
+
+    'current_dir' is the history folder of the current message, left out of the comparison.
     """
-    recent_entries = fetch_recent_tweet_history(limit=7)
+    exclude = os.path.basename(os.path.normpath(current_dir)) if current_dir else None
+    recent_entries = fetch_recent_tweet_history(limit=7, exclude=exclude)
     if not recent_entries:
         # No previous history to compare against.
         return False
@@ -354,15 +400,18 @@ def is_duplicate_tweet(current_message, current_media_info):
         "(in terms of file type and file size). Answer only with 'Yes' if the new message is a duplicate, or 'No' otherwise. And also give me the text of the message that you think was similar pretexting it with 'DUBLICATE FOUND MESSGAGE' IN THE END followed by the message"
     )
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o-2024-11-20",
-            messages=[
-                {"role": "system", "content": "You are an assistant that compares messages for duplication."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000,
-            temperature=0  # to favor deterministic output
-        )
+        with tracing.llm_span("duplicate_check", "openai", "gpt-4o-2024-11-20") as span:
+            response = get_openai().chat.completions.create(
+                model="gpt-4o-2024-11-20",
+                messages=[
+                    {"role": "system", "content": "You are an assistant that compares messages for duplication."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=1000,
+                temperature=0  # to favor deterministic output
+            )
+            tracing.record_usage(span, getattr(response, "usage", None))
+        metrics.count_tokens("openai", "gpt-4o-2024-11-20", getattr(response, "usage", None))
         print('Response :',response.choices[0].message)
         answer = response.choices[0].message.content.strip().lower()
         print(f"ChatGPT overall comparison result: {answer}")
@@ -373,113 +422,58 @@ def is_duplicate_tweet(current_message, current_media_info):
     
     return False
 
-###############################
-# New Function: Post to Telegram Channel
-###############################
-
-async def post_to_telegram_channel(text, media_paths, channel_username):
-    """
-    Posts the given text (and optionally media) to the specified Telegram channel.
-    The channel_username is the channel's username (e.g. "@mychannel").
-    """
-    try:
-        if media_paths:
-            await client.send_file(channel_username, media_paths, caption=text)
-        else:
-            await client.send_message(channel_username, text)
-        print(f"Posted to Telegram channel: {channel_username}")
-    except Exception as e:
-        print(f"Error posting to Telegram channel {channel_username}: {e}")
-
 ###############################
 # Main Function: Generate and Post Tweet
 ###############################
 
-async def generate_and_post_tweet(text, media_paths, dir_name):
-    """
-    Aggregates data, generates tweet content with GPT, checks for duplicate content,
-    filters out promotional or where Russian language in in the media file description but posts in russina are ok you identify the posts by the prefix 'RUSSSIAN' posts in the imge descirpions, and then posts the tweet (and optionally posts to Telegram).
-    """
+async def analyze_stage(context):
+    """Analyze the media and links of the message into the context."""
+    text, media_paths, dir_name = context.text, context.media_paths, context.dir_name
 
     print(f"\n------------------------------STEP_4_0_Beginning generation and posting of the tweet------------------------------\nORIGINAL MESSAGE TEXT: {text}\nMEDIA PATHS : {media_paths}\n DIRECTORY : {dir_name}")
 
-
-    # 1. Write aggregated data into a full-input file.
-    print(f"\n------------------------------STEP_4_1_Creating full_input_to_gpt.txt file and saving it to the {dir_name}------------------------------\n")
-    full_input_path = os.path.join(dir_name, "full_input_to_gpt.txt")
-    with open(full_input_path, "w", encoding="utf-8") as full_input_file:
-        # Append the original message.
-        original_message_file = os.path.join(dir_name, "original_message.txt")
-        if os.path.exists(original_message_file):
-            with open(original_message_file, "r", encoding="utf-8") as orig_file:
-                original_content = orig_file.read()
-            full_input_file.write("----- Original Message -----\n")
-            full_input_file.write(original_content)
-            full_input_file.write("\n----- End of Original Message -----\n\n")
-        else:
-            full_input_file.write("Original message file not found.\n\n")
-            original_content = text
-
-        # 2. Process attached media files.
-        print(f'\nMEDIA PATHS: {media_paths}')
-        if media_paths:
-            import mimetypes
-            for media in media_paths:
-                mime_type, _ = mimetypes.guess_type(media)
-                if mime_type:
-                    if mime_type.startswith("image/"):
-                        media_analysis = analyze_image(media)
-                    elif mime_type.startswith("audio/"):
-                        media_analysis = analyze_audi(media)
-                    else:
-                        media_analysis = (f"Media file {os.path.basename(media)} of type '{mime_type}' "
-                                          f"is attached and will be reposted with the processed text.")
-                else:
-                    media_analysis = (f"Media file {os.path.basename(media)} (unknown type) "
-                                      f"is attached and will be reposted with the processed text.")
-                print(f"----------MEDIA ANALYSIS: {media_analysis}")
-                full_input_file.write(f"\n----- Analysis for media file: {os.path.basename(media)} -----\n")
-                full_input_file.write(media_analysis)
-                full_input_file.write(f"\n----- End of analysis for media file: {os.path.basename(media)} -----\n")
-        else:
-            full_input_file.write("\nNo media files attached.\n")
-        
-        # 3. Find and process URLs in the original message.
-        urls = re.findall(r'(https?://\S+)', original_content)
-        ignored_substrings = [
-            "t.me",             # e.g. Telegram links
-            "bybit.com/register",
-            "okx.com/join",
-            "t.co"
-        ]
-        if urls:
-            for url in urls:
-                if any(ignore in url.lower() for ignore in ignored_substrings):
-                    print(f"Ignoring URL: {url}")
-                    continue
-                try:
-                    if "twitter.com" in url.lower():
-                        link_analysis = analyze_twitter_link(url)
-                    else:
-                        link_analysis = analyze_website(url)
-                    full_input_file.write(f"\n----- Analysis for link: {url} -----\n")
-                    full_input_file.write(link_analysis)
-                    full_input_file.write(f"\n----- End of analysis for link: {url} -----\n")
-                except Exception as e:
-                    print(f"Error analyzing URL {url}: {e}")
-                    continue
-        else:
-            full_input_file.write("\nNo URLs found in the original message.\n")
-            
-    print(f"\n------------------------------STEP_4_1_Creating full_input_to_gpt.txt file and saving it to the {dir_name}------------------------------\n")
-    # Read the aggregated content.
-    with open(full_input_path, "r", encoding="utf-8") as f:
-        aggregated_content = f.read()
-    
-    print("AGGREGATED CONTENT:", aggregated_content)
-    print("TEXT:", text, "\nMEDIA PATHS:", media_paths, "\nDIR NAME:", dir_name)
-
-    # 4. Generate tweet content using OpenAI.
+    # 1. Aggregate the original message and the analyses in memory.
+    print(f"\n------------------------------STEP_4_1_Aggregating the input to GPT for {dir_name}------------------------------\n")
+
+    # 2. Process attached media files.
+    print(f'\nMEDIA PATHS: {media_paths}')
+    if media_paths:
+        # All media of an album is analyzed at once
+        media_analyses = await asyncio.gather(*(analyze_media(media) for media in media_paths))
+        for media, media_analysis in zip(media_paths, media_analyses):
+            print(f"----------MEDIA ANALYSIS: {media_analysis}")
+            context.add_media_analysis(media, media_analysis)
+
+    # 3. Find and process URLs in the original message.
+    urls = re.findall(r'(https?://\S+)', text)
+    ignored_substrings = [
+        "t.me",             # e.g. Telegram links
+        "bybit.com/register",
+        "okx.com/join",
+        "t.co"
+    ]
+    if urls:
+        links = []
+        for url in dict.fromkeys(urls):
+            if any(ignore in url.lower() for ignore in ignored_substrings):
+                print(f"Ignoring URL: {url}")
+                continue
+            links.append(url)
+        # Analyze all links at once; the slowest link bounds the wait
+        analyses = await asyncio.gather(*(analyze_link(url, context) for url in links), return_exceptions=True)
+        for url, link_analysis in zip(links, analyses):
+            if isinstance(link_analysis, Exception):
+                print(f"Error analyzing URL {url}: {link_analysis}")
+                continue
+            context.add_link_analysis(url, link_analysis)
+
+    context.persist(FULL_INPUT_FILE, context.aggregated_content())
+    print("AGGREGATED CONTENT:", context.aggregated_content())
+
+
+async def generate_stage(context):
+    """Generate the tweet text from the aggregated content with OpenAI."""
+    aggregated_content = context.aggregated_content()
     prompt_text = (
         "Rewrite the following content to make it suitable for a Twitter post. "
         "Note that the text given to you is the Original Message.However details that might help in the creating of the tweet can be found in sections that decribed images or urls "
@@ -487,34 +481,43 @@ async def generate_and_post_tweet(text, media_paths, dir_name):
         "such as '@forklog', '@decenter', '@tradeducky', '@cryptoquant_official'. "
         "Translate to English if necessary. If no content is provided, suggest a tweet that complements the attached media. "
         "Avoid putting quotation marks around tweet text or mentioning technical aspects.\n\n"
-        f"Content: {text}"
+        f"Content: {aggregated_content}"
     )
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o-2024-11-20",  # or another model as needed
-            messages=[
-                {"role": "system", "content": "You are a Twitter blogger creating concise, engaging tweets. Be cool and not overly excited."},
-                {"role": "user", "content": prompt_text}
-            ],
-            max_tokens=900 # What max toke number influences it
-        )
-        tweet_text = response.choices[0].message.content.strip()
+        # The OpenAI client blocks; keep it off the event loop
+        with tracing.llm_span("generate", "openai", "gpt-4o-2024-11-20") as span:
+            response = await asyncio.to_thread(
+                get_openai().chat.completions.create,
+                model="gpt-4o-2024-11-20",  # or another model as needed
+                messages=[
+                    {"role": "system", "content": "You are a Twitter blogger creating concise, engaging tweets. Be cool and not overly excited."},
+                    {"role": "user", "content": prompt_text}
+                ],
+                max_tokens=900 # What max toke number influences it
+            )
+            tracing.record_usage(span, getattr(response, "usage", None))
+        metrics.count_tokens("openai", "gpt-4o-2024-11-20", getattr(response, "usage", None))
+        tweet_text = (response.choices[0].message.content or "").strip()
         print(f"Generated tweet content: {tweet_text}")
     except Exception as e:
+        # Raising marks the message as an error; an empty tweet_text would
+        # make the post stage fall back to the raw source text
         print(f"Error generating text with OpenAI GPT: {e}")
-        tweet_text = ""
+        raise
+    if not tweet_text:
+        raise ValueError("OpenAI returned an empty tweet")
 
     # Save the generated tweet text.
-    tweet_text_file = os.path.join(dir_name, "tweet_text.txt")
-    with open(tweet_text_file, "w", encoding="utf-8") as f:
-        f.write(tweet_text)
-    print(f"Tweet text saved to {tweet_text_file}")
-
-    ###############################
-    # 5. Filter out unwanted posts:
-    #    (a) Use OpenAI’s filter with an updated prompt to also check for Russian content.
-    #    (b) Additionally, perform a manual check below.
-    ###############################
+    context.tweet_text = tweet_text
+    context.persist(TWEET_TEXT_FILE, tweet_text)
+
+
+async def classify_stage(context):
+    """
+    Filter out promotional tweets and Russian content with OpenAI; the message
+    is dropped unless the filter answers 'no'.
+    """
+    tweet_text = context.tweet_text
     filter_prompt = (
         "Is the following tweet promotional or does it contain prefix 'RUSSSIAN'? "
         "If the tweet is promotional or contains the Russian prefix text (i.e. any Cyrillic characters), respond with 'Yes'. Otherwise, respond with 'No'.\n\n"
@@ -522,19 +525,24 @@ async def generate_and_post_tweet(text, media_paths, dir_name):
         f"Tweet: {tweet_text}"
     )
     try:
-        filter_response = openai.chat.completions.create(
-            model="gpt-4o-2024-11-20",
-            messages=[
-                {"role": "system", "content": "You are a filter system for identifying content not suitable for posting on this Twitter account."},
-                {"role": "user", "content": filter_prompt}
-            ],
-            max_tokens=10
-        )
+        with tracing.llm_span("classify", "openai", "gpt-4o-2024-11-20") as span:
+            filter_response = await asyncio.to_thread(
+                get_openai().chat.completions.create,
+                model="gpt-4o-2024-11-20",
+                messages=[
+                    {"role": "system", "content": "You are a filter system for identifying content not suitable for posting on this Twitter account."},
+                    {"role": "user", "content": filter_prompt}
+                ],
+                max_tokens=10
+            )
+            tracing.record_usage(span, getattr(filter_response, "usage", None))
+        metrics.count_tokens("openai", "gpt-4o-2024-11-20", getattr(filter_response, "usage", None))
         filter_result = filter_response.choices[0].message.content.strip().lower()
         print(f"Filter response: {filter_result}")
     except Exception as e:
         print(f"Error filtering tweet with OpenAI GPT: {e}")
         filter_result = "yes"  # default to 'yes' to avoid posting problematic content
+    context.filter_result = filter_result
 
     # Log the classification for later review.
     classification_log = {
@@ -543,69 +551,99 @@ async def generate_and_post_tweet(text, media_paths, dir_name):
         "actual_posted": (filter_result == "no"),
         "manual_feedback": None
     }
-    feedback_file = "classification_feedback.json"
     try:
-        with open(feedback_file, "a", encoding="utf-8") as log_file:
-            log_file.write(json.dumps(classification_log, ensure_ascii=False) + "\n")
+        await asyncio.to_thread(append_classification_log, classification_log)
         print(f"Classification log saved: {classification_log}")
     except Exception as e:
         print(f"Error saving classification log: {e}")
 
+    if filter_result != "no":
+        print("Tweet is either promotional or contains Russian content. It will not be posted.")
+        return False
+    print("Tweet passed filtering. Proceeding to post.")
 
-    # 6. Check for duplicate tweets.
-    # Build a list of current media file details in the same format as expected.
-    current_media_details = []
-    for media in media_paths:
-        file_ext = os.path.splitext(media)[1]
-        file_size = os.path.getsize(media)
-        current_media_details.append({
-            "file_extension": file_ext,
-            "file_size": file_size
-        })
-    
-    if is_duplicate_tweet(text, current_media_details):
+
+async def history_dedup_stage(context):
+    """Drop tweets similar to the recent tweet_history entries."""
+    # The history is read from disk, so the artifacts of this message must be written first.
+    await context.flush()
+    if await asyncio.to_thread(is_duplicate_tweet, context.text, context.media_details(), context.dir_name):
         print("Tweet is similar to one of the last 15 messages. Skipping posting to avoid duplicates.")
-        return
-
-    # 7. Post the tweet only if it passed the filter.
-    if filter_result == "no":
-        print("Tweet passed filtering. Proceeding to post.")
-        # Upload media if available.
-        media_ids = []
-        for path in media_paths:
-            try:
-                media = api_v1.media_upload(path)
-                media_ids.append(media.media_id)
-                print(f"Media uploaded: {media.media_id}")
-            except Exception as e:
-                print(f"Error uploading media: {e}")
-        try:
-            if media_ids:
-                response = client_v2.create_tweet(text=tweet_text, media_ids=media_ids)
-                print(f"Tweet with media posted: {response}")
-            else:
-                response = client_v2.create_tweet(text=tweet_text)
-                print(f"Tweet posted: {response}")
-        except Exception as e:
-            print(f"Error posting tweet: {e}")
-
-
-        # Optionally, also post to a Telegram channel.
-        # For example, to post to a channel with username '@mychannel', uncomment the next line:
-        # --- Repost to Telegram Channel ---
-        telegram_channel = "@tradeducky" # e.g., "@mychannel"
-        if telegram_channel:
-            await post_to_telegram_channel(tweet_text, media_paths, telegram_channel)
-        else:
-            print("No Telegram channel username defined in environment variables.")
-    else:
-        print("Tweet is either promotional or contains Russian content. It will not be posted.")
+        context.log["filter_reason"] = "duplicate"
+        return False
+
+
+def build_tweet_pipeline():
+    """
+    The tweet_generation pipeline: download -> analyze -> generate -> classify
+    -> history_dedup -> post. Twitter and the Telegram repost channel are
+    published to concurrently by the router.
+    """
+    from processor.pipeline import Stage
+    from processor.pipeline_presets import build_pipeline
+
+    async def download_stage(context):
+        # Media is kept next to the message; the duplicate check compares it
+        print(f"\n------------------------------STEP_2_1_Downloading media for {len(context.messages)} messages------------------------------\n")
+        context.media_paths = await get_downloads().download_all(
+            context.messages,
+            files=[os.path.join(context.dir_name, f"{context.key}_{idx}") for idx in range(len(context.messages))]
+        )
+        print(f"\n------------------------------STEP_2_2_Media downloaded to: {context.media_paths}------------------------------\n")
+
+    return build_pipeline("tweet_generation", {}, {"router": router}, factories={
+        "download": lambda config, services: Stage("download", download_stage, provider="telegram"),
+        "analyze": lambda config, services: Stage("analyze", analyze_stage),
+        "generate": lambda config, services: Stage(
+            "generate", generate_stage, concurrency=PIPELINE_WORKERS, provider="openai"
+        ),
+        "classify": lambda config, services: Stage("classify", classify_stage, provider="openai"),
+        # The history check compares against the messages processed before, one at a time
+        "history_dedup": lambda config, services: Stage("history_dedup", history_dedup_stage, concurrency=1),
+    })
+
+
+def get_tweet_pipeline():
+    """The tweet_generation pipeline, built once the router exists."""
+    global tweet_pipeline
+    if tweet_pipeline is None:
+        tweet_pipeline = build_tweet_pipeline()
+    return tweet_pipeline
+
+
+async def generate_and_post_tweet(context):
+    """
+    Aggregates data, generates tweet content with GPT, checks for duplicate content,
+    filters out promotional or where Russian language in in the media file description but posts in russina are ok you identify the posts by the prefix 'RUSSSIAN' posts in the imge descirpions, and then posts the tweet (and optionally posts to Telegram).
+
+    Args:
+        context (PipelineContext): The message; every stage adds its results to it.
+
+    Returns:
+        str: The final status of the message.
+    """
+    try:
+        status = await get_tweet_pipeline().process(context)
+    finally:
+        if context.link_media:
+            from processor.web_scraper import get_scraper
+            await get_scraper().release(context.link_media)
+    for destination in context.posted_to:
+        print(f"Posted to {destination}")
+    if context.log.get("error"):
+        print(f"Error posting: {context.log['error']}")
+    return status
 
 async def main_runner():
     """
     Continuously run the Telegram client. If disconnected or certain exceptions occur,
     wait a bit and then restart.
     """
+    if client is None:
+        build_clients()
+    metrics.start_exporter()  # only when METRICS_PORT is set
+    # Complete albums are processed by a fixed number of workers (kept referenced while running)
+    workers = asyncio.create_task(get_albums().consume(process_album, concurrency=PIPELINE_WORKERS))
     while True:
         try:
             async with client:
@@ -1,11 +1,6 @@
 import random
 import logging
 from config.settings import OPENAI_API_KEY
-import openai
-
-# Initialize OpenAI API if the key is provided
-if OPENAI_API_KEY:
-    openai.api_key = OPENAI_API_KEY
 
 async def score_text(text: str) -> int:
     """
@@ -14,6 +9,8 @@ async def score_text(text: str) -> int:
     """
     try:
         if OPENAI_API_KEY:
+            import openai  # deferred: importing openai is slow
+            openai.api_key = OPENAI_API_KEY
             # Use OpenAI API to score the text
             response = openai.Completion.create(
                 engine="text-davinci-003",
@@ -0,0 +1,182 @@
+# processor/album_aggregator.py
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from processor import metrics
+
+logger = logging.getLogger('AlbumAggregator')
+
+ALBUM_WINDOW = float(os.getenv("ALBUM_WINDOW", "1.5"))      # seconds of quiet before an album is complete
+ALBUM_MAX_WAIT = float(os.getenv("ALBUM_MAX_WAIT", "10"))   # seconds an album is held at most
+MAX_ALBUM_SIZE = 10          # Telegram albums hold at most 10 items
+MAX_PENDING = 256            # albums being assembled at once; the oldest is emitted early beyond this
+EMITTED_MEMORY = 1024        # emitted keys remembered to catch parts arriving too late
+
+
+class Album:
+    __slots__ = ("key", "chat_id", "grouped_id", "messages", "first_seen")
+
+    def __init__(self, key, chat_id, grouped_id, messages, first_seen):
+        self.key = key                  # unique, safe to use as a directory name
+        self.chat_id = chat_id
+        self.grouped_id = grouped_id    # None for single messages
+        self.messages = messages        # in message id order
+        self.first_seen = first_seen
+
+    def __repr__(self):
+        return f"Album({self.key!r}, {len(self.messages)} messages)"
+
+
+class _Pending:
+    __slots__ = ("key", "chat_id", "grouped_id", "messages", "first_seen", "last_seen", "task")
+
+    def __init__(self, key, chat_id, grouped_id, now):
+        self.key = key
+        self.chat_id = chat_id
+        self.grouped_id = grouped_id
+        self.messages = {}
+        self.first_seen = now
+        self.last_seen = now
+        self.task = None
+
+
+def album_key(message):
+    """
+    Key of the group a message belongs to.
+
+    Message ids are unique per chat and album ids are random 64-bit values,
+    so qualifying both with the chat id never collides, unlike the old
+    second-resolution ``single_<timestamp>`` keys.
+    """
+    chat_id = getattr(message, 'chat_id', None)
+    grouped_id = getattr(message, 'grouped_id', None)
+    if grouped_id:
+        return f"album_{chat_id}_{grouped_id}"
+    return f"single_{chat_id}_{message.id}"
+
+
+class AlbumAggregator:
+    def __init__(self, queue=None, window=ALBUM_WINDOW, max_wait=ALBUM_MAX_WAIT,
+                 max_size=MAX_ALBUM_SIZE, max_pending=MAX_PENDING, clock=time.monotonic):
+        """
+        Assemble Telegram albums before they are processed.
+
+        Telegram delivers the items of an album as separate messages sharing
+        a ``grouped_id``. Each album is held until no new part has arrived
+        for ``window`` seconds (or ``max_wait`` seconds after its first part,
+        or as soon as it has ``max_size`` parts) and is then put on ``queue``
+        as one ``Album``, so it costs one pipeline run with all of its media.
+        Single messages are queued right away.
+
+        At most ``max_pending`` albums are held; beyond that the oldest is
+        emitted early. Parts arriving after their album was emitted are
+        queued as a follow-up group with a suffixed key.
+
+        Args:
+            queue (asyncio.Queue, optional): Where complete groups are put.
+            window (float): Debounce window in seconds.
+            max_wait (float): Longest an album is held, in seconds.
+            max_size (int): Parts after which an album is complete.
+            max_pending (int): Albums held at once.
+            clock (callable): Monotonic time source.
+        """
+        self.queue = queue if queue is not None else asyncio.Queue()
+        self.window = window
+        self.max_wait = max_wait
+        self.max_size = max_size
+        self.max_pending = max_pending
+        self.clock = clock
+
+        self._pending = OrderedDict()   # key -> _Pending, oldest first
+        self._emitted = OrderedDict()   # key -> groups emitted under it
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def add(self, message):
+        """Add a received message; returns the key of its group."""
+        key = album_key(message)
+        if not getattr(message, 'grouped_id', None):
+            await self._emit(Album(key, getattr(message, 'chat_id', None), None, [message], self.clock()))
+            return key
+
+        pending = self._pending.get(key)
+        now = self.clock()
+        if pending is None:
+            if len(self._pending) >= self.max_pending:
+                oldest = next(iter(self._pending))
+                logger.warning(f"{len(self._pending)} albums pending; emitting {oldest} early")
+                await self._flush(oldest)
+            pending = _Pending(key, getattr(message, 'chat_id', None), message.grouped_id, now)
+            self._pending[key] = pending
+            pending.task = asyncio.ensure_future(self._wait(pending))
+
+        pending.messages[message.id] = message
+        pending.last_seen = now
+        if len(pending.messages) >= self.max_size:
+            await self._flush(key)
+        metrics.set_queue_depth("albums_pending", len(self._pending))
+        return key
+
+    async def flush(self):
+        """Emit every album being assembled, e.g. before shutting down."""
+        for key in list(self._pending):
+            await self._flush(key)
+
+    async def consume(self, process, concurrency=1):
+        """
+        Process queued groups forever.
+
+        Args:
+            process (callable): Coroutine function called with each ``Album``.
+            concurrency (int): Groups processed at once.
+        """
+        async def worker():
+            while True:
+                album = await self.queue.get()
+                metrics.set_queue_depth("albums_queued", self.queue.qsize())
+                try:
+                    await process(album)
+                except Exception as e:
+                    logger.error(f"Error processing {album.key}: {e}")
+                finally:
+                    self.queue.task_done()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def _wait(self, pending):
+        while True:
+            deadline = min(pending.last_seen + self.window, pending.first_seen + self.max_wait)
+            delay = deadline - self.clock()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        if self._pending.get(pending.key) is pending:
+            await self._flush(pending.key, from_timer=True)
+
+    async def _flush(self, key, from_timer=False):
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        if not from_timer and pending.task is not None:
+            pending.task.cancel()
+        messages = [pending.messages[message_id] for message_id in sorted(pending.messages)]
+        await self._emit(Album(key, pending.chat_id, pending.grouped_id, messages, pending.first_seen))
+
+    async def _emit(self, album):
+        base = album.key
+        count = self._emitted.pop(base, 0) + 1
+        self._emitted[base] = count
+        while len(self._emitted) > EMITTED_MEMORY:
+            self._emitted.popitem(last=False)
+        if count > 1:
+            album.key = f"{base}_{count}"
+            logger.info(f"{len(album.messages)} late parts of {base} queued as {album.key}")
+        await self.queue.put(album)
+        metrics.set_queue_depth("albums_pending", len(self._pending))
+        metrics.set_queue_depth("albums_queued", self.queue.qsize())
+
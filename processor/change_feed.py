@@ -0,0 +1,166 @@
+# processor/change_feed.py
+
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger('ChangeFeed')
+
+POLL_INTERVAL = 1.0         # seconds between polls when change streams are unavailable
+POLL_OVERLAP = 2            # seconds re-read by each poll to absorb late writes / clock skew
+SUBSCRIBER_QUEUE_SIZE = 1000
+RETRY_DELAY = 5             # seconds before reopening a failed change stream
+CHANGE_STREAMS_UNSUPPORTED = 40573  # standalone server, no replica set
+
+
+class ChangeFeed:
+    def __init__(self, collection, key_field="workflow_id", poll_interval=POLL_INTERVAL,
+                 include_deletes=False):
+        """
+        Fan out inserts and updates of a collection to in-process subscribers.
+
+        A single background thread reads one MongoDB change stream for the
+        whole process, so every change hits the database once no matter how
+        many subscribers are listening. Servers without change streams
+        (standalone ``mongod``) are polled on the ``updated_at`` field instead.
+
+        Args:
+            collection: The pymongo collection to watch.
+            key_field (str): Document field subscribers filter on.
+            poll_interval (float): Seconds between polls in fallback mode.
+            include_deletes (bool): Also publish ``{'_id': ..., 'deleted': True}``
+                                    tombstones for deletes (change streams only).
+        """
+        self.collection = collection
+        self.key_field = key_field
+        self.poll_interval = poll_interval
+        self.include_deletes = include_deletes
+
+        self._subscribers = {}  # key (None = everything) -> set of queues
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.mode = None  # "change_stream" or "polling" once started
+
+    def subscribe(self, key=None):
+        """
+        Register a subscriber.
+
+        Args:
+            key: Only receive documents whose ``key_field`` equals this value;
+                 None receives every change.
+
+        Returns:
+            queue.Queue: Receives the full document of each change.
+        """
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(key, set()).add(subscriber)
+        self._ensure_thread()
+        return subscriber
+
+    def unsubscribe(self, subscriber, key=None):
+        """Remove a subscriber returned by ``subscribe``."""
+        with self._lock:
+            subscribers = self._subscribers.get(key)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[key]
+
+    def close(self):
+        """Stop the background thread."""
+        self._running = False
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def publish(self, document):
+        """Deliver one changed document to the matching subscribers."""
+        with self._lock:
+            targets = list(self._subscribers.get(document.get(self.key_field), ()))
+            targets += self._subscribers.get(None, ())
+        for subscriber in targets:
+            try:
+                subscriber.put_nowait(document)
+            except queue.Full:
+                # A stalled consumer must not hold up everyone else
+                logger.warning("Dropping change for a slow subscriber")
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        resume_token = None
+        while self._running:
+            try:
+                resume_token = self._watch(resume_token)
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED or "replica set" in str(e):
+                    logger.info("Change streams unavailable, polling on updated_at")
+                    self._poll()
+                    return
+                logger.error(f"Change stream failed: {e}")
+                time.sleep(RETRY_DELAY)
+            except PyMongoError as e:
+                logger.error(f"Change stream failed: {e}")
+                time.sleep(RETRY_DELAY)
+
+    def _watch(self, resume_token):
+        """Read the change stream until stopped; returns the last resume token."""
+        operations = ['insert', 'update', 'replace'] + (['delete'] if self.include_deletes else [])
+        pipeline = [{'$match': {'operationType': {'$in': operations}}}]
+        with self.collection.watch(
+            pipeline, full_document='updateLookup', resume_after=resume_token, max_await_time_ms=1000
+        ) as stream:
+            self.mode = "change_stream"
+            while self._running and stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    continue
+                resume_token = stream.resume_token
+                if change['operationType'] == 'delete':
+                    self.publish({'_id': change['documentKey']['_id'], 'deleted': True})
+                elif change.get('fullDocument'):
+                    self.publish(change['fullDocument'])
+        return resume_token
+
+    def _poll(self):
+        """Fallback: query documents updated since the last poll."""
+        self.mode = "polling"
+        since = datetime.now()
+        seen = {}  # (_id, updated_at) of the overlap window, to skip re-reads
+        while self._running:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                keys = list(self._subscribers)
+            if not keys:
+                continue
+
+            query = {'updated_at': {'$gt': since - timedelta(seconds=POLL_OVERLAP)}}
+            if None not in keys:
+                query[self.key_field] = {'$in': keys}
+            try:
+                documents = list(self.collection.find(query).sort('updated_at', 1))
+            except PyMongoError as e:
+                logger.error(f"Change poll failed: {e}")
+                continue
+
+            for document in documents:
+                marker = (document['_id'], document['updated_at'])
+                if marker in seen:
+                    continue
+                seen[marker] = document['updated_at']
+                since = max(since, document['updated_at'])
+                self.publish(document)
+
+            horizon = since - timedelta(seconds=POLL_OVERLAP)
+            seen = {marker: at for marker, at in seen.items() if at > horizon}
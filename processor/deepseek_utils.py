@@ -1,10 +1,15 @@
 # processor/deepseek_utils.py
+import asyncio
 import os
 import requests
 import json
 import logging
 
+from processor import metrics, tracing
+
 class DeepSeekUtils:
+    provider = "deepseek"
+
     def __init__(self, api_key=None):
         """Initialize DeepSeek utilities."""
         self.api_key = api_key or os.getenv('DEEPSEEK_API_KEY')
@@ -79,15 +84,21 @@ class DeepSeekUtils:
                 "temperature": 0.7
             }
             
-            response = requests.post(
-                self.base_url,
-                headers=headers,
-                data=json.dumps(payload)
-            )
-            
-            response.raise_for_status()  # Raise an exception for 4XX/5XX responses
-            
-            result_json = response.json()
+            with tracing.llm_span("modify", self.provider, payload["model"]) as span:
+                # requests blocks; run it off the event loop
+                response = await asyncio.to_thread(
+                    requests.post,
+                    self.base_url,
+                    headers=headers,
+                    data=json.dumps(payload),
+                    timeout=60
+                )
+
+                response.raise_for_status()  # Raise an exception for 4XX/5XX responses
+
+                result_json = response.json()
+                tracing.record_usage(span, result_json.get("usage"))
+            metrics.count_tokens(self.provider, payload["model"], result_json.get("usage"))
             return result_json["choices"][0]["message"]["content"].strip()
         
         except Exception as e:
@@ -0,0 +1,205 @@
+# processor/download_manager.py
+
+import asyncio
+import logging
+import os
+
+from processor import tracing
+
+logger = logging.getLogger('DownloadManager')
+
+MAX_CONCURRENT = int(os.getenv("DOWNLOAD_CONCURRENCY", "8"))   # downloads in flight per process
+MAX_PER_DC = int(os.getenv("DOWNLOAD_CONCURRENCY_PER_DC", "4"))  # per Telegram data center
+PARALLEL_THRESHOLD = 10 * 1024 * 1024   # documents above this use parallel part requests
+PARALLEL_STREAMS = 4                    # concurrent part streams for one large file
+REQUEST_SIZE = 512 * 1024               # Telegram's maximum part size
+PROGRESS_STEP = 0.1                     # report progress every 10%
+
+
+def media_dc(message):
+    """Data center holding a message's photo or document, or None."""
+    media = getattr(message, 'document', None) or getattr(message, 'photo', None)
+    return getattr(media, 'dc_id', None)
+
+
+def media_size(message):
+    file = getattr(message, 'file', None)
+    return (getattr(file, 'size', None) or 0) if file is not None else 0
+
+
+class Progress:
+    def __init__(self, total, callback, step=PROGRESS_STEP):
+        """
+        Aggregate byte progress over several downloads and report it in steps.
+
+        Args:
+            total (int): Expected bytes over all downloads (0 if unknown).
+            callback (callable): Called with ``(received, total)``.
+            step (float): Fraction of ``total`` between two reports.
+        """
+        self.total = total
+        self.callback = callback
+        self.step = step
+        self._received = {}
+        self._reported = 0.0
+
+    def update(self, item, received):
+        self._received[item] = received
+        if not self.callback or not self.total:
+            return
+        done = sum(self._received.values())
+        if done >= self.total or done / self.total >= self._reported + self.step:
+            self._reported = done / self.total
+            try:
+                self.callback(done, self.total)
+            except Exception as e:
+                logger.error(f"Progress callback failed: {e}")
+
+
+class DownloadManager:
+    def __init__(self, max_concurrent=MAX_CONCURRENT, max_per_dc=MAX_PER_DC,
+                 parallel_threshold=PARALLEL_THRESHOLD, streams=PARALLEL_STREAMS, media_store=None):
+        """
+        Concurrent Telegram media downloads.
+
+        Album items are fetched at the same time, bounded by a process-wide
+        limit and a per data center limit (Telegram throttles per DC). Large
+        documents are split over several part streams of ``iter_download``
+        so a single video is not limited to one request at a time.
+
+        With a ``media_store`` the files are downloaded into the store, and
+        media it already holds is reused without downloading it again.
+
+        Args:
+            max_concurrent (int): Downloads running at once.
+            max_per_dc (int): Downloads running at once against one DC.
+            parallel_threshold (int): Size in bytes above which a document is
+                                      fetched with parallel part streams.
+            streams (int): Part streams per large document.
+            media_store (MediaStore, optional): Content-addressed media store.
+        """
+        self.max_concurrent = max_concurrent
+        self.max_per_dc = max_per_dc
+        self.parallel_threshold = parallel_threshold
+        self.streams = streams
+        self.media_store = media_store
+        self._slots = None
+        self._dc_slots = {}
+
+    def _limits(self, dc_id):
+        # Semaphores are created lazily so they bind to the running loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        if dc_id not in self._dc_slots:
+            self._dc_slots[dc_id] = asyncio.Semaphore(self.max_per_dc)
+        return self._slots, self._dc_slots[dc_id]
+
+    async def download_all(self, messages, name="", files=None, progress=None):
+        """
+        Download the media of several messages concurrently.
+
+        Args:
+            messages (list): Telethon messages; those without media are skipped.
+            name (str): Prefix of the file names in the media store.
+            files (list, optional): Target paths per message (without the
+                                    store); extensions are added automatically.
+            progress (callable, optional): Called with ``(received, total)``
+                                           bytes over the whole batch.
+
+        Returns:
+            list: Paths of the downloaded files, in message order.
+        """
+        items = [
+            (idx, message, files[idx] if files else None)
+            for idx, message in enumerate(messages) if getattr(message, 'media', None)
+        ]
+        tracker = Progress(sum(media_size(message) for _, message, _ in items), progress)
+
+        async def fetch(idx, message, file):
+            try:
+                return await self.download(
+                    message, f"{name}_{idx}", file=file,
+                    progress=lambda received, total: tracker.update(idx, received)
+                )
+            except Exception as e:
+                logger.error(f"Error downloading media of message {getattr(message, 'id', '?')}: {e}")
+                return None
+
+        paths = await asyncio.gather(*(fetch(*item) for item in items))
+        return [path for path in paths if path]
+
+    async def download(self, message, name="", file=None, progress=None):
+        """
+        Download the media of one message.
+
+        Returns:
+            str: Path of the downloaded (or already stored) file, or None.
+        """
+        with tracing.span("download", {"messaging.system": "telegram", "telegram.dc": media_dc(message),
+                                       "file.size": media_size(message)}):
+            return await self._download(message, name, file, progress)
+
+    async def _download(self, message, name, file, progress):
+        key = None
+        into_store = self.media_store is not None and file is None
+        if into_store:
+            from processor.media_store import telegram_media_key
+            key = telegram_media_key(message)
+            stored = await asyncio.to_thread(self.media_store.lookup, key)
+            if stored:
+                logger.info(f"Reusing stored media {key}")
+                tracing.set_attributes({"media.reused": True})
+                if progress:
+                    progress(media_size(message), media_size(message))
+                return stored
+            file = self.media_store.temp_path(name)
+
+        slots, dc_slots = self._limits(media_dc(message))
+        # Take the DC slot first so a busy DC does not hold global slots idle
+        async with dc_slots, slots:
+            size = media_size(message)
+            document = getattr(message, 'document', None)
+            if document is not None and size >= self.parallel_threshold and self.streams > 1:
+                path = await self._download_parallel(message, document, size, file, progress)
+            else:
+                path = await message.download_media(file=file, progress_callback=progress)
+
+        if path and into_store:
+            path = await asyncio.to_thread(self.media_store.add, path, key)
+        return path
+
+    async def _download_parallel(self, message, document, size, file, progress):
+        """Fetch a document with interleaved part streams, written in place."""
+        extension = getattr(message.file, 'ext', None) or ''
+        path = file if os.path.splitext(file or '')[1] else f"{file or document.id}{extension}"
+        with open(path, 'wb') as f:
+            f.truncate(size)
+
+        stride = REQUEST_SIZE * self.streams
+        received = [0] * self.streams
+
+        async def stream(index):
+            offset = index * REQUEST_SIZE
+            if offset >= size:
+                return
+            parts = (size - offset + stride - 1) // stride
+            with open(path, 'r+b') as f:
+                async for chunk in message.client.iter_download(
+                    document, offset=offset, stride=stride, limit=parts,
+                    request_size=REQUEST_SIZE, file_size=size
+                ):
+                    f.seek(offset)
+                    f.write(chunk)
+                    offset += stride
+                    received[index] += len(chunk)
+                    if progress:
+                        progress(sum(received), size)
+
+        try:
+            await asyncio.gather(*(stream(index) for index in range(self.streams)))
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        logger.info(f"Downloaded {size} bytes with {self.streams} parallel streams to {path}")
+        return path
@@ -0,0 +1,193 @@
+# processor/html_extract.py
+
+import re
+from urllib.parse import urljoin
+
+MAX_CHARS = 20000       # text returned per page, enough context for the LLM prompt
+MAX_MEDIA = 20          # images and videos returned per page
+MIN_PARAGRAPH = 25      # shorter paragraphs do not count towards a block's score
+
+# Never content; removed with their subtrees before scoring
+STRIP_TAGS = ("script", "style", "noscript", "template", "svg", "iframe", "form",
+              "button", "select", "textarea", "nav", "footer", "aside")
+# Text inside these is emitted as one line
+BLOCK_TAGS = frozenset(("p", "div", "article", "section", "main", "li", "td", "th", "pre",
+                        "blockquote", "figure", "figcaption", "dd", "dt", "tr",
+                        "h1", "h2", "h3", "h4", "h5", "h6", "header", "ul", "ol", "table"))
+SCORED_TAGS = ("p", "pre", "blockquote", "td")
+
+POSITIVE = re.compile(r"article|body|content|entry|main|post|story|text", re.I)
+NEGATIVE = re.compile(r"comment|footer|sidebar|menu|nav|promo|related|share|social|banner|"
+                      r"sponsor|advert|cookie|subscribe|newsletter|popup|widget", re.I)
+CSS_VARIABLE = re.compile(r"--[a-zA-Z0-9-]+:")
+WHITESPACE = re.compile(r"\s+")
+JUNK_PREFIXES = ("[data-", ".cls-")
+
+
+def looks_like_junk(text):
+    """
+    Single-pass version of ``scrape_and_download.looks_like_style_or_junk``:
+    too short, CSS-like, or dominated by non-letter characters.
+    """
+    length = len(text)
+    if length < 8 or text.startswith(JUNK_PREFIXES):
+        return True
+    if sum(map(str.isalpha, text)) < 0.2 * length:
+        return True
+    if text.count("{") + text.count("}") + text.count(";") > 0.5 * length:
+        return True
+    return CSS_VARIABLE.search(text) is not None
+
+
+def extract(html, base_url, max_chars=MAX_CHARS, max_media=MAX_MEDIA):
+    """
+    Extract the main content of a page as ``(type, content)`` tuples.
+
+    Uses the lxml fast path when lxml is installed and falls back to the
+    BeautifulSoup walker of ``scrape_and_download`` otherwise.
+
+    Args:
+        html (str): The page source.
+        base_url (str): URL the page was fetched from, for relative media links.
+        max_chars (int): Maximum total characters of text returned.
+        max_media (int): Maximum number of media elements returned.
+
+    Returns:
+        list: ``("text", text)``, ``("image", url)`` and ``("video", url)`` tuples
+              in document order.
+    """
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        from scrape_and_download import extract_elements as extract_with_soup
+        return extract_with_soup(html, base_url)
+    return extract_elements(html, base_url, max_chars, max_media)
+
+
+def extract_elements(html, base_url, max_chars=MAX_CHARS, max_media=MAX_MEDIA):
+    """
+    lxml extraction: parse in C, score blocks to find the main content and
+    walk it iteratively, so deep DOMs cannot hit the recursion limit and the
+    output is bounded however large the page is.
+    """
+    import lxml.html
+    from lxml import etree
+
+    if not html or not html.strip():
+        return []
+    parser = lxml.html.HTMLParser(remove_comments=True, remove_pis=True, huge_tree=True)
+    try:
+        root = lxml.html.document_fromstring(html, parser=parser)
+    except (etree.ParserError, ValueError):
+        return []
+    etree.strip_elements(root, *STRIP_TAGS, with_tail=False)
+
+    container = best_container(root)
+    return collect(container, base_url, max_chars, max_media)
+
+
+def best_container(root):
+    """
+    Readability-style scoring: every paragraph adds points to its parent and
+    half to its grandparent; candidates are weighted by their class/id and
+    penalised by link density. Returns the best candidate, or ``<body>``.
+    """
+    scores = {}
+    for paragraph in root.iter(*SCORED_TAGS):
+        text = paragraph.text_content()
+        if len(text) < MIN_PARAGRAPH:
+            continue
+        points = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = paragraph.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + points
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + points / 2
+
+    body = root.find("body")
+    fallback = body if body is not None else root
+    if not scores:
+        return fallback
+
+    best, best_score = None, 0
+    for candidate, score in scores.items():
+        score += class_weight(candidate)
+        score *= 1 - link_density(candidate)
+        if score > best_score:
+            best, best_score = candidate, score
+    return best if best is not None else fallback
+
+
+def class_weight(element):
+    weight = 0
+    for attribute in (element.get("class"), element.get("id")):
+        if attribute:
+            if NEGATIVE.search(attribute):
+                weight -= 25
+            if POSITIVE.search(attribute):
+                weight += 25
+    return weight
+
+
+def link_density(element):
+    text_length = len(element.text_content())
+    if not text_length:
+        return 1
+    link_length = sum(len(link.text_content()) for link in element.iter("a"))
+    return min(link_length / text_length, 1)
+
+
+def collect(container, base_url, max_chars=MAX_CHARS, max_media=MAX_MEDIA):
+    """Walk ``container`` in document order, one text line per block."""
+    from lxml import etree
+
+    elements = []
+    buffer = []
+    state = {"chars": 0, "media": 0}
+
+    def flush():
+        if not buffer:
+            return
+        text = WHITESPACE.sub(" ", " ".join(buffer)).strip()
+        buffer.clear()
+        if not text or looks_like_junk(text):
+            return
+        remaining = max_chars - state["chars"]
+        if remaining <= 0:
+            return
+        text = text[:remaining]
+        state["chars"] += len(text)
+        elements.append(("text", text))
+
+    def add_media(kind, src):
+        if src and state["media"] < max_media:
+            flush()
+            state["media"] += 1
+            elements.append((kind, urljoin(base_url, src)))
+
+    for event, element in etree.iterwalk(container, events=("start", "end")):
+        if state["chars"] >= max_chars:
+            break
+        tag = element.tag if isinstance(element.tag, str) else ""
+        if event == "start":
+            if tag in BLOCK_TAGS:
+                flush()
+            if tag == "img":
+                add_media("image", element.get("src") or element.get("data-src"))
+            elif tag == "video":
+                src = element.get("src")
+                if not src:
+                    source = element.find(".//source")
+                    src = source.get("src") if source is not None else None
+                add_media("video", src)
+            elif element.text:
+                buffer.append(element.text)
+        else:
+            if tag in BLOCK_TAGS:
+                flush()
+            if element is not container and element.tail:
+                buffer.append(element.tail)
+    flush()
+    return elements
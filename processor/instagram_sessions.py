@@ -0,0 +1,144 @@
+# processor/instagram_sessions.py
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger('InstagramSessionPool')
+
+SESSION_DIR = os.getenv("INSTAGRAM_SESSION_DIR", os.path.join(os.getcwd(), 'data', 'instagram_sessions'))
+ANONYMOUS = "anonymous"
+
+
+def session_errors():
+    """
+    instagrapi exceptions raised when Instagram rejects a session.
+
+    Returns:
+        tuple: The exception classes; empty when instagrapi is not installed.
+    """
+    try:
+        from instagrapi.exceptions import (
+            ChallengeRequired, ClientLoginRequired, ClientUnauthorizedError, LoginRequired,
+            ReloginAttemptExceeded,
+        )
+    except ImportError:
+        return ()
+    return (LoginRequired, ChallengeRequired, ClientLoginRequired, ClientUnauthorizedError, ReloginAttemptExceeded)
+
+
+def _build_client():
+    """Build an instagrapi client; the library is imported on first use."""
+    from instagrapi import Client
+    return Client()
+
+
+class InstagramSessionPool:
+    def __init__(self, session_dir=SESSION_DIR, client_factory=None):
+        """
+        Long-lived Instagram clients, one per account, shared across poll cycles.
+
+        Each client's instagrapi settings (cookies, device, tokens) are saved
+        to ``<session_dir>/<username>.json`` after login and loaded on the next
+        start, so a restart resumes the session instead of logging in again.
+        Username to user id lookups are cached permanently in ``user_ids.json``.
+
+        Args:
+            session_dir (str): Directory for session settings and the user id cache.
+            client_factory (callable, optional): Builds a new instagrapi client.
+        """
+        self.session_dir = session_dir
+        self.client_factory = client_factory or _build_client
+        os.makedirs(self.session_dir, exist_ok=True)
+
+        self._clients = {}
+        self._locks = {}
+        self._user_ids_path = os.path.join(self.session_dir, 'user_ids.json')
+        self._user_ids = self._load_user_ids()
+        self._save_lock = threading.Lock()
+
+    async def get_client(self, username=None, password=None):
+        """
+        Return the logged-in client of an account, logging in at most once.
+
+        Args:
+            username (str, optional): Account to log in with; None gives the
+                                      shared anonymous reader.
+            password (str, optional): Password used when the stored session is
+                                      missing or no longer valid.
+        """
+        key = username or ANONYMOUS
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self._clients:
+                self._clients[key] = await asyncio.to_thread(self._login, key, username, password)
+        return self._clients[key]
+
+    def _login(self, key, username, password):
+        client = self.client_factory()
+        settings_path = self._settings_path(key)
+        if os.path.exists(settings_path):
+            client.load_settings(settings_path)
+            logger.info(f"Loaded stored Instagram session for {key}")
+
+        if username:
+            # With loaded settings instagrapi reuses the session cookies
+            client.login(username, password)
+        else:
+            client.login_anonymous()
+
+        client.dump_settings(settings_path)
+        return client
+
+    async def user_id(self, client, username):
+        """Resolve a username to its user id, asking Instagram only once ever."""
+        user_id = self._user_ids.get(username)
+        if user_id is None:
+            user_id = await asyncio.to_thread(client.user_id_from_username, username)
+            self._user_ids[username] = user_id
+            await asyncio.to_thread(self._save_user_ids)
+        return user_id
+
+    def save(self):
+        """Persist the settings of every pooled client."""
+        for key, client in self._clients.items():
+            try:
+                client.dump_settings(self._settings_path(key))
+            except Exception as e:
+                logger.error(f"Could not save Instagram session for {key}: {e}")
+
+    def discard(self, username=None):
+        """Drop a client whose session was rejected, forcing a fresh login."""
+        key = username or ANONYMOUS
+        self._clients.pop(key, None)
+        settings_path = self._settings_path(key)
+        if os.path.exists(settings_path):
+            os.remove(settings_path)
+
+    def _settings_path(self, key):
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+        return os.path.join(self.session_dir, f"{safe}.json")
+
+    def _load_user_ids(self):
+        try:
+            with open(self._user_ids_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable user id cache: {e}")
+            return {}
+
+    def _save_user_ids(self):
+        with self._save_lock:
+            tmp_path = self._user_ids_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(self._user_ids), f)
+            os.replace(tmp_path, self._user_ids_path)
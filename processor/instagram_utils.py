@@ -1,105 +1,219 @@
 # processor/instagram_utils.py
 
 import asyncio
-from instagrapi import Client as InstaClient
+import os
+import time
+
+from processor.instagram_sessions import InstagramSessionPool, session_errors
+from processor.poll_scheduler import AdaptivePollScheduler
+from processor.sinks import InstagramSink, SinkRouter
+
+MAX_CONCURRENT_POLLS = int(os.getenv("INSTAGRAM_MAX_CONCURRENT_POLLS", "4"))
+SESSION_SAVE_INTERVAL = float(os.getenv("INSTAGRAM_SESSION_SAVE_INTERVAL", "300"))  # Seconds between saves of refreshed cookies
+
 
 class InstagramReader:
-    def __init__(self, source_accounts, destination_accounts, telegram_poster=None):
+    def __init__(self, source_accounts, destination_accounts, telegram_poster=None, session_pool=None,
+                 scheduler=None, repositories=None, max_concurrent_polls=MAX_CONCURRENT_POLLS):
         """
         Initialize Instagram Reader.
 
+        Sources are polled concurrently, at most ``max_concurrent_polls`` at a
+        time, each on its own interval adapted to how often it posts. The last
+        seen post and story of every source are persisted in the
+        ``instagram_watermarks`` collection, so restarts neither miss nor repeat
+        posts. A client whose session Instagram rejects is dropped from the
+        session pool and logged in again on next use; the refreshed cookies of
+        the pooled clients are saved every ``SESSION_SAVE_INTERVAL`` seconds.
+
         Args:
             source_accounts (list): List of Instagram source usernames.
             destination_accounts (list): List of destination account credentials (dicts with 'username' and 'password').
             telegram_poster (optional): TelegramPoster instance to repost to Telegram.
+            session_pool (InstagramSessionPool, optional): Shared logged-in clients.
+            scheduler (AdaptivePollScheduler, optional): Per-source polling intervals.
+            repositories (Repositories, optional): Data access for the watermarks;
+                                                   built from the environment when omitted.
+            max_concurrent_polls (int): Sources polled at the same time.
         """
         self.source_accounts = source_accounts
         self.destination_accounts = destination_accounts
         self.destination_clients = []
+        self.post_router = SinkRouter([])
+        self.story_router = SinkRouter([])
         self.telegram_poster = telegram_poster
-        self.poll_interval = 60  # Default polling every 60 seconds
+        self.sessions = session_pool or InstagramSessionPool()
+        self.scheduler = scheduler or AdaptivePollScheduler()
+        self.repositories = repositories
+        self.max_concurrent_polls = max_concurrent_polls
+        self._poll_slots = None
+        self._sink_accounts = {}  # {sink name: destination username}
+        self._sessions_saved_at = time.monotonic()
         self.last_seen = {}  # {username: {"posts": last_post_pk, "stories": last_story_pk}}
 
     async def login_all(self):
         """
-        Login to all destination Instagram accounts.
+        Login to all destination Instagram accounts, resuming stored sessions.
         """
-        for creds in self.destination_accounts:
-            client = InstaClient()
-            client.login(creds['username'], creds['password'])
-            self.destination_clients.append(client)
+        self.destination_clients = list(await asyncio.gather(*(
+            self.sessions.get_client(creds['username'], creds['password'])
+            for creds in self.destination_accounts
+        )))
+        post_sinks, story_sinks = [], []
+        for creds, client in zip(self.destination_accounts, self.destination_clients):
+            post_sinks.append(InstagramSink(client))
+            story_sinks.append(InstagramSink(client, story=True))
+            for sink in (post_sinks[-1], story_sinks[-1]):
+                self._sink_accounts[sink.name] = creds['username']
+        self.post_router = SinkRouter(post_sinks)
+        self.story_router = SinkRouter(story_sinks)
         print(f"[InstagramReader] Logged into {len(self.destination_clients)} Instagram destination accounts.")
 
+    async def load_watermarks(self):
+        """
+        Restore the last seen posts and stories, and the observed posting rates.
+        """
+        stored = await self._repositories().watermarks.load_all()
+        for username in self.source_accounts:
+            doc = stored.get(username)
+            if doc:
+                self.last_seen[username] = {"posts": doc.get("posts", 0), "stories": doc.get("stories", 0)}
+                self.scheduler.add(username, rate=doc.get("rate"))
+        print(f"[InstagramReader] Restored watermarks for {len(stored)} sources.")
+
     async def start_polling(self):
         """
-        Start polling the source accounts.
+        Start polling the source accounts, each on its own adaptive schedule.
         """
         await self.login_all()
+        await self.load_watermarks()
+        await asyncio.gather(*(self._poll_forever(username) for username in self.source_accounts))
+
+    async def _poll_forever(self, username):
+        await asyncio.sleep(self.scheduler.add(username))
         while True:
-            await self.poll_sources_once()
-            await asyncio.sleep(self.poll_interval)
+            try:
+                new_items = await self.poll_source(username)
+            except Exception as e:
+                print(f"[InstagramReader] Error processing {username}: {e}")
+                delay = self.scheduler.record_failure(username)
+            else:
+                delay = self.scheduler.record(username, new_items)
+                await self.save_state(username)
+            await asyncio.sleep(delay)
 
     async def poll_sources_once(self):
         """
-        Check for new posts and stories from all source accounts.
+        Check for new posts and stories from all source accounts concurrently.
         """
-        for source_username in self.source_accounts:
+        async def poll(username):
             try:
-                await asyncio.gather(
-                    self.process_source_posts(source_username),
-                    self.process_source_stories(source_username)
-                )
+                await self.poll_source(username)
+                await self.save_state(username)
             except Exception as e:
-                print(f"[InstagramReader] Error processing {source_username}: {e}")
+                print(f"[InstagramReader] Error processing {username}: {e}")
+
+        await asyncio.gather(*(poll(username) for username in self.source_accounts))
+
+    async def poll_source(self, username):
+        """
+        Poll one source under the global concurrency limit.
+
+        Returns:
+            int: Number of new posts and stories found.
+        """
+        if self._poll_slots is None:
+            self._poll_slots = asyncio.Semaphore(self.max_concurrent_polls)
+        async with self._poll_slots:
+            try:
+                posts, stories = await asyncio.gather(
+                    self.process_source_posts(username),
+                    self.process_source_stories(username)
+                )
+            except session_errors():
+                # The next poll logs in again instead of reusing the dead session
+                self.sessions.discard()
+                raise
+        await self._save_sessions()
+        return posts + stories
+
+    async def save_state(self, username):
+        """
+        Persist the watermarks and the observed posting rate of a source.
+
+        Called after every successful poll, so a quiet source keeps its slowed
+        down interval across restarts instead of resuming at the fast default.
+        """
+        seen = self.last_seen.get(username, {"posts": 0, "stories": 0})
+        try:
+            await self._repositories().watermarks.save(
+                username, seen["posts"], seen["stories"], rate=self.scheduler.rate(username)
+            )
+        except Exception as e:
+            print(f"[InstagramReader] Error saving the state of {username}: {e}")
+
+    async def _save_sessions(self):
+        if time.monotonic() - self._sessions_saved_at < SESSION_SAVE_INTERVAL:
+            return
+        self._sessions_saved_at = time.monotonic()
+        await asyncio.to_thread(self.sessions.save)
+
+    def _repositories(self):
+        if self.repositories is None:
+            from config.repositories import Repositories
+            self.repositories = Repositories()
+        return self.repositories
 
     async def process_source_posts(self, username):
         """
         Fetch and repost new posts from a source account.
-        """
-        if username not in self.last_seen:
-            self.last_seen[username] = {"posts": 0, "stories": 0}
 
-        temp_client = InstaClient()
-        await asyncio.to_thread(temp_client.login_anonymous)
+        Returns:
+            int: Number of new posts.
+        """
+        seen = self.last_seen.setdefault(username, {"posts": 0, "stories": 0})
 
-        user_id = await asyncio.to_thread(temp_client.user_id_from_username, username)
-        medias = await asyncio.to_thread(temp_client.user_medias, user_id, 10)
-        new_medias = [media for media in medias if media.pk > self.last_seen[username]["posts"]]
+        client = await self.sessions.get_client()
+        user_id = await self.sessions.user_id(client, username)
+        medias = await asyncio.to_thread(client.user_medias, user_id, 10)
+        new_medias = [media for media in medias if int(media.pk) > seen["posts"]]
         if new_medias:
-            self.last_seen[username]["posts"] = max(media.pk for media in new_medias)
+            seen["posts"] = max(int(media.pk) for media in new_medias)
 
         for media in new_medias:
             print(f"[InstagramReader] New post from {username}: {media.pk}")
-            media_path = await asyncio.to_thread(self.download_media, temp_client, media.pk)
+            media_path = await self.download_media(client, media.pk)
             if media_path:
                 caption_text = f"Reposted from {username}"
                 await self.repost_to_destinations(media, media_path, caption_text)
             else:
                 print(f"[InstagramReader] Failed to download media {media.pk}")
+        return len(new_medias)
 
     async def process_source_stories(self, username):
         """
         Fetch and repost new stories from a source account.
-        """
-        if username not in self.last_seen:
-            self.last_seen[username] = {"posts": 0, "stories": 0}
 
-        temp_client = InstaClient()
-        await asyncio.to_thread(temp_client.login_anonymous)
+        Returns:
+            int: Number of new stories.
+        """
+        seen = self.last_seen.setdefault(username, {"posts": 0, "stories": 0})
 
-        user_id = await asyncio.to_thread(temp_client.user_id_from_username, username)
-        stories = await asyncio.to_thread(temp_client.user_stories, user_id)
-        new_stories = [story for story in stories if story.pk > self.last_seen[username]["stories"]]
+        client = await self.sessions.get_client()
+        user_id = await self.sessions.user_id(client, username)
+        stories = await asyncio.to_thread(client.user_stories, user_id)
+        new_stories = [story for story in stories if int(story.pk) > seen["stories"]]
         if new_stories:
-            self.last_seen[username]["stories"] = max(story.pk for story in new_stories)
+            seen["stories"] = max(int(story.pk) for story in new_stories)
 
         for story in new_stories:
             print(f"[InstagramReader] New story from {username}: {story.pk}")
-            media_path = await asyncio.to_thread(self.download_media, temp_client, story.pk)
+            media_path = await self.download_media(client, story.pk)
             if media_path:
                 await self.repost_story_to_destinations(media_path)
             else:
                 print(f"[InstagramReader] Failed to download story {story.pk}")
+        return len(new_stories)
 
     async def download_media(self, client, media_pk):
         """
@@ -116,25 +230,43 @@ class InstagramReader:
 
     async def repost_to_destinations(self, media, media_path, caption_text):
         """
-        Upload media as a post to all destination Instagram accounts.
+        Upload media as a post to all destination accounts (and Telegram) concurrently.
         """
-        for client in self.destination_clients:
-            if media.media_type == 1:
-                await asyncio.to_thread(client.photo_upload, media_path, caption_text)
-            elif media.media_type == 2:
-                await asyncio.to_thread(client.video_upload, media_path, caption_text)
-            print(f"[InstagramReader] Reposted media {media.pk} to one destination.")
-
-        if self.telegram_poster:
-            await self.telegram_poster.post_to_telegram_channel(caption_text, media_path)
+        await self._fan_out(self.post_router, caption_text, media_path)
+        print(f"[InstagramReader] Reposted media {media.pk} to {len(self.destination_clients)} destinations.")
 
     async def repost_story_to_destinations(self, media_path):
         """
-        Upload media as a story to all destination Instagram accounts.
+        Upload media as a story to all destination accounts (and Telegram) concurrently.
         """
-        for client in self.destination_clients:
-            await asyncio.to_thread(client.story_upload, media_path)
-            print(f"[InstagramReader] Reposted story to one destination.")
+        await self._fan_out(self.story_router, "Instagram Story reposted", media_path)
+        print(f"[InstagramReader] Reposted story to {len(self.destination_clients)} destinations.")
 
+    async def _fan_out(self, router, caption_text, media_path):
+        tasks = [router.publish(caption_text, [media_path])]
         if self.telegram_poster:
-            await self.telegram_poster.post_to_telegram_channel("Instagram Story reposted", media_path)
+            tasks.append(self.telegram_poster.post_to_telegram_channel(caption_text, media_path))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"[InstagramReader] Error reposting: {result}")
+
+        rejected = {
+            self._sink_accounts[name] for name, result in results[0].items()
+            if isinstance(result, session_errors()) and name in self._sink_accounts
+        } if isinstance(results[0], dict) else set()
+        if rejected:
+            await self._relogin_destinations(rejected)
+
+    async def _relogin_destinations(self, usernames):
+        """
+        Replace the clients of destination accounts whose session was rejected.
+        """
+        for username in usernames:
+            print(f"[InstagramReader] Instagram rejected the session of {username}; logging in again.")
+            self.sessions.discard(username)
+        try:
+            await self.login_all()
+        except Exception as e:
+            # The discarded accounts are retried on the next repost
+            print(f"[InstagramReader] Error logging in again: {e}")
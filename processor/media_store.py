@@ -0,0 +1,220 @@
+# processor/media_store.py
+
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger('MediaStore')
+
+MEDIA_STORE_DIR = os.getenv("MEDIA_STORE_DIR", os.path.join(os.getcwd(), 'data', 'media_store'))
+MAX_BYTES = int(os.getenv("MEDIA_STORE_MAX_BYTES", str(2 * 1024 ** 3)))
+HASH_CHUNK = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest    TEXT PRIMARY KEY,
+    path      TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    refs      INTEGER NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_gc ON objects (refs, last_used);
+CREATE TABLE IF NOT EXISTS aliases (
+    key    TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def file_digest(path):
+    """sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def telegram_media_key(message):
+    """
+    Stable alias of a Telegram message's media, or None.
+
+    Photos and documents keep their id when forwarded or reposted, so the
+    same file arriving from several channels maps to one key.
+    """
+    media = getattr(message, 'photo', None) or getattr(message, 'document', None)
+    media_id = getattr(media, 'id', None)
+    return f"telegram:{media_id}" if media_id is not None else None
+
+
+class MediaStore:
+    def __init__(self, root=MEDIA_STORE_DIR, max_bytes=MAX_BYTES):
+        """
+        Content-addressed store for downloaded media.
+
+        Files live under ``objects/<aa>/<bb>/<sha256><ext>``, so identical
+        content is stored once whatever its name or origin. A SQLite index
+        keeps a reference count and last use time per object, plus aliases
+        (a Telegram media id, a URL) that let callers skip downloading content
+        the store already holds.
+
+        Callers hold a reference while they use a file and ``release`` it
+        afterwards. Unreferenced objects stay on disk as a cache until the
+        store exceeds ``max_bytes``; the least recently used are then deleted.
+        The index is shared safely by every process using the same root.
+
+        Args:
+            root (str): Store directory.
+            max_bytes (int): Size the garbage collector shrinks the store to.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(root, 'objects')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(root, 'index.sqlite3'), timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def temp_path(self, name=""):
+        """A fresh path on the store's filesystem to download into before ``add``."""
+        return os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}_{name}")
+
+    def add(self, path, key=None):
+        """
+        Move a file into the store and take a reference to it.
+
+        If the content is already stored, the file is deleted and the existing
+        object is returned.
+
+        Args:
+            path (str): The downloaded file; it is consumed.
+            key (str, optional): Alias to record for later ``lookup`` calls.
+
+        Returns:
+            str: Path of the stored object.
+        """
+        digest = file_digest(path)
+        size = os.path.getsize(path)
+        extension = os.path.splitext(path)[1].lower()
+        target = os.path.join(self.objects_dir, digest[:2], digest[2:4], digest + extension)
+
+        with self._lock:
+            row = self._db.execute("SELECT path FROM objects WHERE digest = ?", (digest,)).fetchone()
+            if row and os.path.exists(row[0]):
+                os.remove(path)
+                target = row[0]
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+            self._db.execute(
+                "INSERT INTO objects (digest, path, size, refs, last_used) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT(digest) DO UPDATE SET refs = refs + 1, last_used = excluded.last_used, "
+                "path = excluded.path",
+                (digest, target, size, time.time())
+            )
+            if key:
+                self._db.execute("INSERT OR REPLACE INTO aliases (key, digest) VALUES (?, ?)", (key, digest))
+        self.gc()
+        return target
+
+    def lookup(self, key):
+        """
+        Take a reference to the object stored under an alias.
+
+        Returns:
+            str: The stored path, or None when the content is unknown.
+        """
+        if not key:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT o.digest, o.path FROM aliases a JOIN objects o ON o.digest = a.digest WHERE a.key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if not os.path.exists(row[1]):
+                self._db.execute("DELETE FROM objects WHERE digest = ?", (row[0],))
+                return None
+            self._db.execute(
+                "UPDATE objects SET refs = refs + 1, last_used = ? WHERE digest = ?", (time.time(), row[0])
+            )
+        return row[1]
+
+    def release(self, paths):
+        """Drop one reference to each stored path, then collect garbage if needed."""
+        if not paths:
+            return
+        with self._lock:
+            for path in paths:
+                self._db.execute(
+                    "UPDATE objects SET refs = MAX(refs - 1, 0), last_used = ? WHERE path = ?",
+                    (time.time(), path)
+                )
+        self.gc()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def gc(self):
+        """
+        Delete unreferenced objects, least recently used first, until the
+        store fits in ``max_bytes``.
+
+        Returns:
+            int: Bytes freed.
+        """
+        freed = 0
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            candidates = self._db.execute(
+                "SELECT digest, path, size FROM objects WHERE refs = 0 ORDER BY last_used"
+            ).fetchall()
+            for digest, path, size in candidates:
+                if total - freed <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"Could not delete {path}: {e}")
+                    continue
+                self._db.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+                self._db.execute("DELETE FROM aliases WHERE digest = ?", (digest,))
+                freed += size
+        if freed:
+            logger.info(f"Media store freed {freed} bytes")
+        return freed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_media_store():
+    """The process-wide MediaStore."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MediaStore()
+    return _store
@@ -0,0 +1,321 @@
+# processor/message_logger.py
+
+import atexit
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from processor import metrics, tracing
+
+logger = logging.getLogger('MessageLogger')
+
+FLUSH_INTERVAL = 0.5    # seconds between background flushes
+MAX_BATCH = 200         # pending records that trigger an early flush
+MAX_PENDING = 10000     # records kept in memory while MongoDB is unreachable
+RETENTION_DAYS = int(os.getenv("WORKFLOW_MESSAGES_RETENTION_DAYS", "30"))
+MAX_TEXT_CHARS = 4000   # longer message texts are truncated in the log
+MAX_TRACKED = 50000     # messages whose last status is remembered for transition checks
+DUPLICATE_KEY = 11000   # MongoDB error code for a unique index violation
+
+STATS_COLLECTION = "workflow_stats_hourly"
+TERMINAL_STATUSES = ("filtered_out", "posted", "error")
+
+# Allowed status transitions of one message; terminal statuses are final.
+TRANSITIONS = {
+    None: {"processing"} | set(TERMINAL_STATUSES),
+    "processing": set(TERMINAL_STATUSES),
+}
+
+
+def hour_bucket(timestamp):
+    """Truncate a timestamp to the start of its hour."""
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+class MessageLogger:
+    def __init__(self, collection, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH,
+                 retention_days=RETENTION_DAYS):
+        """
+        Write-behind logger for the ``workflow_messages`` collection.
+
+        ``log_message`` only updates an in-memory buffer; a background thread
+        coalesces all updates to the same message and writes them with a single
+        ``bulk_write`` every ``flush_interval`` seconds or ``max_batch`` records.
+
+        Records are keyed by ``(workflow_id, message_key)``, so workflows sharing
+        a source channel keep separate documents. Status changes follow
+        ``TRANSITIONS``: each accepted change bumps the document ``version`` and
+        is appended to its ``history``. Writes are guarded on the version, so a
+        replayed or out-of-order update is a no-op instead of an overwrite.
+
+        Raw records expire after ``retention_days`` through a TTL index. Per
+        workflow, per hour counters (received, filtered_out, posted, error and
+        LLM latency) are maintained incrementally in ``workflow_stats_hourly``
+        so dashboards never scan raw messages.
+
+        Args:
+            collection: The pymongo collection to write to.
+            flush_interval (float): Maximum delay before a record is written.
+            max_batch (int): Number of pending records that triggers a flush.
+            retention_days (int): Days raw message records are kept.
+        """
+        self.collection = collection
+        self.stats_collection = collection.database[STATS_COLLECTION]
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.retention_days = retention_days
+
+        self._pending = {}
+        self._pending_stats = {}
+        self._states = OrderedDict()  # (workflow_id, message_key) -> (status, version)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._indexes_ready = False
+        atexit.register(self.close)
+
+    @classmethod
+    def from_uri(cls, mongo_uri, db_name="social_manager", **kwargs):
+        """Create a logger with its own MongoDB client (used inside worker processes)."""
+        client = MongoClient(mongo_uri)
+        return cls(client[db_name]["workflow_messages"], **kwargs)
+
+    def log_message(self, workflow_id, message_data):
+        """
+        Queue a processed message record for a workflow.
+
+        Args:
+            workflow_id (str): The workflow ID
+            message_data (dict): Data about the processed message. Inside a
+                                 message trace its ``trace_id`` is added.
+        """
+        record = dict(message_data)
+        # UTC, as the TTL index and the hourly rollups are evaluated by MongoDB in UTC
+        record['timestamp'] = datetime.now(timezone.utc)
+        record['workflow_id'] = workflow_id
+        span_context = tracing.current_span_context()
+        if span_context is not None:
+            record.setdefault('trace_id', format(span_context.trace_id, "032x"))
+        key = (workflow_id, record.get('message_key'))
+        for field in ('original_text', 'modified_text'):
+            if isinstance(record.get(field), str) and len(record[field]) > MAX_TEXT_CHARS:
+                record[field] = record[field][:MAX_TEXT_CHARS]
+
+        with self._lock:
+            transition = None
+            status = record.get('status')
+            if status is not None:
+                transition = self._transition(key, status, record['timestamp'])
+                if transition is None:
+                    logger.debug(f"Ignoring status {status!r} for message {key}")
+                    return
+                record['version'] = transition['version']
+                self._count(record)
+
+            entry = self._pending.get(key)
+            if entry is None:
+                if len(self._pending) >= MAX_PENDING:
+                    # Drop the oldest record rather than grow without bound
+                    self._pending.pop(next(iter(self._pending)))
+                entry = self._pending[key] = {'set': {}, 'history': [], 'spans': []}
+            entry['set'].update(record)
+            if transition:
+                entry['history'].append(transition)
+            if span_context is not None:
+                entry['spans'].append(span_context)
+            pending = len(self._pending)
+
+        self._ensure_thread()
+        if pending >= self.max_batch:
+            self._wake.set()
+
+    def flush(self):
+        """Write all pending records and counter increments to MongoDB."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                stats, self._pending_stats = self._pending_stats, {}
+            if not batch and not stats:
+                return
+
+            try:
+                self._ensure_indexes()
+            except Exception as e:
+                print(f"Error preparing message log indexes: {e}")
+                self._requeue(batch, stats)
+                return
+
+            if batch:
+                operations = [self._operation(key, entry) for key, entry in batch.items()]
+                # The batch mixes messages of many traces: link the span to each of them
+                links = [span for entry in batch.values() for span in entry['spans']]
+                try:
+                    with metrics.timed("db_log", provider="mongodb"), \
+                            tracing.span("db workflow_messages", self._span_attributes(self.collection, operations),
+                                         links=links):
+                        self.collection.bulk_write(operations, ordered=False)
+                except BulkWriteError as e:
+                    # A duplicate key means the stored version is already newer:
+                    # the update was applied before (replay) and is safely skipped.
+                    errors = [err for err in e.details.get('writeErrors', [])
+                              if err.get('code') != DUPLICATE_KEY]
+                    if errors:
+                        print(f"Error logging messages: {errors[0].get('errmsg')}")
+                except Exception as e:
+                    print(f"Error logging messages: {e}")
+                    self._requeue(batch, {})
+
+            if stats:
+                operations = [
+                    UpdateOne(
+                        {'workflow_id': workflow_id, 'hour': hour},
+                        {'$inc': dict(counters)},
+                        upsert=True
+                    )
+                    for (workflow_id, hour), counters in stats.items()
+                ]
+                try:
+                    with tracing.span("db workflow_stats", self._span_attributes(self.stats_collection, operations)):
+                        self.stats_collection.bulk_write(operations, ordered=False)
+                except Exception as e:
+                    print(f"Error updating workflow stats: {e}")
+                    self._requeue({}, stats)
+
+    def _transition(self, key, status, timestamp):
+        """
+        Validate a status change against the last known status of the message.
+
+        Returns:
+            dict: The history entry of the accepted transition, or None if the
+                  change is a duplicate or not allowed.
+        """
+        current, version = self._states.get(key, (None, 0))
+        if status not in TRANSITIONS.get(current, ()):
+            return None
+        version += 1
+        self._states[key] = (status, version)
+        self._states.move_to_end(key)
+        if len(self._states) > MAX_TRACKED:
+            self._states.popitem(last=False)
+        return {'status': status, 'version': version, 'at': timestamp}
+
+    @staticmethod
+    def _operation(key, entry):
+        """Build the upsert for one coalesced message entry."""
+        workflow_id, message_key = key
+        query = {'workflow_id': workflow_id, 'message_key': message_key}
+        update = {'$set': dict(entry['set'], updated_at=datetime.now())}
+        if entry['history']:
+            # Only move forward: a stored version >= ours fails the match, the
+            # upsert then hits the unique index and the write is dropped.
+            query['version'] = {'$not': {'$gte': entry['history'][-1]['version']}}
+            update['$push'] = {'history': {'$each': entry['history']}}
+        return UpdateOne(query, update, upsert=True)
+
+    def _count(self, record):
+        """Add the counters implied by one status update to the pending rollup."""
+        status = record.get('status')
+        if status != 'processing' and status not in TERMINAL_STATUSES:
+            return
+
+        bucket = (record['workflow_id'], hour_bucket(record['timestamp']))
+        counters = self._pending_stats.setdefault(bucket, Counter())
+        counters['received' if status == 'processing' else status] += 1
+        if status in TERMINAL_STATUSES and record.get('llm_calls'):
+            counters['llm_calls'] += record['llm_calls']
+            counters['llm_latency_ms'] += int(record.get('llm_latency_ms', 0))
+
+    def close(self):
+        """Stop the background thread and write what is left."""
+        self._running = False
+        self._wake.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    @staticmethod
+    def _span_attributes(collection, operations):
+        return {"db.system": "mongodb", "db.collection.name": getattr(collection, "name", None),
+                "db.operation.name": "bulk_write", "db.operation.batch.size": len(operations)}
+
+    def _requeue(self, batch, stats):
+        """Put a failed batch back, keeping newer updates on top."""
+        with self._lock:
+            for key, entry in batch.items():
+                newer = self._pending.get(key)
+                if newer:
+                    entry['set'].update(newer['set'])
+                    entry['history'].extend(newer['history'])
+                    entry['spans'].extend(newer['spans'])
+                self._pending[key] = entry
+            for bucket, counters in stats.items():
+                self._pending_stats.setdefault(bucket, Counter()).update(counters)
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        if 'message_key_1' in self.collection.index_information():
+            # Legacy index: message keys are only unique within one workflow
+            self.collection.drop_index('message_key_1')
+        self.collection.create_index([('workflow_id', 1), ('timestamp', -1)])
+        self.collection.create_index([('workflow_id', 1), ('message_key', 1)], unique=True)
+        self.collection.create_index([('workflow_id', 1), ('updated_at', 1)])
+        self.collection.create_index(
+            'timestamp', expireAfterSeconds=int(timedelta(days=self.retention_days).total_seconds())
+        )
+        self.stats_collection.create_index([('workflow_id', 1), ('hour', -1)], unique=True)
+        self._indexes_ready = True
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="message-logger", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Message log flush failed: {e}")
+
+
+def read_workflow_stats(database, workflow_id=None, hours=24):
+    """
+    Sum the hourly rollups of the last ``hours`` hours.
+
+    Args:
+        database: The pymongo database holding ``workflow_stats_hourly``.
+        workflow_id (str, optional): Restrict to one workflow.
+        hours (int): Size of the window.
+
+    Returns:
+        dict: Totals for received, filtered_out, posted, error, llm_calls and
+              the average LLM latency in milliseconds.
+    """
+    query = {'hour': {'$gte': hour_bucket(datetime.now(timezone.utc) - timedelta(hours=hours - 1))}}
+    if workflow_id:
+        query['workflow_id'] = workflow_id
+
+    totals = Counter()
+    for doc in database[STATS_COLLECTION].find(query, {'_id': 0, 'workflow_id': 0, 'hour': 0}):
+        totals.update(doc)
+
+    stats = {field: totals.get(field, 0) for field in ('received',) + TERMINAL_STATUSES + ('llm_calls',)}
+    stats['avg_llm_latency_ms'] = (
+        round(totals['llm_latency_ms'] / totals['llm_calls']) if totals.get('llm_calls') else 0
+    )
+    return stats
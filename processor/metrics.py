@@ -0,0 +1,200 @@
+# processor/metrics.py
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('Metrics')
+
+EXPORTER_PORT = int(os.getenv("METRICS_PORT", "0"))   # standalone exporter of worker processes, 0 disables it
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)  # seconds
+
+# Workflow label of everything measured while a pipeline processes a message.
+# Set by ``Pipeline.process``; tasks and ``asyncio.to_thread`` calls started
+# from there inherit it, so sinks, downloads and LLM clients need no argument.
+current_workflow = contextvars.ContextVar("metrics_workflow", default="")
+
+_metrics = None
+_unavailable = False
+_lock = threading.Lock()
+
+
+class Metrics:
+    def __init__(self, registry=None):
+        """
+        Prometheus metrics of the repost and tweet generation pipelines.
+
+        Workflows run in supervisor child processes. To scrape them, set
+        ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory before any process
+        starts: every process then writes its samples there and the exporters
+        (``render`` and ``start_exporter``) report the sum of all of them.
+
+        Pipeline stages are timed with an empty ``destination``; the
+        ``upload`` and ``post`` series of each sink carry its name.
+
+        Args:
+            registry (CollectorRegistry, optional): Registry to register the
+                                                    metrics in instead of the
+                                                    default one.
+        """
+        from prometheus_client import REGISTRY, Counter, Gauge, Histogram  # optional dependency
+        registry = registry or REGISTRY
+
+        self.stage_seconds = Histogram(
+            "sma_stage_duration_seconds",
+            "Time spent in a processing stage (filter, modify, dedup, download, upload, post, db_log, ...).",
+            ["workflow", "stage", "provider", "destination"],
+            buckets=LATENCY_BUCKETS, registry=registry,
+        )
+        self.messages = Counter(
+            "sma_messages", "Messages that left a pipeline, by final status.",
+            ["workflow", "status"], registry=registry,
+        )
+        self.stage_failures = Counter(
+            "sma_stage_failures", "Items a pipeline stage gave up on.",
+            ["workflow", "stage"], registry=registry,
+        )
+        self.tokens = Counter(
+            "sma_llm_tokens", "Tokens used by LLM calls.",
+            ["workflow", "provider", "model", "kind"], registry=registry,
+        )
+        self.queue_depth = Gauge(
+            "sma_queue_depth", "Items waiting in a queue.",
+            ["queue"], registry=registry, multiprocess_mode="livesum",
+        )
+        self.in_flight = Gauge(
+            "sma_pipeline_in_flight", "Messages being processed by a pipeline (handler backlog).",
+            ["workflow"], registry=registry, multiprocess_mode="livesum",
+        )
+
+
+def get_metrics():
+    """Process-wide metrics, or None when prometheus_client is not installed."""
+    global _metrics, _unavailable
+    if _metrics is None and not _unavailable:
+        with _lock:
+            if _metrics is None and not _unavailable:
+                try:
+                    _metrics = Metrics()
+                except ImportError:
+                    _unavailable = True
+                    logger.warning("prometheus_client is not installed; metrics are disabled")
+    return _metrics
+
+
+def _workflow(workflow):
+    return current_workflow.get() if workflow is None else str(workflow)
+
+
+def observe(stage, seconds, provider="", destination="", workflow=None):
+    """Record the latency of one stage run."""
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.stage_seconds.labels(_workflow(workflow), stage, provider, destination).observe(seconds)
+
+
+@contextmanager
+def timed(stage, provider="", destination="", workflow=None):
+    """Context manager recording the latency of the block, failed or not."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started, provider, destination, workflow)
+
+
+def count_message(status, workflow=None):
+    """Count a message that reached its final status."""
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.messages.labels(_workflow(workflow), status).inc()
+
+
+def count_failure(stage, workflow=None):
+    """Count an item a stage gave up on."""
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.stage_failures.labels(_workflow(workflow), stage).inc()
+
+
+def count_tokens(provider, model, usage, workflow=None):
+    """
+    Count the tokens of one LLM call.
+
+    Args:
+        provider (str): AI provider, e.g. "openai".
+        model (str): Model name.
+        usage: The ``usage`` of an OpenAI-compatible response, as an object
+               or a dict; None is ignored.
+    """
+    metrics = get_metrics()
+    if metrics is None or usage is None:
+        return
+    for field in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+        if value:
+            metrics.tokens.labels(_workflow(workflow), provider, model or "", field.split("_")[0]).inc(value)
+
+
+def set_queue_depth(queue, depth):
+    """Report the number of items waiting in ``queue``."""
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.queue_depth.labels(queue).set(depth)
+
+
+def add_in_flight(delta, workflow=None):
+    """Adjust the number of messages a pipeline is processing."""
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.in_flight.labels(_workflow(workflow)).inc(delta)
+
+
+def _registry():
+    from prometheus_client import REGISTRY, CollectorRegistry
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render():
+    """
+    Render every metric in the Prometheus text format.
+
+    Returns:
+        tuple: ``(body, content_type)``, or None when prometheus_client is
+               not installed.
+    """
+    if get_metrics() is None:
+        return None
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_exporter(port=EXPORTER_PORT, addr="0.0.0.0"):
+    """
+    Serve ``/metrics`` from a background thread, for processes that do not
+    run the web app (worker nodes, main.py).
+
+    Returns:
+        bool: Whether the exporter was started.
+    """
+    if not port or get_metrics() is None:
+        return False
+    from prometheus_client import start_http_server
+    start_http_server(port, addr=addr, registry=_registry())
+    logger.info(f"Serving metrics on {addr}:{port}")
+    return True
+
+
+def process_dead(pid):
+    """Drop the live gauges of a worker process that exited (multiprocess mode only)."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR") and get_metrics() is not None:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
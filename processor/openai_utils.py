@@ -1,16 +1,32 @@
 # processor/openai_utils.py
 import os
-import openai
 import logging
 
+from processor import metrics, tracing
+
+DEFAULT_MODEL = "gpt-4o-2024-11-20"
+
 class OpenAIUtils:
-    def __init__(self, api_key=None):
-        """Initialize OpenAI utilities."""
+    provider = "openai"
+
+    def __init__(self, api_key=None, model=None):
+        """
+        Initialize OpenAI utilities.
+
+        Calls go through one ``AsyncOpenAI`` client, so they never block the
+        event loop and share its connection pool.
+        """
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.model = model or DEFAULT_MODEL
+        self._client = None
         if not self.api_key:
             logging.warning("No OpenAI API key found! Set OPENAI_API_KEY environment variable or pass api_key parameter.")
-        else:
-            openai.api_key = self.api_key
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI  # deferred: importing openai is slow
+            self._client = AsyncOpenAI(api_key=self.api_key)
+        return self._client
     
     async def filter_content(self, text, filter_prompt):
         """
@@ -26,19 +42,22 @@ class OpenAIUtils:
         try:
             full_prompt = f"{filter_prompt}\n\nContent: {text}"
             
-            response = openai.chat.completions.create(
-                model="gpt-4o-2024-11-20",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a content filter that evaluates if content should be reposted."
-                    },
-                    {"role": "user", "content": full_prompt}
-                ],
-                max_tokens=10,
-                temperature=0
-            )
-            
+            with tracing.llm_span("filter", self.provider, self.model) as span:
+                response = await self._get_client().chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are a content filter that evaluates if content should be reposted."
+                        },
+                        {"role": "user", "content": full_prompt}
+                    ],
+                    max_tokens=10,
+                    temperature=0
+                )
+                tracing.record_usage(span, getattr(response, "usage", None))
+            metrics.count_tokens(self.provider, self.model, getattr(response, "usage", None))
+
             result = response.choices[0].message.content.strip().lower()
             return "yes" in result
         except Exception as e:
@@ -59,19 +78,22 @@ class OpenAIUtils:
         try:
             full_prompt = f"{mod_prompt}\n\nOriginal content: {text}"
             
-            response = openai.chat.completions.create(
-                model="gpt-4o-2024-11-20",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a content editor that transforms text according to instructions."
-                    },
-                    {"role": "user", "content": full_prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.7
-            )
-            
+            with tracing.llm_span("modify", self.provider, self.model) as span:
+                response = await self._get_client().chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are a content editor that transforms text according to instructions."
+                        },
+                        {"role": "user", "content": full_prompt}
+                    ],
+                    max_tokens=1000,
+                    temperature=0.7
+                )
+                tracing.record_usage(span, getattr(response, "usage", None))
+            metrics.count_tokens(self.provider, self.model, getattr(response, "usage", None))
+
             return response.choices[0].message.content.strip()
         except Exception as e:
             print(f"[OpenAIUtils] Error during content modification: {e}")
@@ -0,0 +1,214 @@
+# processor/pipeline.py
+
+import asyncio
+import logging
+import time
+
+from processor import metrics, tracing
+
+logger = logging.getLogger('Pipeline')
+
+RETRY_DELAY = 2         # seconds before the first retry of a stage, doubled on each attempt
+
+
+class StageStats:
+    __slots__ = ("processed", "dropped", "failed", "retries", "in_flight", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.processed = 0        # items that left the stage, whatever the outcome
+        self.dropped = 0          # items the stage filtered out
+        self.failed = 0           # items the stage gave up on
+        self.retries = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retries": self.retries,
+            "in_flight": self.in_flight,
+            "avg_ms": int(self.total_seconds / self.processed * 1000) if self.processed else 0,
+            "max_ms": int(self.max_seconds * 1000),
+        }
+
+
+class Stage:
+    def __init__(self, name, run, concurrency=None, attempts=1, retry_delay=RETRY_DELAY, required=True,
+                 provider=""):
+        """
+        One step of a pipeline.
+
+        Args:
+            name (str): Stage name, used in logs, metrics and ``context.timings``.
+            run (callable): Coroutine function called with the context.
+                            Returning False drops the item; any other value
+                            passes it on.
+            concurrency (int, optional): Items in the stage at once
+                                         (unbounded when None).
+            attempts (int): Tries before the stage gives up on an item.
+            retry_delay (float): Seconds before the first retry, doubled
+                                 on each further attempt.
+            required (bool): Whether a failure stops the item; optional
+                             stages are logged and skipped over.
+            provider (str): Service the stage calls (AI provider, platform),
+                            used as a metrics label.
+        """
+        self.name = name
+        self.run = run
+        self.concurrency = concurrency
+        self.attempts = max(1, attempts)
+        self.retry_delay = retry_delay
+        self.required = required
+        self.provider = provider
+        self.stats = StageStats()
+        self._slots = None
+
+    def _limit(self):
+        # Created lazily so the semaphore binds to the running loop
+        if self.concurrency and self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    async def __call__(self, context):
+        slots = self._limit()
+        if slots is None:
+            return await self._attempt(context)
+        async with slots:
+            return await self._attempt(context)
+
+    async def _attempt(self, context):
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return await self.run(context)
+            except Exception as e:
+                if attempt == self.attempts:
+                    raise
+                delay = self.retry_delay * 2 ** (attempt - 1)
+                self.stats.retries += 1
+                logger.warning(f"Stage {self.name} failed for {context.key} ({e}); retry {attempt} in {delay}s")
+                await asyncio.sleep(delay)
+
+
+class Pipeline:
+    def __init__(self, stages, name="pipeline", cleanup=(), workflow=None):
+        """
+        Async stage graph shared by every repost and generation workflow.
+
+        An item (a ``PipelineContext``) runs through the stages in order,
+        typically sources -> prefilter -> LLM -> dedup -> media -> sinks.
+        Each stage has its own concurrency limit and retry policy, so slow
+        LLM calls or downloads only queue up behind their own limit while
+        other items keep moving, and every stage reports the same metrics.
+
+        Args:
+            stages (list): ``Stage`` objects; None entries are skipped, so
+                           presets can leave out unconfigured stages.
+            name (str): Name used in logs.
+            cleanup (iterable): Coroutine functions called with the context
+                                once it is done, whatever the outcome.
+            workflow (str, optional): Workflow label of the Prometheus
+                                      metrics; defaults to ``name``.
+        """
+        self.stages = [stage for stage in stages if stage is not None]
+        self.name = name
+        self.cleanup = list(cleanup)
+        self.workflow = str(workflow) if workflow else name
+
+    @property
+    def stage_names(self):
+        return [stage.name for stage in self.stages]
+
+    async def process(self, context):
+        """
+        Run one item through every stage, inside the trace of its key
+        (``context.trace_id``) with a child span per stage.
+
+        Returns:
+            str: The final ``context.status``: "done" (or what the last stage
+                 set, e.g. "posted"), "filtered_out" when a stage dropped it
+                 (the reason is in ``context.log``), or "error".
+        """
+        token = metrics.current_workflow.set(self.workflow)
+        metrics.add_in_flight(1)
+        with tracing.message_span(context.key, workflow=self.workflow, attributes={"pipeline": self.name}) as trace_id:
+            context.trace_id = context.trace_id or trace_id
+            try:
+                for stage in self.stages:
+                    if not await self._run_stage(stage, context):
+                        break
+                else:
+                    if context.status == "processing":
+                        context.status = "done"
+            finally:
+                for cleanup in self.cleanup:
+                    try:
+                        await cleanup(context)
+                    except Exception as e:
+                        logger.error(f"Cleanup of {context.key} failed: {e}")
+                tracing.set_attributes({"message.status": context.status})
+                metrics.add_in_flight(-1)
+                metrics.count_message(context.status)
+                metrics.current_workflow.reset(token)
+        return context.status
+
+    async def _run_stage(self, stage, context):
+        stats = stage.stats
+        stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"stage {stage.name}", {"stage": stage.name, "provider": stage.provider or None}):
+                result = await stage(context)
+        except Exception as e:
+            if not stage.required:
+                logger.warning(f"[{self.name}] Optional stage {stage.name} failed for {context.key}: {e}")
+                context.errors[stage.name] = str(e)
+                return True
+            logger.error(f"[{self.name}] Stage {stage.name} failed for {context.key}: {e}")
+            stats.failed += 1
+            metrics.count_failure(stage.name)
+            context.errors[stage.name] = str(e)
+            context.status = "error"
+            return False
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.in_flight -= 1
+            stats.processed += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            context.timings[stage.name] = context.timings.get(stage.name, 0) + elapsed
+            metrics.observe(stage.name, elapsed, provider=stage.provider)
+
+        if result is False:
+            stats.dropped += 1
+            if context.status == "processing":
+                context.status = "filtered_out"
+            logger.info(f"[{self.name}] {context.key} dropped by {stage.name} ({context.status})")
+            return False
+        return True
+
+    async def run(self, queue, workers=1):
+        """
+        Process items from an ``asyncio.Queue`` forever.
+
+        Args:
+            queue (asyncio.Queue): Source of ``PipelineContext`` items.
+            workers (int): Items processed at once.
+        """
+        async def worker():
+            while True:
+                context = await queue.get()
+                try:
+                    await self.process(context)
+                except Exception as e:
+                    logger.error(f"[{self.name}] Error processing {context.key}: {e}")
+                finally:
+                    queue.task_done()
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    def stats(self):
+        """Per-stage metrics, in stage order."""
+        return {stage.name: stage.stats.as_dict() for stage in self.stages}
@@ -0,0 +1,152 @@
+# processor/pipeline_context.py
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+from processor import tracing
+
+logger = logging.getLogger('PipelineContext')
+
+ORIGINAL_MESSAGE_FILE = "original_message.txt"
+FULL_INPUT_FILE = "full_input_to_gpt.txt"
+TWEET_TEXT_FILE = "tweet_text.txt"
+
+
+class PipelineContext:
+    def __init__(self, key, text, media_paths=None, dir_name=None, history=None, messages=None, source=None):
+        """
+        State of one message as it moves through the tweet generation stages.
+
+        Stages read and fill the context in memory instead of passing files
+        to each other. Artifacts (the original message, the aggregated GPT
+        input and the tweet text) are still written to ``dir_name`` for the
+        duplicate check and for review, but in background threads; ``flush``
+        waits for them. With a ``history`` repository the whole record is
+        also saved to the indexed history store.
+
+        The same object is the item a ``Pipeline`` passes between its stages.
+
+        Args:
+            key (str): Identifier of the message or album.
+            text (str): The original message text.
+            media_paths (list, optional): Downloaded media files.
+            dir_name (str, optional): Directory artifacts are written to;
+                                      nothing is written when omitted.
+            history (TweetHistoryRepository, optional): History store.
+            messages (list, optional): Source messages whose media is still
+                                       to be downloaded.
+            source (str, optional): Channel or account the item came from.
+        """
+        self.key = str(key)
+        self.text = text or ""
+        self.media_paths = list(media_paths or [])
+        self.dir_name = dir_name
+        self.history = history
+        self.messages = list(messages or [])
+        self.source = source
+
+        self.media_analyses = []   # (file name, analysis) in media order
+        self.link_analyses = []    # (url, analysis) in message order
+        self.link_media = []       # stored media of scraped links, released when the message is done
+        self.tweet_text = ""
+        self.filter_result = None
+        self.posted_to = []       # sinks the tweet was published to
+        self.created_at = datetime.now()
+
+        self.status = "processing"
+        self.errors = {}           # stage -> error message
+        self.timings = {}          # stage -> seconds spent
+        self.log = {}              # extra fields for the message log record
+        self.trace_id = None       # set by the pipeline when tracing is on
+
+        self._writes = []
+
+    @property
+    def output_text(self):
+        """Text to publish: the rewritten text, or the original one."""
+        return self.tweet_text or self.text
+
+    def add_media_analysis(self, path, analysis):
+        self.media_analyses.append((os.path.basename(path), analysis))
+
+    def add_link_analysis(self, url, analysis):
+        self.link_analyses.append((url, analysis))
+
+    def aggregated_content(self):
+        """The original message with every media and link analysis, as sent to GPT."""
+        parts = ["----- Original Message -----\n", self.text, "\n----- End of Original Message -----\n\n"]
+        if self.media_analyses:
+            for name, analysis in self.media_analyses:
+                parts.append(f"\n----- Analysis for media file: {name} -----\n")
+                parts.append(analysis)
+                parts.append(f"\n----- End of analysis for media file: {name} -----\n")
+        else:
+            parts.append("\nNo media files attached.\n")
+        if self.link_analyses:
+            for url, analysis in self.link_analyses:
+                parts.append(f"\n----- Analysis for link: {url} -----\n")
+                parts.append(analysis)
+                parts.append(f"\n----- End of analysis for link: {url} -----\n")
+        else:
+            parts.append("\nNo URLs found in the original message.\n")
+        return "".join(parts)
+
+    def persist(self, name, content):
+        """Write an artifact to ``dir_name`` in a background thread."""
+        if not self.dir_name:
+            return
+        path = os.path.join(self.dir_name, name)
+        self._writes.append(asyncio.ensure_future(asyncio.to_thread(_write_text, path, content)))
+
+    async def flush(self):
+        """Wait for the artifacts persisted so far; errors are logged, not raised."""
+        writes, self._writes = self._writes, []
+        for result in await asyncio.gather(*writes, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Could not persist an artifact of {self.key}: {result}")
+
+    def media_details(self):
+        """Extension and size of each media file, as compared by the duplicate check."""
+        details = []
+        for path in self.media_paths:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            details.append({"file_extension": os.path.splitext(path)[1], "file_size": size})
+        return details
+
+    def to_record(self):
+        return {
+            "_id": self.key,
+            "text": self.text,
+            "media": self.media_details(),
+            "media_analyses": [{"file": name, "analysis": analysis} for name, analysis in self.media_analyses],
+            "link_analyses": [{"url": url, "analysis": analysis} for url, analysis in self.link_analyses],
+            "tweet_text": self.tweet_text,
+            "filter_result": self.filter_result,
+            "posted_to": self.posted_to,
+            "status": self.status,
+            "trace_id": self.trace_id,
+            "created_at": self.created_at,
+        }
+
+    async def save(self):
+        """Flush the artifacts and record the message in the history store, if any."""
+        await self.flush()
+        if self.history is None:
+            return
+        try:
+            with tracing.span("db tweet_history", {"db.system": "mongodb", "db.collection.name": "tweet_history",
+                                                   "db.operation.name": "update"}):
+                await self.history.save(self.to_record())
+        except Exception as e:
+            logger.error(f"Could not save {self.key} to the history store: {e}")
+
+
+def _write_text(path, content):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
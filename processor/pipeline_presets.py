@@ -0,0 +1,116 @@
+# processor/pipeline_presets.py
+
+import logging
+
+from processor import pipeline_stages as stages
+from processor.pipeline import Pipeline
+
+logger = logging.getLogger('Pipeline')
+
+# Stage order of each workflow. Stages whose settings are missing from the
+# workflow configuration (no filter prompt, duplicate_check off, ...) are
+# left out when the pipeline is built.
+PRESETS = {
+    # LiveRepostWorkflow: Telegram channels reposted as messages arrive
+    "live_repost": ["prefilter", "dedup", "filter", "modify", "download", "post"],
+    # HistoryRepostWorkflow: a channel's history reposted in order
+    "history_repost": ["prefilter", "dedup", "filter", "modify", "download", "post"],
+    # Processor: sources hand over text and already downloaded media
+    "processor": ["prefilter", "filter", "modify", "post"],
+    # main.py: tweets generated from the analysis of a message, its media and links
+    "tweet_generation": ["download", "analyze", "generate", "classify", "history_dedup", "post"],
+}
+
+
+def _prefilter(config, services):
+    options = config.get("prefilter")
+    return stages.prefilter(**options) if options else None
+
+
+def _dedup(config, services):
+    recent = services.get("recent")
+    return stages.dedup(recent) if config.get("duplicate_check") and recent is not None else None
+
+
+def _filter(config, services):
+    prompt = config.get("filter_prompt")
+    return stages.llm_filter(services["ai"], prompt) if prompt else None
+
+
+def _modify(config, services):
+    prompt = config.get("mod_prompt")
+    return stages.llm_rewrite(services["ai"], prompt) if prompt else None
+
+
+def _download(config, services):
+    downloads = services.get("downloads")
+    return stages.download(downloads, progress=services.get("progress")) if downloads else None
+
+
+def _post(config, services):
+    recent = services.get("recent") if config.get("duplicate_check") else None
+    return stages.publish(services["router"], recent=recent)
+
+
+STAGE_FACTORIES = {
+    "prefilter": _prefilter,
+    "dedup": _dedup,
+    "filter": _filter,
+    "modify": _modify,
+    "download": _download,
+    "post": _post,
+}
+
+
+def build_pipeline(preset, config, services, factories=None, name=None):
+    """
+    Build the pipeline of a workflow from a preset and its configuration.
+
+    The optional ``pipeline`` section of the configuration can replace the
+    preset or its stage list and tune each stage::
+
+        {"pipeline": {"preset": "live_repost",
+                      "concurrency": {"filter": 4, "download": 2},
+                      "attempts": {"modify": 3}}}
+
+    Args:
+        preset (str): Default preset name, see ``PRESETS``.
+        config (dict): Workflow configuration (prompts, duplicate_check,
+                       preserve_files, prefilter options, pipeline section).
+        services (dict): Objects the stages use: ``ai``, ``router``,
+                         ``downloads``, ``media_store``, ``recent`` and
+                         ``progress``.
+        factories (dict, optional): Extra or replacement stage factories,
+                                    called with ``(config, services)``.
+        name (str, optional): Pipeline name used in logs.
+
+    Returns:
+        Pipeline: The assembled pipeline.
+    """
+    overrides = config.get("pipeline") or {}
+    preset = overrides.get("preset", preset)
+    stage_names = overrides.get("stages") or PRESETS[preset]
+    available = dict(STAGE_FACTORIES, **(factories or {}))
+
+    built = []
+    for stage_name in stage_names:
+        factory = available.get(stage_name)
+        if factory is None:
+            raise ValueError(f"Unknown pipeline stage: {stage_name}")
+        stage = factory(config, services)
+        if stage is None:
+            continue
+        if stage_name in overrides.get("concurrency", {}):
+            stage.concurrency = overrides["concurrency"][stage_name]
+        if stage_name in overrides.get("attempts", {}):
+            stage.attempts = max(1, overrides["attempts"][stage_name])
+        built.append(stage)
+
+    cleanup = []
+    media_store = services.get("media_store")
+    if media_store is not None and not config.get("preserve_files"):
+        cleanup.append(stages.release_media(media_store))
+
+    pipeline = Pipeline(built, name=name or preset, cleanup=cleanup, workflow=config.get("_id"))
+    logger.info(f"Built {pipeline.name} pipeline: {' -> '.join(pipeline.stage_names)}")
+    return pipeline
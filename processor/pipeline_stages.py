@@ -0,0 +1,157 @@
+# processor/pipeline_stages.py
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from processor.pipeline import Stage
+
+logger = logging.getLogger('Pipeline')
+
+LLM_CONCURRENCY = int(os.getenv("PIPELINE_LLM_CONCURRENCY", "8"))  # AI provider calls per stage
+RECENT_KEYS = 10000           # message keys remembered by the dedup stage
+
+
+class RecentKeys:
+    def __init__(self, max_size=RECENT_KEYS):
+        """Bounded set of recently posted message keys, oldest evicted first."""
+        self.max_size = max_size
+        self._keys = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+
+async def _timed_llm_call(context, coroutine):
+    """Await an AI provider call and add its latency to the message log record."""
+    started = time.perf_counter()
+    try:
+        return await coroutine
+    finally:
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        context.log["llm_calls"] = context.log.get("llm_calls", 0) + 1
+        context.log["llm_latency_ms"] = context.log.get("llm_latency_ms", 0) + elapsed_ms
+
+
+def prefilter(min_length=0, blocked_words=(), concurrency=None):
+    """
+    Cheap filtering before any LLM call: drops items without media whose
+    text is shorter than ``min_length``, and items containing a blocked word.
+    """
+    blocked = [word.lower() for word in blocked_words if word]
+
+    async def run(context):
+        text = context.text.lower()
+        reason = None
+        if len(context.text.strip()) < min_length and not (context.messages or context.media_paths):
+            reason = "too short"
+        elif any(word in text for word in blocked):
+            reason = "blocked word"
+        if reason:
+            context.status = "filtered_out"
+            context.log["filter_reason"] = reason
+            return False
+        return True
+
+    return Stage("prefilter", run, concurrency=concurrency)
+
+
+def dedup(recent, concurrency=None):
+    """Drop items whose key was already posted (see ``publish``)."""
+    async def run(context):
+        if context.key in recent:
+            context.status = "filtered_out"
+            context.log["filter_reason"] = "duplicate"
+            return False
+        return True
+
+    return Stage("dedup", run, concurrency=concurrency)
+
+
+def llm_filter(ai, prompt, concurrency=LLM_CONCURRENCY, attempts=1):
+    """
+    Ask the AI provider whether the item should be posted. Provider errors
+    let the item through, so an outage does not silently drop content.
+    """
+    async def run(context):
+        passes = await _timed_llm_call(context, ai.filter_content(context.text, prompt))
+        context.filter_result = passes
+        context.log["filter_result"] = passes
+        if not passes:
+            context.status = "filtered_out"
+            return False
+        return True
+
+    return Stage("filter", run, concurrency=concurrency, attempts=attempts, required=False,
+                 provider=getattr(ai, "provider", ""))
+
+
+def llm_rewrite(ai, prompt, concurrency=LLM_CONCURRENCY, attempts=1):
+    """Rewrite the text with the AI provider; the original text is kept on errors."""
+    async def run(context):
+        context.tweet_text = await _timed_llm_call(context, ai.modify_content(context.text, prompt))
+        context.log["modified_text"] = context.tweet_text
+
+    return Stage("modify", run, concurrency=concurrency, attempts=attempts, required=False,
+                 provider=getattr(ai, "provider", ""))
+
+
+def download(downloads, progress=None, concurrency=None, attempts=1):
+    """
+    Download the media of ``context.messages`` through a ``DownloadManager``.
+
+    Args:
+        progress (callable, optional): Called with the item key; returns the
+                                       progress callback of its downloads.
+    """
+    async def run(context):
+        if not context.messages:
+            return True
+        paths = await downloads.download_all(
+            context.messages, name=context.key, progress=progress(context.key) if progress else None
+        )
+        context.media_paths.extend(paths)
+        return True
+
+    return Stage("download", run, concurrency=concurrency, attempts=attempts, provider="telegram")
+
+
+def publish(router, recent=None, concurrency=None):
+    """
+    Publish to every destination of a ``SinkRouter`` (which retries per sink)
+    and remember the key in ``recent`` once any destination succeeded.
+    """
+    async def run(context):
+        results = await router.publish(context.output_text, context.media_paths)
+        context.posted_to = router.succeeded(results)
+        context.log["posted_to"] = context.posted_to
+        if context.posted_to or not results:
+            context.status = "posted"
+            if recent is not None and context.posted_to:
+                recent.add(context.key)
+        else:
+            context.status = "error"
+            context.log["error"] = "; ".join(f"{name}: {result}" for name, result in results.items())
+        return True
+
+    return Stage("post", run, concurrency=concurrency)
+
+
+def release_media(media_store):
+    """Cleanup hook handing downloaded media back to the media store."""
+    async def cleanup(context):
+        if context.media_paths:
+            await asyncio.to_thread(media_store.release, context.media_paths)
+
+    return cleanup
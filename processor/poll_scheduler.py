@@ -0,0 +1,132 @@
+# processor/poll_scheduler.py
+
+import random
+import time
+
+MIN_INTERVAL = 60            # seconds, the fastest any source is polled
+MAX_INTERVAL = 6 * 3600      # seconds, the slowest (quiet or dormant sources)
+ITEMS_PER_POLL = 0.5         # aim for one new item every other poll
+SMOOTHING = 0.3              # EWMA weight of the latest observation
+JITTER = 0.2                 # +/- fraction applied to every delay
+MAX_BACKOFF = 3600           # seconds, cap of the error backoff
+
+
+class SourceState:
+    __slots__ = ("rate", "interval", "last_poll", "failures")
+
+    def __init__(self, rate, interval):
+        self.rate = rate            # smoothed new items per second
+        self.interval = interval    # current polling interval without jitter
+        self.last_poll = None       # clock time of the last successful poll
+        self.failures = 0
+
+
+class AdaptivePollScheduler:
+    def __init__(self, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 items_per_poll=ITEMS_PER_POLL, smoothing=SMOOTHING, jitter=JITTER,
+                 clock=time.monotonic, rng=random.random):
+        """
+        Per-source polling intervals that follow each source's posting rate.
+
+        After every poll the number of new items is folded into an
+        exponentially weighted estimate of the source's rate, and the next
+        interval is chosen so that a poll finds about ``items_per_poll`` new
+        items: busy accounts are polled every ``min_interval``, dormant ones
+        drift towards ``max_interval``. New sources start out as busy and slow
+        down one poll at a time, so a single quiet poll never parks them.
+        Delays are jittered so that sources added together do not stay in
+        lockstep, and failing sources back off exponentially.
+
+        Args:
+            min_interval (float): Shortest interval in seconds.
+            max_interval (float): Longest interval in seconds.
+            items_per_poll (float): New items a poll should find on average.
+            smoothing (float): Weight of the latest observation in the rate.
+            jitter (float): Random +/- fraction applied to every delay.
+            clock (callable): Monotonic time source.
+            rng (callable): Returns floats in [0, 1).
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.items_per_poll = items_per_poll
+        self.smoothing = smoothing
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng
+        self.sources = {}
+
+    def add(self, key, rate=None):
+        """
+        Register a source.
+
+        Args:
+            key: Source identifier.
+            rate (float, optional): Previously observed rate, to resume adapting.
+
+        Returns:
+            float: Initial delay, spread over the first interval.
+        """
+        state = self.sources.get(key)
+        if state is None:
+            state = self.sources[key] = self._new_state(rate)
+        return self.rng() * state.interval
+
+    def remove(self, key):
+        self.sources.pop(key, None)
+
+    def rate(self, key):
+        """Smoothed items per second of a source, or None if unknown."""
+        state = self.sources.get(key)
+        return state.rate if state else None
+
+    def record(self, key, new_items):
+        """
+        Fold a successful poll into the source's rate.
+
+        Args:
+            key: Source identifier.
+            new_items (int): Items found that were not seen before.
+
+        Returns:
+            float: Seconds to wait before polling the source again.
+        """
+        state = self._state(key)
+        now = self.clock()
+        state.failures = 0
+        if state.last_poll is not None:
+            observed = new_items / max(now - state.last_poll, 1e-6)
+            state.rate = self.smoothing * observed + (1 - self.smoothing) * state.rate
+            state.interval = self._interval_for(state.rate)
+        state.last_poll = now
+        return self._jittered(state.interval)
+
+    def record_failure(self, key):
+        """
+        Register a failed poll.
+
+        Returns:
+            float: Backoff delay before the next attempt.
+        """
+        state = self._state(key)
+        state.failures += 1
+        backoff = min(state.interval * (2 ** state.failures), max(MAX_BACKOFF, state.interval))
+        return self._jittered(backoff)
+
+    def _state(self, key):
+        state = self.sources.get(key)
+        if state is None:
+            state = self.sources[key] = self._new_state()
+        return state
+
+    def _new_state(self, rate=None):
+        if rate is None:
+            rate = self.items_per_poll / self.min_interval
+        return SourceState(rate, self._interval_for(rate))
+
+    def _interval_for(self, rate):
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.items_per_poll / rate))
+
+    def _jittered(self, delay):
+        return delay * (1 + self.jitter * (2 * self.rng() - 1))
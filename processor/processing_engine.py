@@ -9,6 +9,10 @@ from processor.twitter_utils import TwitterPoster
 from processor.instagram_utils import InstagramReader
 from processor.queue_manager import QueueManager
 from processor.openai_utils import OpenAIUtils
+from processor.pipeline import Stage
+from processor.pipeline_context import PipelineContext
+from processor.pipeline_presets import build_pipeline
+from processor.sinks import SinkRouter, build_sinks
 
 class Processor:
     def __init__(self, workflow_config):
@@ -26,6 +30,9 @@ class Processor:
         self.instagram_reader = InstagramReader()
         self.queue_manager = QueueManager() if self.mode == 'queue' else None
         self.openai_utils = OpenAIUtils()
+        self.router = None  # built once the Telegram client is connected
+        self.pipeline = None  # prefilter -> filter -> modify -> post, built with the router
+        self.workflow_config = workflow_config
 
         self.running = False
 
@@ -36,32 +43,40 @@ class Processor:
             self.telegram_listener = TelegramListener(telegram_channels, self)
             await self.telegram_listener.connect()
 
+        self.router = SinkRouter(build_sinks(
+            self.destinations,
+            telegram_client=self.telegram_listener.client if self.telegram_listener else None,
+            twitter_poster=self.twitter_poster,
+            instagram_clients=self.instagram_reader.destination_clients,
+        ))
+        # In queue mode the last stage hands the post to the QueueManager
+        factories = {"post": self._queue_stage} if self.mode == 'queue' and self.queue_manager else None
+        self.pipeline = build_pipeline("processor", self.workflow_config, {
+            "ai": self.openai_utils,
+            "router": self.router,
+        }, factories=factories, name=f"processor:{self.workflow_id}")
+
+    def _queue_stage(self, config, services):
+        async def enqueue(context):
+            self.queue_manager.add_to_queue(context.output_text, context.media_paths, self._post_immediate)
+            context.status = "queued"
+        return Stage("queue", enqueue)
+
     async def handle_new_content(self, text, media_paths, source_type, source_name):
         """Handle incoming content from a source."""
-        # Optionally apply OpenAI filter
-        if self.filter_prompt:
-            passed = await self.openai_utils.filter_content(text, self.filter_prompt)
-            if not passed:
-                print(f"[Workflow {self.workflow_id}] Content filtered out.")
-                return
-
-        # Optionally modify text
-        if self.mod_prompt:
-            text = await self.openai_utils.modify_content(text, self.mod_prompt)
-
-        # Send to destinations
-        if self.mode == 'immediate':
-            await self._post_immediate(text, media_paths)
-        elif self.mode == 'queue' and self.queue_manager:
-            self.queue_manager.add_to_queue(text, media_paths, self._post_immediate)
+        context = PipelineContext(f"{source_name}_{time.time_ns()}", text, media_paths, source=source_name)
+        status = await self.pipeline.process(context)
+        if status == "filtered_out":
+            print(f"[Workflow {self.workflow_id}] Content filtered out.")
+        elif status == "error":
+            print(f"[Workflow {self.workflow_id}] Failed to post to: {context.log.get('error') or context.errors}")
 
     async def _post_immediate(self, text, media_paths):
-        """Immediately post content to all destinations."""
-        for dest in self.destinations:
-            if dest == 'twitter':
-                await self.twitter_poster.post(text, media_paths)
-            elif dest == 'telegram' and self.telegram_listener:
-                await self.telegram_listener.post_to_channel(text, media_paths)
+        """Immediately post content to all destinations concurrently."""
+        results = await self.router.publish(text, media_paths)
+        failed = [name for name, result in results.items() if isinstance(result, Exception)]
+        if failed:
+            print(f"[Workflow {self.workflow_id}] Failed to post to: {', '.join(failed)}")
 
     async def run(self):
         """Main processor loop."""
@@ -6,6 +6,8 @@ import threading
 from collections import deque
 from datetime import datetime
 
+from processor import metrics
+
 class QueueManager:
     def __init__(self, interval_seconds=60, mode="simple", ai_grade_callback=None, threshold=70):
         """
@@ -35,6 +37,7 @@ class QueueManager:
             post_callback (coroutine): Async function to post content.
         """
         self.queue.append((text, media_paths, post_callback))
+        metrics.set_queue_depth("queue_manager", len(self.queue))
         if not self.running:
             self.start_worker()
 
@@ -50,6 +53,7 @@ class QueueManager:
         for item_date, text, media_paths in history_items:
             if start_date is None or item_date >= start_date:
                 self.queue.append((text, media_paths, post_callback))
+        metrics.set_queue_depth("queue_manager", len(self.queue))
         if not self.running and self.queue:
             self.start_worker()
 
@@ -76,6 +80,7 @@ class QueueManager:
         while self.running:
             if self.queue:
                 text, media_paths, post_callback = self.queue.popleft()
+                metrics.set_queue_depth("queue_manager", len(self.queue))
                 try:
                     if self.mode == "simple":
                         await post_callback(text, media_paths)
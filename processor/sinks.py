@@ -0,0 +1,315 @@
+# processor/sinks.py
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from processor import metrics, tracing
+
+logger = logging.getLogger('SinkRouter')
+
+MAX_ATTEMPTS = 3        # publish / prepare attempts per sink
+RETRY_DELAY = 2         # seconds before the first retry, doubled on each attempt
+MEDIA_CACHE_SIZE = 1000 # prepared media handles kept in memory
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.webm', '.avi', '.mkv')
+
+
+def is_video(path):
+    return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+
+class PreparedMediaCache:
+    def __init__(self, max_size=MEDIA_CACHE_SIZE):
+        """
+        Media already uploaded to a platform, shared by every sink of that platform.
+
+        Entries are keyed by the sink's ``media_namespace`` and the file's path,
+        size and mtime, and expire after the sink's ``media_ttl``. Concurrent
+        requests for the same file share one upload.
+
+        Args:
+            max_size (int): Maximum number of cached handles.
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (handle, expires_at)
+        self._inflight = {}            # key -> asyncio.Future
+
+    @staticmethod
+    def key(namespace, path):
+        stat = os.stat(path)
+        return (namespace, os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    async def get_or_prepare(self, sink, path):
+        """Return the cached handle for ``path`` or upload it through ``sink``."""
+        key = self.key(sink.media_namespace, path)
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry[0]
+
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            handle = await sink.upload(path)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(handle)
+        self._entries[key] = (handle, time.monotonic() + sink.media_ttl)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return handle
+
+
+class Sink:
+    """
+    A publishing destination.
+
+    Publishing runs in two phases: ``prepare`` turns local media files into
+    platform handles (uploads, media ids), ``publish`` posts the text with the
+    prepared media. Subclasses implement ``prepare_file`` and ``publish``.
+    """
+
+    name = "sink"
+    platform = "sink"        # metrics label shared by every sink of a platform
+    media_namespace = None   # sinks sharing a namespace reuse each other's uploads
+    media_ttl = 3600         # seconds a prepared handle stays valid
+    min_interval = 0         # minimum seconds between two publishes (rate limit)
+    max_attempts = MAX_ATTEMPTS
+
+    def __init__(self):
+        self._rate_lock = asyncio.Lock()
+        self._last_publish = 0.0
+
+    async def prepare(self, media_paths, cache=None):
+        """Prepare all media files concurrently, reusing cached handles."""
+        if not media_paths:
+            return []
+        if cache is None or self.media_namespace is None:
+            return list(await asyncio.gather(*(self.upload(p) for p in media_paths)))
+        return list(await asyncio.gather(*(cache.get_or_prepare(self, p) for p in media_paths)))
+
+    async def upload(self, path):
+        """``prepare_file`` in a trace span recording the file size."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        with tracing.span("upload", {"destination": self.name, "file.size": size}):
+            return await self.prepare_file(path)
+
+    async def prepare_file(self, path):
+        """Turn one local file into a platform handle. Defaults to the path itself."""
+        return path
+
+    async def publish(self, text, prepared):
+        """Post ``text`` with the prepared media handles."""
+        raise NotImplementedError
+
+    async def throttle(self):
+        """Wait until the sink's rate limit allows another publish."""
+        async with self._rate_lock:
+            wait = self._last_publish + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_publish = time.monotonic()
+
+
+class TelegramSink(Sink):
+    platform = "telegram"
+    media_ttl = 23 * 3600
+
+    def __init__(self, client, channel, parse_mode='md'):
+        """
+        Post to a Telegram channel.
+
+        Files are uploaded once per client with ``upload_file`` and the handles
+        are reused for every channel the client posts to.
+
+        Args:
+            client: A connected Telethon ``TelegramClient``.
+            channel: Target channel username or id.
+            parse_mode (str): Telethon parse mode for the caption.
+        """
+        super().__init__()
+        self.client = client
+        self.channel = channel
+        self.parse_mode = parse_mode
+        self.name = f"telegram:{channel}"
+        self.media_namespace = ("telegram", id(client))
+
+    async def prepare_file(self, path):
+        return await self.client.upload_file(path)
+
+    async def publish(self, text, prepared):
+        if prepared:
+            files = prepared[0] if len(prepared) == 1 else prepared
+            return await self.client.send_file(self.channel, files, caption=text, parse_mode=self.parse_mode)
+        return await self.client.send_message(self.channel, text, parse_mode=self.parse_mode)
+
+
+class TwitterSink(Sink):
+    name = "twitter"
+    platform = "twitter"
+    media_ttl = 23 * 3600    # media ids expire after 24 hours
+    min_interval = 1
+
+    def __init__(self, poster=None):
+        """
+        Post to Twitter/X through a ``TwitterPoster``.
+
+        Args:
+            poster (TwitterPoster, optional): Authenticated poster; built from
+                                              the environment when omitted.
+        """
+        super().__init__()
+        if poster is None:
+            from processor.twitter_utils import TwitterPoster
+            poster = TwitterPoster()
+        self.poster = poster
+        self.media_namespace = ("twitter", id(poster))
+
+    async def prepare_file(self, path):
+        return await self.poster.upload_media(path)
+
+    async def publish(self, text, prepared):
+        return await self.poster.create_tweet(text, prepared)
+
+
+class InstagramSink(Sink):
+    platform = "instagram"
+    min_interval = 10
+
+    def __init__(self, client, story=False):
+        """
+        Post to an Instagram account, as a feed post or a story.
+
+        Args:
+            client: A logged-in instagrapi ``Client``.
+            story (bool): Upload the first media file as a story instead.
+        """
+        super().__init__()
+        self.client = client
+        self.story = story
+        username = getattr(client, "username", None) or id(client)
+        self.name = f"instagram{'_story' if story else ''}:{username}"
+
+    async def publish(self, text, prepared):
+        if not prepared:
+            raise ValueError("Instagram posts need at least one media file")
+        if self.story:
+            return await asyncio.to_thread(self.client.story_upload, prepared[0])
+        if len(prepared) > 1:
+            return await asyncio.to_thread(self.client.album_upload, prepared, text)
+        if is_video(prepared[0]):
+            return await asyncio.to_thread(self.client.video_upload, prepared[0], text)
+        return await asyncio.to_thread(self.client.photo_upload, prepared[0], text)
+
+
+class SinkRouter:
+    def __init__(self, sinks, cache=None, retry_delay=RETRY_DELAY):
+        """
+        Fan a message out to several sinks concurrently.
+
+        Every sink prepares and publishes independently, so one message costs
+        the latency of the slowest destination rather than the sum, and a
+        failing destination never blocks the others.
+
+        Args:
+            sinks (list): The ``Sink`` instances to publish to.
+            cache (PreparedMediaCache, optional): Shared prepared-media cache.
+            retry_delay (float): Delay before the first retry of a sink.
+        """
+        self.sinks = list(sinks)
+        self.cache = cache if cache is not None else PreparedMediaCache()
+        self.retry_delay = retry_delay
+
+    async def publish(self, text, media_paths=None):
+        """
+        Publish to every sink.
+
+        Returns:
+            dict: ``{sink.name: result}``, where the result is the platform's
+                  response or the exception of the last failed attempt.
+        """
+        media_paths = list(media_paths or [])
+        results = await asyncio.gather(
+            *(self._deliver(sink, text, media_paths) for sink in self.sinks),
+            return_exceptions=True
+        )
+        return {sink.name: result for sink, result in zip(self.sinks, results)}
+
+    @staticmethod
+    def succeeded(results):
+        """Names of the sinks a ``publish`` call reached."""
+        return [name for name, result in results.items() if not isinstance(result, BaseException)]
+
+    async def _deliver(self, sink, text, media_paths):
+        with metrics.timed("upload", provider=sink.platform, destination=sink.name):
+            prepared = await self._with_retries(sink, "prepare", lambda: sink.prepare(media_paths, self.cache))
+
+        async def publish():
+            await sink.throttle()
+            return await sink.publish(text, prepared)
+
+        with metrics.timed("post", provider=sink.platform, destination=sink.name), \
+                tracing.span("publish", {"destination": sink.name, "media.count": len(prepared)}):
+            result = await self._with_retries(sink, "publish", publish)
+        logger.info(f"Published to {sink.name}")
+        return result
+
+    async def _with_retries(self, sink, phase, call):
+        for attempt in range(sink.max_attempts):
+            try:
+                return await call()
+            except Exception as e:
+                if attempt + 1 >= sink.max_attempts:
+                    logger.error(f"{phase} failed for {sink.name} after {attempt + 1} attempts: {e}")
+                    raise
+                delay = self.retry_delay * (2 ** attempt)
+                logger.warning(f"{phase} failed for {sink.name} ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+
+def build_sinks(destinations, telegram_client=None, twitter_poster=None, instagram_clients=()):
+    """
+    Build sinks for workflow destinations.
+
+    Args:
+        destinations (list): ``{"type": ..., "name": ...}`` dicts or plain type
+                             strings (``"twitter"``).
+        telegram_client: Telethon client used for Telegram destinations.
+        twitter_poster (TwitterPoster, optional): Poster for Twitter destinations.
+        instagram_clients (list): Logged-in instagrapi clients for Instagram.
+
+    Returns:
+        list: The sinks, skipping destinations that cannot be served.
+    """
+    sinks = []
+    for dest in destinations:
+        if isinstance(dest, str):
+            dest = {"type": dest}
+        dest_type = dest.get("type")
+
+        if dest_type == "telegram":
+            if telegram_client is None or not dest.get("name"):
+                logger.warning(f"Skipping Telegram destination without client or channel: {dest}")
+                continue
+            sinks.append(TelegramSink(telegram_client, dest["name"]))
+        elif dest_type == "twitter":
+            sinks.append(TwitterSink(twitter_poster))
+        elif dest_type == "instagram":
+            sinks.extend(InstagramSink(client) for client in instagram_clients)
+        else:
+            logger.warning(f"Unknown destination type: {dest_type}")
+    return sinks
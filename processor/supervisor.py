@@ -0,0 +1,423 @@
+# processor/supervisor.py
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from processor import metrics
+
+logger = logging.getLogger('WorkflowSupervisor')
+
+HEARTBEAT_INTERVAL = 5      # seconds between worker heartbeats
+HEARTBEAT_TIMEOUT = 30      # a worker silent for this long is considered hung
+BACKOFF_BASE = 2            # first restart delay in seconds
+BACKOFF_MAX = 300           # upper bound for the restart delay
+STABLE_AFTER = 60           # uptime after which the restart counter is reset
+STOP_TIMEOUT = 10           # seconds to wait for a graceful stop before terminating
+
+
+def build_workflow(config, mongo_uri=None, db_name="social_manager"):
+    """
+    Build a workflow instance inside the worker process.
+
+    The instance gets its own write-behind message logger so processing never
+    waits on MongoDB round-trips.
+    """
+    from processor.message_logger import MessageLogger
+    from processor.workflow_registry import WorkflowRegistry
+
+    instance = WorkflowRegistry().create_instance(config)
+    if instance is not None:
+        instance.message_logger = MessageLogger.from_uri(
+            mongo_uri or os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017/"), db_name
+        )
+    return instance
+
+
+def _read_command(command_queue, timeout=1):
+    """Blocking read from the command queue, returning None on timeout."""
+    try:
+        return command_queue.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+
+async def _stop_instance(instance, workflow_task):
+    """Ask a workflow to stop and wait for its task to finish."""
+    stop = getattr(instance, "stop", None)
+    if stop:
+        await stop()
+    try:
+        await asyncio.wait_for(workflow_task, timeout=STOP_TIMEOUT)
+    except asyncio.TimeoutError:
+        workflow_task.cancel()
+
+
+async def _run_worker(workflow_id, config, factory, command_queue, status_queue, heartbeat_interval):
+    """Run a single workflow and serve its command channel until it stops."""
+    loop = asyncio.get_running_loop()
+    one_shot = config.get("type") == "history"
+    parent_pid = os.getppid()
+
+    instance = factory(config)
+    if instance is None:
+        raise ValueError(f"No workflow class available for workflow {workflow_id}")
+
+    workflow_task = asyncio.create_task(instance.start())
+
+    async def heartbeat():
+        while True:
+            if os.getppid() != parent_pid:
+                # The supervisor died; stop instead of running unsupervised
+                logger.warning(f"Supervisor gone, stopping workflow {workflow_id}")
+                command_queue.put(("stop", None))
+                return
+            status_queue.put(("heartbeat", workflow_id, None, time.time()))
+            await asyncio.sleep(heartbeat_interval)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    stop_requested = False
+
+    try:
+        while not stop_requested:
+            command_task = loop.run_in_executor(None, _read_command, command_queue)
+            done, _ = await asyncio.wait(
+                {workflow_task, command_task}, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if workflow_task in done:
+                # A command read while the workflow was finishing is still honoured
+                command = await command_task
+                if command and command[0] == "stop":
+                    stop_requested = True
+                elif command and command[0] == "reload":
+                    # Not answered, so the supervisor re-sends it to the restarted worker
+                    logger.info(f"Workflow {workflow_id} finished before its new configuration was applied")
+                if not stop_requested:
+                    workflow_task.result()  # re-raise a workflow crash
+                break
+
+            command = command_task.result()
+            if command is None:
+                continue
+
+            name, payload = command
+            if name == "stop":
+                stop_requested = True
+                await _stop_instance(instance, workflow_task)
+            elif name == "reload":
+                apply_config = getattr(instance, "apply_config", None)
+                if apply_config:
+                    logger.info(f"Applying new configuration to workflow {workflow_id}")
+                    try:
+                        apply_config(payload)
+                    except Exception as e:
+                        # The workflow keeps running with its current settings
+                        logger.error(f"Rejected new configuration of workflow {workflow_id}: {e}")
+                        status_queue.put(("reload_failed", workflow_id, str(e), time.time()))
+                    else:
+                        status_queue.put(("reloaded", workflow_id, None, time.time()))
+                else:
+                    logger.warning(
+                        f"Workflow {workflow_id} does not support live reload; "
+                        "changes take effect on the next start"
+                    )
+            else:
+                logger.warning(f"Unknown command for workflow {workflow_id}: {name}")
+    finally:
+        heartbeat_task.cancel()
+
+    if stop_requested:
+        return "stopped"
+    return "completed" if one_shot else "crashed"
+
+
+def _worker_main(workflow_id, config, factory, command_queue, status_queue, heartbeat_interval):
+    """Entry point of a workflow worker process."""
+    try:
+        outcome = asyncio.run(_run_worker(
+            workflow_id, config, factory, command_queue, status_queue, heartbeat_interval
+        ))
+        status_queue.put((outcome, workflow_id, None, time.time()))
+    except Exception as e:
+        logger.error(f"Workflow {workflow_id} crashed: {e}")
+        status_queue.put(("crashed", workflow_id, str(e), time.time()))
+        raise SystemExit(1)
+    if outcome == "crashed":
+        raise SystemExit(1)
+
+
+class _Worker:
+    """Bookkeeping for one supervised workflow."""
+
+    def __init__(self, workflow_id, config):
+        self.workflow_id = workflow_id
+        self.config = config              # last configuration the worker accepted
+        self.pending_configs = deque()    # reloads sent but not yet accepted or rejected
+        self.process = None
+        self.command_queue = None
+        self.started_at = None
+        self.last_heartbeat = None
+        self.restarts = 0
+        self.next_restart_at = None
+        self.last_error = None
+        self.finished = False
+
+
+class WorkflowSupervisor:
+    def __init__(self, factory=None, heartbeat_interval=HEARTBEAT_INTERVAL,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, on_status_change=None):
+        """
+        Run every workflow in a dedicated worker process and keep it alive.
+
+        Args:
+            factory (callable): Builds a workflow instance from its config inside
+                                the worker. Must be importable (picklable).
+            heartbeat_interval (float): Seconds between worker heartbeats.
+            heartbeat_timeout (float): Seconds without a heartbeat before a worker
+                                       is considered hung and restarted.
+            backoff_base (float): Delay before the first restart.
+            backoff_max (float): Maximum delay between restarts.
+            on_status_change (callable, optional): Called as
+                ``on_status_change(workflow_id, status, error)`` when a worker
+                crashes, restarts, completes or rejects a reload.
+        """
+        self.factory = factory or build_workflow
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.on_status_change = on_status_change
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._status_queue = self._ctx.Queue()
+        self._workers = {}
+        self._lock = threading.RLock()
+        self._monitor = None
+        self._running = False
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def start(self, workflow_id, config):
+        """
+        Start a workflow in its own worker process.
+
+        Returns:
+            bool: True if the workflow is running (or already was).
+        """
+        with self._lock:
+            worker = self._workers.get(workflow_id)
+            if worker and worker.process and worker.process.is_alive():
+                return True
+
+            worker = _Worker(workflow_id, config)
+            self._workers[workflow_id] = worker
+            self._spawn(worker)
+            self._ensure_monitor()
+        return True
+
+    def stop(self, workflow_id, timeout=STOP_TIMEOUT):
+        """
+        Stop a supervised workflow, terminating the worker if it does not exit in time.
+
+        Returns:
+            bool: True if the workflow was known to the supervisor.
+        """
+        with self._lock:
+            worker = self._workers.pop(workflow_id, None)
+        if not worker:
+            return False
+
+        process = worker.process
+        if process and process.is_alive():
+            worker.command_queue.put(("stop", None))
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"Workflow {workflow_id} did not stop in time, terminating")
+                process.terminate()
+                process.join(timeout)
+        if process:
+            metrics.process_dead(process.pid)
+        return True
+
+    def reload(self, workflow_id, config):
+        """
+        Send a new configuration to a running workflow.
+
+        The configuration only replaces the one restarts are spawned with
+        once the worker has applied it; a rejected configuration is reported
+        as a "reload_failed" status and the workflow keeps its settings.
+        """
+        with self._lock:
+            worker = self._workers.get(workflow_id)
+            if not worker:
+                return False
+            worker.pending_configs.append(config)
+            if worker.process and worker.process.is_alive():
+                worker.command_queue.put(("reload", config))
+        return True
+
+    def is_running(self, workflow_id):
+        """Whether the workflow is supervised and has not finished."""
+        with self._lock:
+            worker = self._workers.get(workflow_id)
+            return bool(worker and not worker.finished)
+
+    def health(self, workflow_id=None):
+        """
+        Report the health of supervised workflows.
+
+        Returns:
+            dict: ``{workflow_id: {pid, alive, last_heartbeat, restarts, last_error}}``
+        """
+        with self._lock:
+            workers = [self._workers[workflow_id]] if workflow_id in self._workers else (
+                [] if workflow_id else list(self._workers.values())
+            )
+            return {
+                w.workflow_id: {
+                    "pid": w.process.pid if w.process else None,
+                    "alive": bool(w.process and w.process.is_alive()),
+                    "started_at": w.started_at,
+                    "last_heartbeat": w.last_heartbeat,
+                    "restarts": w.restarts,
+                    "last_error": w.last_error,
+                }
+                for w in workers
+            }
+
+    def shutdown(self):
+        """Stop all workflows and the monitor thread."""
+        with self._lock:
+            workflow_ids = list(self._workers)
+        for workflow_id in workflow_ids:
+            self.stop(workflow_id)
+        self._running = False
+        if self._monitor and self._monitor.is_alive():
+            self._monitor.join(timeout=5)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _spawn(self, worker):
+        worker.command_queue = self._ctx.Queue()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.workflow_id, worker.config, self.factory,
+                  worker.command_queue, self._status_queue, self.heartbeat_interval),
+            name=f"workflow-{worker.workflow_id}",
+            daemon=True,
+        )
+        worker.process.start()
+        # Reloads the previous process did not answer are validated by the new one
+        for config in worker.pending_configs:
+            worker.command_queue.put(("reload", config))
+        worker.started_at = time.time()
+        worker.last_heartbeat = worker.started_at
+        worker.next_restart_at = None
+        logger.info(f"Started workflow {worker.workflow_id} in process {worker.process.pid}")
+
+    def _backoff(self, restarts):
+        return min(self.backoff_base * (2 ** restarts), self.backoff_max)
+
+    def _notify(self, workflow_id, status, error=None):
+        if self.on_status_change:
+            try:
+                self.on_status_change(workflow_id, status, error)
+            except Exception as e:
+                logger.error(f"Status callback failed for workflow {workflow_id}: {e}")
+
+    def _ensure_monitor(self):
+        if self._monitor and self._monitor.is_alive():
+            return
+        self._running = True
+        self._monitor = threading.Thread(target=self._monitor_loop, name="workflow-supervisor", daemon=True)
+        self._monitor.start()
+
+    def _monitor_loop(self):
+        while self._running:
+            try:
+                event = self._status_queue.get(timeout=0.5)
+            except queue.Empty:
+                event = None
+            except (EOFError, OSError):
+                break
+
+            try:
+                if event:
+                    self._handle_event(*event)
+                self._check_workers()
+            except Exception as e:
+                logger.error(f"Supervisor monitor error: {e}")
+
+    def _handle_event(self, kind, workflow_id, error, timestamp):
+        with self._lock:
+            worker = self._workers.get(workflow_id)
+            if not worker:
+                return
+
+            if kind == "heartbeat":
+                worker.last_heartbeat = timestamp
+                if worker.restarts and timestamp - worker.started_at > STABLE_AFTER:
+                    worker.restarts = 0
+            elif kind == "crashed":
+                worker.last_error = error
+            elif kind in ("reloaded", "reload_failed") and worker.pending_configs:
+                # Reloads are answered in the order they were sent
+                config = worker.pending_configs.popleft()
+                if kind == "reloaded":
+                    worker.config = config
+
+        if kind == "crashed":
+            logger.warning(f"Workflow {workflow_id} exited unexpectedly: {error}")
+        elif kind == "reload_failed":
+            logger.warning(f"Workflow {workflow_id} rejected its new configuration: {error}")
+            self._notify(workflow_id, "reload_failed", error)
+
+    def _check_workers(self):
+        now = time.time()
+        notifications = []
+        with self._lock:
+            for worker in list(self._workers.values()):
+                process = worker.process
+
+                if worker.next_restart_at is not None:
+                    if now >= worker.next_restart_at:
+                        worker.restarts += 1
+                        self._spawn(worker)
+                        notifications.append((worker.workflow_id, "restarted", worker.last_error))
+                    continue
+
+                hung = process.is_alive() and now - worker.last_heartbeat > self.heartbeat_timeout
+                if hung:
+                    logger.warning(f"Workflow {worker.workflow_id} missed heartbeats, terminating")
+                    process.terminate()
+                    process.join(1)
+                    worker.last_error = worker.last_error or "heartbeat timeout"
+
+                if not process.is_alive() and process.exitcode == 0:
+                    # Clean exit without a stop command: a one-shot workflow finished
+                    worker.finished = True
+                    self._workers.pop(worker.workflow_id, None)
+                    metrics.process_dead(process.pid)
+                    notifications.append((worker.workflow_id, "completed", None))
+                    continue
+
+                if not process.is_alive():
+                    if process.exitcode and not worker.last_error:
+                        worker.last_error = f"worker exited with code {process.exitcode}"
+                    metrics.process_dead(process.pid)
+                    delay = self._backoff(worker.restarts)
+                    worker.next_restart_at = now + delay
+                    logger.info(f"Restarting workflow {worker.workflow_id} in {delay:.1f}s")
+                    notifications.append((worker.workflow_id, "crashed", worker.last_error))
+
+        for workflow_id, status, error in notifications:
+            self._notify(workflow_id, status, error)
@@ -0,0 +1,198 @@
+# processor/tracing.py
+
+import contextvars
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger('Tracing')
+
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "social_media_automation")
+TRACE_FILE = os.getenv("TRACE_FILE")                      # JSON lines file spans are appended to
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")  # OTLP/HTTP collector, e.g. http://localhost:4318
+
+# Key of the message whose trace is active, so the handler of a workflow and
+# the pipeline it calls share one trace instead of starting one each.
+_message_key = contextvars.ContextVar("trace_message_key", default=None)
+
+_tracer = None
+_provider = None
+_configured = False
+_lock = threading.Lock()
+
+
+def configure(file_path=TRACE_FILE, endpoint=OTLP_ENDPOINT):
+    """
+    Set up the process-wide tracer.
+
+    Tracing stays off unless spans have somewhere to go: a JSON lines file
+    (``TRACE_FILE``) and/or an OTLP collector (``OTEL_EXPORTER_OTLP_ENDPOINT``;
+    the other ``OTEL_EXPORTER_OTLP_*`` variables apply as usual). Spans are
+    exported in batches from a background thread.
+
+    Args:
+        file_path (str, optional): File the spans are appended to.
+        endpoint (str, optional): OTLP collector endpoint.
+
+    Returns:
+        Tracer: The tracer, or None when tracing is off or opentelemetry-sdk
+                is not installed.
+    """
+    global _tracer, _provider, _configured
+    with _lock:
+        _configured = True
+        if _provider is not None:
+            _provider.shutdown()
+        _tracer = _provider = None
+        if not (file_path or endpoint):
+            return None
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        except ImportError:
+            logger.warning("opentelemetry-sdk is not installed; tracing is disabled")
+            return None
+
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        if endpoint:
+            try:
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=_traces_url(endpoint))))
+            except ImportError:
+                logger.warning("opentelemetry-exporter-otlp is not installed; spans are not sent to the collector")
+        if file_path:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            out = open(file_path, "a", encoding="utf-8")
+            provider.add_span_processor(BatchSpanProcessor(
+                ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+            ))
+        _provider = provider
+        _tracer = provider.get_tracer("social_media_automation")
+        logger.info(f"Tracing to {', '.join(filter(None, (file_path, endpoint)))}")
+        return _tracer
+
+
+def _traces_url(endpoint):
+    # The exporter takes the full signal URL, the environment variable its base
+    return endpoint if endpoint.rstrip("/").endswith("/v1/traces") else endpoint.rstrip("/") + "/v1/traces"
+
+
+def get_tracer():
+    """Process-wide tracer, configured from the environment on first use; None when tracing is off."""
+    if not _configured:
+        configure()
+    return _tracer
+
+
+def flush():
+    """Export the spans still buffered, e.g. before a worker exits."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def _attributes(attributes):
+    # OpenTelemetry rejects None values
+    return {name: value for name, value in (attributes or {}).items() if value is not None}
+
+
+@contextmanager
+def span(name, attributes=None, links=()):
+    """
+    Child span of the active span for the duration of the block.
+
+    Exceptions leaving the block are recorded on the span and re-raised.
+
+    Args:
+        name (str): Span name, e.g. "download" or "llm filter".
+        attributes (dict, optional): Span attributes; None values are left out.
+        links (iterable): ``SpanContext`` objects of related spans, e.g. the
+                          messages of a batched database write.
+
+    Yields:
+        Span: The span, or None when tracing is off.
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        yield None
+        return
+    from opentelemetry.trace import Link
+    with tracer.start_as_current_span(name, attributes=_attributes(attributes),
+                                      links=[Link(context) for context in links]) as current:
+        yield current
+
+
+@contextmanager
+def message_span(key, workflow=None, attributes=None):
+    """
+    Root span of the trace of one message.
+
+    A nested call for the message whose trace is already active joins it,
+    so a workflow handler and its pipeline produce a single trace.
+
+    Yields:
+        str: The trace id in hex, or None when tracing is off.
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        yield None
+        return
+    key = str(key)
+    if _message_key.get() == key:
+        yield current_trace_id()
+        return
+
+    from opentelemetry.context import Context
+    token = _message_key.set(key)
+    try:
+        attributes = dict(attributes or {}, **{"message.key": key, "workflow.id": workflow})
+        with tracer.start_as_current_span("message", context=Context(), attributes=_attributes(attributes)):
+            yield current_trace_id()
+    finally:
+        _message_key.reset(token)
+
+
+@contextmanager
+def llm_span(operation, provider, model):
+    """Span of one LLM call; record its token usage with ``record_usage``."""
+    with span(f"llm {operation}", {
+        "gen_ai.operation.name": operation,
+        "gen_ai.system": provider,
+        "gen_ai.request.model": model,
+    }) as current:
+        yield current
+
+
+def record_usage(current, usage):
+    """Add the token usage of an OpenAI-compatible response (object or dict) to an LLM span."""
+    if current is None or usage is None:
+        return
+    for field, attribute in (("prompt_tokens", "gen_ai.usage.input_tokens"),
+                             ("completion_tokens", "gen_ai.usage.output_tokens")):
+        value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+        if value is not None:
+            current.set_attribute(attribute, value)
+
+
+def set_attributes(attributes):
+    """Add attributes to the active span."""
+    if get_tracer() is None:
+        return
+    from opentelemetry import trace
+    trace.get_current_span().set_attributes(_attributes(attributes))
+
+
+def current_span_context():
+    """``SpanContext`` of the active span, to link to it later; None outside a trace."""
+    if get_tracer() is None:
+        return None
+    from opentelemetry import trace
+    context = trace.get_current_span().get_span_context()
+    return context if context.is_valid else None
+
+
+def current_trace_id():
+    """Hex id of the active trace, as stored in ``workflow_messages``; None outside a trace."""
+    context = current_span_context()
+    return format(context.trace_id, "032x") if context is not None else None
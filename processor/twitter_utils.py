@@ -1,8 +1,11 @@
 # processor/twitter_utils.py
 
 import os
-import tweepy
 import asyncio
+import hashlib
+import mimetypes
+import time
+from collections import OrderedDict
 
 # Load Twitter API credentials from environment variables
 API_KEY = os.getenv('TWITTER_API_KEY')
@@ -10,12 +13,58 @@ API_SECRET_KEY = os.getenv('TWITTER_API_SECRET_KEY')
 ACCESS_TOKEN = os.getenv('TWITTER_ACCESS_TOKEN')
 ACCESS_TOKEN_SECRET = os.getenv('TWITTER_ACCESS_TOKEN_SECRET')
 
+SIMPLE_UPLOAD_LIMIT = 5 * 1024 * 1024   # larger files always use the chunked upload
+CHUNK_SIZE = 4 * 1024 * 1024            # APPEND segment size (the API allows up to 5 MB)
+APPEND_CONCURRENCY = 4                  # segments uploaded in parallel per file
+MEDIA_ID_TTL = 23 * 3600                # media ids are valid for 24 hours after upload
+MEDIA_ID_CACHE_SIZE = 1024              # uploads remembered at most
+
+# (access token, sha256 of the file) -> (media_id, expires_at); shared by all posters.
+# Kept in upload order, which with a fixed TTL is also expiry order.
+_media_ids = OrderedDict()
+
+
+def _remember_media_id(key, media_id):
+    now = time.time()
+    _media_ids[key] = (media_id, now + MEDIA_ID_TTL)
+    _media_ids.move_to_end(key)
+    while _media_ids:
+        oldest_key, (_, expires_at) = next(iter(_media_ids.items()))
+        if expires_at > now and len(_media_ids) <= MEDIA_ID_CACHE_SIZE:
+            break
+        del _media_ids[oldest_key]
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_segment(path, offset, size):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def media_category(mime_type):
+    """Twitter media category for a MIME type."""
+    if mime_type == 'image/gif':
+        return 'tweet_gif'
+    if mime_type and mime_type.startswith('video/'):
+        return 'tweet_video'
+    return 'tweet_image'
+
 class TwitterPoster:
     def __init__(self):
         """
         Initialize the Twitter Poster.
         Sets up Tweepy clients for posting tweets and uploading media.
         """
+        import tweepy  # deferred: only needed once a poster is built
+
         self.auth = tweepy.OAuthHandler(API_KEY, API_SECRET_KEY)
         self.auth.set_access_token(ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
         self.api_v1 = tweepy.API(self.auth)
@@ -27,6 +76,74 @@ class TwitterPoster:
             access_token_secret=ACCESS_TOKEN_SECRET
         )
 
+    async def upload_media(self, path):
+        """
+        Upload one media file, reusing the media id of identical content.
+
+        Videos, GIFs and files over 5 MB go through the chunked
+        INIT/APPEND/FINALIZE upload with parallel APPEND segments; small
+        images use a single request. Blocking tweepy calls run in threads.
+
+        Returns:
+            int: The Twitter media id.
+        """
+        digest = await asyncio.to_thread(_file_digest, path)
+        key = (ACCESS_TOKEN, digest)
+        cached = _media_ids.get(key)
+        if cached:
+            if cached[1] > time.time():
+                return cached[0]
+            _media_ids.pop(key, None)
+
+        mime_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        category = media_category(mime_type)
+        if category != 'tweet_image' or os.path.getsize(path) > SIMPLE_UPLOAD_LIMIT:
+            media_id = await self._chunked_upload(path, mime_type, category)
+        else:
+            media = await asyncio.to_thread(self.api_v1.media_upload, path)
+            media_id = media.media_id
+
+        _remember_media_id(key, media_id)
+        return media_id
+
+    async def _chunked_upload(self, path, mime_type, category):
+        """Resumable upload: INIT, parallel APPEND segments, FINALIZE, then wait for processing."""
+        total_bytes = os.path.getsize(path)
+        media = await asyncio.to_thread(
+            self.api_v1.chunked_upload_init, total_bytes, mime_type, media_category=category
+        )
+        media_id = media.media_id
+
+        semaphore = asyncio.Semaphore(APPEND_CONCURRENCY)
+
+        async def append(segment_index, offset):
+            async with semaphore:
+                chunk = await asyncio.to_thread(_read_segment, path, offset, CHUNK_SIZE)
+                await asyncio.to_thread(self.api_v1.chunked_upload_append, media_id, chunk, segment_index)
+
+        await asyncio.gather(*(
+            append(index, offset)
+            for index, offset in enumerate(range(0, total_bytes, CHUNK_SIZE))
+        ))
+
+        media = await asyncio.to_thread(self.api_v1.chunked_upload_finalize, media_id)
+        processing = getattr(media, 'processing_info', None)
+        while processing and processing.get('state') in ('pending', 'in_progress'):
+            await asyncio.sleep(processing.get('check_after_secs', 1))
+            media = await asyncio.to_thread(self.api_v1.get_media_upload_status, media_id)
+            processing = getattr(media, 'processing_info', None)
+        if processing and processing.get('state') == 'failed':
+            raise RuntimeError(f"Twitter media processing failed: {processing.get('error')}")
+
+        print(f"[TwitterPoster] Chunked upload of {os.path.basename(path)} finished: {media_id}")
+        return media_id
+
+    async def create_tweet(self, text, media_ids=None):
+        """Post a tweet referencing already uploaded media."""
+        if media_ids:
+            return await asyncio.to_thread(self.client_v2.create_tweet, text=text, media_ids=media_ids)
+        return await asyncio.to_thread(self.client_v2.create_tweet, text=text)
+
     async def post(self, text, media_paths=None):
         """
         Post a tweet with optional media attachments.
@@ -38,15 +155,11 @@ class TwitterPoster:
         try:
             media_ids = []
             if media_paths:
-                for path in media_paths:
-                    media = self.api_v1.media_upload(path)
-                    media_ids.append(media.media_id)
+                # All files upload at once; the tweet waits only for the slowest
+                media_ids = list(await asyncio.gather(*(self.upload_media(path) for path in media_paths)))
                 print(f"[TwitterPoster] Uploaded media: {media_ids}")
 
-            if media_ids:
-                response = self.client_v2.create_tweet(text=text, media_ids=media_ids)
-            else:
-                response = self.client_v2.create_tweet(text=text)
+            response = await self.create_tweet(text, media_ids)
 
             print(f"[TwitterPoster] Tweet posted: {response}")
         except Exception as e:
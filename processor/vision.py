@@ -0,0 +1,186 @@
+# processor/vision.py
+
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import os
+from collections import OrderedDict
+
+from processor import metrics, tracing
+
+logger = logging.getLogger('ImageAnalyzer')
+
+MODEL = os.getenv("VISION_MODEL", "gpt-4o-mini")
+MAX_CONCURRENT = int(os.getenv("VISION_CONCURRENCY", "4"))  # vision calls in flight
+MAX_SIDE = 1024          # longest side sent to the model, in pixels
+JPEG_QUALITY = 80
+CACHE_SIZE = 2048        # analyses kept in memory
+NEAR_DUPLICATE = 4       # dHash bits that may differ for two images to count as the same
+PROMPT = (
+    "Analyze an image for the information that can be used in a tweet post that describes this image."
+)
+
+
+def dhash(image, size=8):
+    """
+    Difference hash of a Pillow image: 64 bits that survive resizing and
+    re-compression, so reposts of the same picture hash alike.
+    """
+    from PIL import Image
+
+    pixels = image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS).tobytes()
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def prepare_image(path, max_side=MAX_SIDE, quality=JPEG_QUALITY):
+    """
+    Read an image for upload.
+
+    Returns:
+        tuple: ``(sha256, dhash, jpeg_bytes)``. The image is downscaled so its
+               longest side is at most ``max_side`` and re-encoded as JPEG.
+               Without Pillow the original bytes are returned and the dHash
+               is None.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return digest, None, data
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        fingerprint = dhash(image)
+        image = image.convert("RGB")
+        image.thumbnail((max_side, max_side))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return digest, fingerprint, buffer.getvalue()
+
+
+class ImageAnalyzer:
+    def __init__(self, client=None, model=MODEL, prompt=PROMPT, max_concurrent=MAX_CONCURRENT,
+                 cache_size=CACHE_SIZE, max_side=MAX_SIDE, detail="auto"):
+        """
+        Concurrent, cached vision analysis of images.
+
+        Images are downscaled and re-encoded off the event loop before upload,
+        which cuts payload size and image tokens. Analyses are cached by the
+        exact content hash and by a perceptual hash, so the same chart posted
+        by several channels, even re-compressed or resized, is analyzed once.
+        Concurrent requests for the same image share one call.
+
+        Args:
+            client: An ``openai.AsyncOpenAI`` client; built from the
+                    environment when omitted.
+            model (str): Vision model.
+            prompt (str): Instruction sent with every image.
+            max_concurrent (int): Vision calls running at once.
+            cache_size (int): Analyses kept in memory.
+            max_side (int): Longest side of uploaded images, in pixels.
+            detail (str): OpenAI image detail level ("low", "high" or "auto").
+        """
+        self.client = client
+        self.model = model
+        self.prompt = prompt
+        self.max_concurrent = max_concurrent
+        self.cache_size = cache_size
+        self.max_side = max_side
+        self.detail = detail
+
+        self._cache = OrderedDict()   # sha256 -> analysis
+        self._fingerprints = {}       # sha256 -> dHash, for near-duplicate lookups
+        self._inflight = {}           # sha256 -> asyncio.Task
+        self._slots = None
+
+    def _get_client(self):
+        if self.client is None:
+            from openai import AsyncOpenAI
+            self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self.client
+
+    async def analyze_many(self, paths):
+        """
+        Analyze several images concurrently.
+
+        Returns:
+            list: The analysis of each image, or the exception it failed with.
+        """
+        return await asyncio.gather(*(self.analyze(path) for path in paths), return_exceptions=True)
+
+    async def analyze(self, path):
+        """Describe one image, reusing earlier analyses of the same picture."""
+        digest, fingerprint, payload = await asyncio.to_thread(prepare_image, path, self.max_side)
+
+        cached = self._cached(digest, fingerprint)
+        if cached is not None:
+            logger.info(f"Reusing analysis of {os.path.basename(path)}")
+            return cached
+
+        task = self._inflight.get(digest)
+        if task is None:
+            task = asyncio.ensure_future(self._analyze(digest, fingerprint, payload))
+            self._inflight[digest] = task
+            task.add_done_callback(lambda _: self._inflight.pop(digest, None))
+        return await asyncio.shield(task)
+
+    def _cached(self, digest, fingerprint):
+        if digest in self._cache:
+            self._cache.move_to_end(digest)
+            return self._cache[digest]
+        if fingerprint is None:
+            return None
+        for other, other_fingerprint in self._fingerprints.items():
+            if bin(fingerprint ^ other_fingerprint).count("1") <= NEAR_DUPLICATE:
+                self._cache.move_to_end(other)
+                return self._cache[other]
+        return None
+
+    async def _analyze(self, digest, fingerprint, payload):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        image_url = "data:image/jpeg;base64," + base64.b64encode(payload).decode("ascii")
+        async with self._slots:
+            with tracing.llm_span("vision", "openai", self.model) as span:
+                response = await self._get_client().chat.completions.create(
+                    model=self.model,
+                    messages=[{
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": self.prompt},
+                            {"type": "image_url", "image_url": {"url": image_url, "detail": self.detail}},
+                        ],
+                    }],
+                )
+                tracing.record_usage(span, getattr(response, "usage", None))
+        analysis = response.choices[0].message.content
+        metrics.count_tokens("openai", self.model, getattr(response, "usage", None))
+
+        self._cache[digest] = analysis
+        if fingerprint is not None:
+            self._fingerprints[digest] = fingerprint
+        if len(self._cache) > self.cache_size:
+            evicted, _ = self._cache.popitem(last=False)
+            self._fingerprints.pop(evicted, None)
+        return analysis
+
+
+_analyzer = None
+
+
+def get_image_analyzer():
+    """The process-wide ImageAnalyzer, so every message shares its cache."""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = ImageAnalyzer()
+    return _analyzer
@@ -0,0 +1,295 @@
+# processor/web_scraper.py
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+logger = logging.getLogger('WebScraper')
+
+MAX_CONNECTIONS = 32          # pooled connections across all hosts
+MAX_PER_HOST = 4              # concurrent requests to one host
+TIMEOUT = 10                  # seconds for a whole page request
+CONNECT_TIMEOUT = 5
+MAX_PAGE_BYTES = 2 * 1024 * 1024      # longer pages are truncated
+MAX_MEDIA_BYTES = 20 * 1024 * 1024    # larger media downloads are abandoned
+CACHE_SIZE = 256              # pages kept for revalidation
+FRESH_FOR = 300               # seconds a cached page is served without asking the server
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = "Mozilla/5.0 (compatible; social-media-automation/1.0)"
+DOWNLOAD_MEDIA = os.getenv("SCRAPER_DOWNLOAD_MEDIA", "").lower() in ("1", "true", "yes")
+
+
+class Page:
+    __slots__ = ("url", "status", "text", "etag", "last_modified", "fetched_at", "truncated")
+
+    def __init__(self, url, status, text, etag=None, last_modified=None, truncated=False):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+        self.truncated = truncated
+
+
+class WebScraper:
+    def __init__(self, max_connections=MAX_CONNECTIONS, max_per_host=MAX_PER_HOST, timeout=TIMEOUT,
+                 max_page_bytes=MAX_PAGE_BYTES, max_media_bytes=MAX_MEDIA_BYTES, cache_size=CACHE_SIZE,
+                 fresh_for=FRESH_FOR, download_media=DOWNLOAD_MEDIA, media_store=None):
+        """
+        Async page fetcher and scraper for link analysis.
+
+        One pooled aiohttp session serves every request of the event loop,
+        with a global and a per-host connection limit and hard timeouts.
+        Responses are read up to a byte cap, so a huge or endless page cannot
+        stall the caller or exhaust memory.
+
+        Pages are cached by URL: a page fetched within ``fresh_for`` seconds
+        is reused as is, an older one is revalidated with its ETag and
+        Last-Modified headers and reused on ``304 Not Modified``. Concurrent
+        requests for the same URL share one fetch.
+
+        Media referenced by a page is only downloaded when ``download_media``
+        is set; downloads then run in parallel, once per distinct URL, into
+        the content-addressed media store, which also remembers URLs it has
+        already downloaded. Every caller gets its own store reference to the
+        files and hands them back with ``release``.
+
+        Args:
+            max_connections (int): Connection pool size.
+            max_per_host (int): Concurrent connections to a single host.
+            timeout (float): Seconds allowed for a whole page request.
+            max_page_bytes (int): Bytes of a page read before truncating.
+            max_media_bytes (int): Bytes of a media file before giving up.
+            cache_size (int): Number of pages kept in the cache.
+            fresh_for (float): Seconds a cached page is used without revalidation.
+            download_media (bool): Download images and videos found on pages.
+            media_store (MediaStore, optional): Store for downloaded media;
+                                                the process-wide store by default.
+        """
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.max_page_bytes = max_page_bytes
+        self.max_media_bytes = max_media_bytes
+        self.cache_size = cache_size
+        self.fresh_for = fresh_for
+        self.download_media = download_media
+        self.media_store = media_store
+
+        self._session = None
+        self._cache = OrderedDict()   # url -> Page
+        self._inflight = {}           # url -> asyncio.Task
+        self._waiters = {}            # media key -> callers awaiting its download
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections, limit_per_host=self.max_per_host, ttl_dns_cache=300
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout, connect=CONNECT_TIMEOUT, sock_read=self.timeout
+                ),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    async def close(self):
+        """Close the pooled HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch(self, url):
+        """
+        Fetch a page, using the cache when possible.
+
+        Returns:
+            Page: The page; raises on network errors and non-2xx responses.
+        """
+        cached = self._cache.get(url)
+        if cached and time.monotonic() - cached.fetched_at < self.fresh_for:
+            self._cache.move_to_end(url)
+            return cached
+
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, cached))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url, cached):
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        session = await self._get_session()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and cached is not None:
+                cached.fetched_at = time.monotonic()
+                self._store(url, cached)
+                return cached
+            response.raise_for_status()
+
+            body, truncated = await self._read(response, self.max_page_bytes)
+            if truncated:
+                logger.info(f"Truncated {url} at {self.max_page_bytes} bytes")
+            text = body.decode(response.charset or "utf-8", errors="replace")
+            page = Page(
+                str(response.url), response.status, text,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                truncated=truncated,
+            )
+        self._store(url, page)
+        return page
+
+    @staticmethod
+    async def _read(response, limit):
+        """Read at most ``limit`` bytes; returns (body, truncated)."""
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= limit:
+                return b"".join(chunks)[:limit], True
+        return b"".join(chunks), False
+
+    def _store(self, url, page):
+        self._cache[url] = page
+        self._cache.move_to_end(url)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def scrape(self, url):
+        """
+        Scrape a page into text with ``[IMAGE_n: ...]`` / ``[VIDEO_n: ...]``
+        placeholders, like ``scrape_and_download``.
+
+        Media placeholders hold the local path when the file was downloaded
+        and the absolute URL otherwise.
+
+        Returns:
+            tuple: The text and the local media files it references. The caller
+                   holds a reference to each file and must ``release`` them
+                   once it no longer needs them.
+        """
+        from processor.html_extract import extract
+        from scrape_and_download import format_elements
+
+        page = await self.fetch(url)
+        # Parsing is CPU bound; keep it off the event loop
+        elements = await asyncio.to_thread(extract, page.text, page.url)
+
+        local = {}
+        if self.download_media:
+            media_urls = list(dict.fromkeys(
+                content for kind, content in elements if kind in ("image", "video")
+            ))
+            paths = await asyncio.gather(*(self.download(media_url) for media_url in media_urls))
+            local = {media_url: path for media_url, path in zip(media_urls, paths) if path}
+            elements = [(kind, local.get(content, content)) for kind, content in elements]
+
+        return format_elements(elements), list(local.values())
+
+    async def scrape_many(self, urls):
+        """
+        Scrape several pages concurrently.
+
+        Returns:
+            list: The ``scrape`` result of each page, or the exception it failed with.
+        """
+        return await asyncio.gather(*(self.scrape(url) for url in urls), return_exceptions=True)
+
+    async def download(self, url):
+        """
+        Download a media file once, however many pages or callers reference it.
+
+        Returns:
+            str: The local path, holding a reference for the caller to
+                 ``release``; None if the download failed.
+        """
+        key = ("media", url)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._download(url))
+            self._inflight[key] = task
+            self._waiters[key] = 0
+        self._waiters[key] += 1
+        try:
+            if not await asyncio.shield(task):
+                return None
+            # Every caller takes its own reference while the download's keeps the file
+            return await asyncio.to_thread(self.media_store.lookup, f"url:{url}")
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                self._inflight.pop(key, None)
+                task.add_done_callback(self._release_download)
+
+    def _release_download(self, task):
+        path = None if task.cancelled() or task.exception() else task.result()
+        if path:
+            asyncio.get_running_loop().run_in_executor(None, self.media_store.release, [path])
+
+    async def release(self, paths):
+        """Hand back media files returned by ``scrape`` or ``download``."""
+        if paths and self.media_store is not None:
+            await asyncio.to_thread(self.media_store.release, paths)
+
+    async def _download(self, url):
+        if self.media_store is None:
+            from processor.media_store import get_media_store
+            self.media_store = get_media_store()
+        key = f"url:{url}"
+        path = await asyncio.to_thread(self.media_store.lookup, key)
+        if path:
+            return path
+
+        path = self.media_store.temp_path(_safe_name(os.path.basename(urlparse(url).path) or "media"))
+        try:
+            session = await self._get_session()
+            async with session.get(url) as response:
+                response.raise_for_status()
+                if (response.content_length or 0) > self.max_media_bytes:
+                    raise ValueError(f"{response.content_length} bytes exceeds the media limit")
+                size = 0
+                with open(path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_media_bytes:
+                            raise ValueError("download exceeds the media limit")
+                        f.write(chunk)
+        except Exception as e:
+            logger.warning(f"Could not download {url}: {e}")
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+        # The reference of the download is dropped once every caller took its own
+        return await asyncio.to_thread(self.media_store.add, path, key)
+
+
+def _safe_name(filename):
+    return "".join(c if c.isalnum() or c in "_-." else "_" for c in filename)[:100]
+
+
+_scraper = None
+
+
+def get_scraper():
+    """The process-wide WebScraper, so every caller shares its pool and cache."""
+    global _scraper
+    if _scraper is None:
+        _scraper = WebScraper()
+    return _scraper
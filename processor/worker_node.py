@@ -0,0 +1,225 @@
+# processor/worker_node.py
+
+import argparse
+import logging
+import os
+import queue
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from functools import partial
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, MongoClient, ReturnDocument
+
+from processor import metrics
+from processor.supervisor import WorkflowSupervisor, build_workflow
+
+logger = logging.getLogger('WorkerNode')
+
+LEASE_SECONDS = 30      # how long a claim stays valid without renewal
+RENEW_INTERVAL = 10     # seconds between lease renewals / claim attempts
+
+
+class WorkerNode:
+    def __init__(self, mongo_uri=None, db_name="social_manager", worker_id=None,
+                 capacity=10, lease_seconds=LEASE_SECONDS, renew_interval=RENEW_INTERVAL,
+                 supervisor=None):
+        """
+        A worker that claims workflows from MongoDB and runs them locally.
+
+        Workflows are owned through a lease on the ``workflows`` document
+        (``owner`` and ``lease_expires_at``). The owner renews the lease every
+        ``renew_interval`` seconds; when a worker dies its leases expire and the
+        workflows are taken over by the remaining workers.
+
+        Args:
+            mongo_uri (str): MongoDB connection string shared by all workers.
+            db_name (str): Database holding the ``workflows`` collection.
+            worker_id (str, optional): Unique id of this worker.
+            capacity (int): Maximum number of workflows run by this worker.
+            lease_seconds (float): Lease duration.
+            renew_interval (float): Seconds between renewals and claim attempts.
+            supervisor (WorkflowSupervisor, optional): Local process supervisor.
+        """
+        mongo_uri = mongo_uri or os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017/")
+        self.client = MongoClient(mongo_uri)
+        self.collection = self.client[db_name]["workflows"]
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.capacity = capacity
+        self.lease = timedelta(seconds=lease_seconds)
+        self.renew_interval = renew_interval
+        self.supervisor = supervisor or WorkflowSupervisor(
+            factory=partial(build_workflow, mongo_uri=mongo_uri, db_name=db_name)
+        )
+        self.supervisor.on_status_change = self._on_worker_status
+        self.owned = {}  # workflow_id -> config_version, only touched by the run loop
+        self._status_events = queue.Queue()  # reported on the supervisor's monitor thread
+        self._stop_event = threading.Event()
+
+        self.collection.create_index([("desired_state", ASCENDING), ("lease_expires_at", ASCENDING)])
+        self.collection.create_index("owner")
+
+    def run(self):
+        """Claim, renew and release workflows until stopped."""
+        logger.info(f"Worker {self.worker_id} started with capacity {self.capacity}")
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.tick()
+                except Exception as e:
+                    logger.error(f"Worker {self.worker_id} tick failed: {e}")
+                self._stop_event.wait(self.renew_interval)
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        """Ask the run loop to exit."""
+        self._stop_event.set()
+
+    def tick(self):
+        """Renew owned leases, drop lost or stopped workflows, then claim new ones."""
+        now = datetime.utcnow()
+        self._apply_status_events()
+        self._renew(now)
+        self._claim(now)
+
+    def shutdown(self):
+        """Stop local workflows and hand their leases back immediately."""
+        self.supervisor.shutdown()
+        if self.owned:
+            self.collection.update_many(
+                {"_id": {"$in": [ObjectId(wf_id) for wf_id in self.owned]}, "owner": self.worker_id},
+                {"$set": {"owner": None, "lease_expires_at": None}}
+            )
+            self.owned.clear()
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    # ------------------------------------------------------------------
+    # Lease handling
+    # ------------------------------------------------------------------
+    def _renew(self, now):
+        if not self.owned:
+            return
+
+        ids = [ObjectId(wf_id) for wf_id in self.owned]
+        self.collection.update_many(
+            {"_id": {"$in": ids}, "owner": self.worker_id, "desired_state": "running"},
+            {"$set": {"lease_expires_at": now + self.lease}}
+        )
+
+        docs = {
+            str(doc["_id"]): doc
+            for doc in self.collection.find({"_id": {"$in": ids}})
+        }
+        for workflow_id in list(self.owned):
+            doc = docs.get(workflow_id)
+            if doc is None or doc.get("owner") != self.worker_id:
+                logger.warning(f"Lost lease on workflow {workflow_id}")
+                self._drop(workflow_id)
+            elif doc.get("desired_state") != "running":
+                logger.info(f"Workflow {workflow_id} was stopped by the control plane")
+                self._drop(workflow_id, release=True)
+            elif doc.get("config_version", 0) != self.owned.get(workflow_id, 0):
+                logger.info(f"Reloading configuration of workflow {workflow_id}")
+                self.owned[workflow_id] = doc.get("config_version", 0)
+                self.supervisor.reload(workflow_id, doc)
+
+    def _claim(self, now):
+        while len(self.owned) < self.capacity:
+            doc = self.collection.find_one_and_update(
+                {
+                    "desired_state": "running",
+                    "$or": [{"owner": None}, {"lease_expires_at": {"$lt": now}}],
+                },
+                {"$set": {
+                    "owner": self.worker_id,
+                    "lease_expires_at": now + self.lease,
+                    "status": "running",
+                    "updated_at": datetime.now(),
+                }},
+                return_document=ReturnDocument.AFTER,
+            )
+            if not doc:
+                break
+
+            workflow_id = str(doc["_id"])
+            logger.info(f"Worker {self.worker_id} claimed workflow {workflow_id}")
+            self.owned[workflow_id] = doc.get("config_version", 0)
+            self.supervisor.start(workflow_id, doc)
+
+    def _drop(self, workflow_id, release=False):
+        self.supervisor.stop(workflow_id)
+        self.owned.pop(workflow_id, None)
+        if release:
+            self.collection.update_one(
+                {"_id": ObjectId(workflow_id), "owner": self.worker_id},
+                {"$set": {"owner": None, "lease_expires_at": None}}
+            )
+
+    def _on_worker_status(self, workflow_id, status, error):
+        """
+        Queue worker lifecycle events reported by the local supervisor.
+
+        Called on the supervisor's monitor thread; the events are applied by
+        ``tick`` so ``owned`` is never changed while the run loop uses it.
+        """
+        self._status_events.put((workflow_id, status, error))
+
+    def _apply_status_events(self):
+        """Record the queued worker lifecycle events."""
+        while True:
+            try:
+                workflow_id, status, error = self._status_events.get_nowait()
+            except queue.Empty:
+                return
+            if status == "completed":
+                self.owned.pop(workflow_id, None)
+                self.collection.update_one(
+                    {"_id": ObjectId(workflow_id), "owner": self.worker_id},
+                    {"$set": {"status": "stopped", "desired_state": "stopped",
+                              "owner": None, "lease_expires_at": None, "updated_at": datetime.now()}}
+                )
+            elif status == "crashed":
+                self.collection.update_one(
+                    {"_id": ObjectId(workflow_id)},
+                    {"$set": {"last_error": error, "updated_at": datetime.now()}, "$inc": {"restart_count": 1}}
+                )
+            elif status == "reload_failed":
+                self.collection.update_one(
+                    {"_id": ObjectId(workflow_id)},
+                    {"$set": {"last_error": f"configuration rejected: {error}", "updated_at": datetime.now()}}
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a workflow worker node.")
+    parser.add_argument("--mongo-uri", type=str, default=None, help="MongoDB connection string.")
+    parser.add_argument("--db-name", type=str, default="social_manager", help="Database name.")
+    parser.add_argument("--worker-id", type=str, default=None, help="Unique worker id.")
+    parser.add_argument("--capacity", type=int, default=10, help="Maximum workflows on this worker.")
+    parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS, help="Lease duration.")
+    parser.add_argument("--renew-interval", type=float, default=RENEW_INTERVAL, help="Lease renewal interval.")
+    parser.add_argument("--metrics-port", type=int, default=metrics.EXPORTER_PORT,
+                        help="Port of the Prometheus exporter (0 disables it).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    metrics.start_exporter(args.metrics_port)
+    node = WorkerNode(
+        mongo_uri=args.mongo_uri,
+        db_name=args.db_name,
+        worker_id=args.worker_id,
+        capacity=args.capacity,
+        lease_seconds=args.lease_seconds,
+        renew_interval=args.renew_interval,
+    )
+    try:
+        node.run()
+    except KeyboardInterrupt:
+        node.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# processor/workflow_cache.py
+
+import logging
+import queue
+import threading
+import time
+
+from processor.change_feed import ChangeFeed
+
+logger = logging.getLogger('WorkflowCache')
+
+RESYNC_INTERVAL = 60    # seconds between full reloads (catches deletes while polling)
+
+
+class WorkflowCache:
+    def __init__(self, collection, feed=None, resync_interval=RESYNC_INTERVAL):
+        """
+        In-memory copy of the ``workflows`` collection kept fresh by a change feed.
+
+        Readers never hit MongoDB: documents are loaded once and then updated
+        from the collection's change stream (or the ``updated_at`` poller on
+        standalone servers), so every process converges on the same state.
+        Local writes are applied immediately through ``put`` and ``discard``.
+
+        ``version`` increases with every applied change, letting callers tell
+        cheaply whether anything moved since they last looked.
+
+        Args:
+            collection: The pymongo ``workflows`` collection.
+            feed (ChangeFeed, optional): Change feed on the collection.
+            resync_interval (float): Seconds between full reloads.
+        """
+        self.collection = collection
+        self.feed = feed or ChangeFeed(collection, key_field="_id", include_deletes=True)
+        self.resync_interval = resync_interval
+        self.version = 0
+
+        self._docs = {}
+        self._lock = threading.RLock()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """Load every workflow and start following changes."""
+        if self._thread and self._thread.is_alive():
+            return
+        subscriber = self.feed.subscribe()
+        self.reload()
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._follow, args=(subscriber,), name="workflow-cache", daemon=True
+        )
+        self._thread.start()
+
+    def close(self):
+        """Stop following changes."""
+        self._running = False
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self.feed.close()
+
+    def reload(self):
+        """Replace the cached documents with a full read of the collection."""
+        docs = {str(doc["_id"]): doc for doc in self.collection.find()}
+        with self._lock:
+            self._docs = docs
+            self.version += 1
+
+    def get(self, workflow_id):
+        """Cached workflow document, or None."""
+        with self._lock:
+            return self._docs.get(workflow_id)
+
+    def list(self, **filters):
+        """Cached workflow documents matching all ``field=value`` filters."""
+        with self._lock:
+            docs = list(self._docs.values())
+        return [doc for doc in docs if all(doc.get(k) == v for k, v in filters.items())]
+
+    def __contains__(self, workflow_id):
+        with self._lock:
+            return workflow_id in self._docs
+
+    def put(self, doc):
+        """Insert or replace a document after a local write."""
+        with self._lock:
+            self._docs[str(doc["_id"])] = doc
+            self.version += 1
+
+    def update(self, workflow_id, fields):
+        """Apply a ``$set`` done locally to the cached document."""
+        with self._lock:
+            doc = self._docs.get(workflow_id)
+            if doc is not None:
+                self._docs[workflow_id] = dict(doc, **fields)
+                self.version += 1
+
+    def discard(self, workflow_id):
+        """Forget a deleted document."""
+        with self._lock:
+            if self._docs.pop(workflow_id, None) is not None:
+                self.version += 1
+
+    def _follow(self, subscriber):
+        next_resync = time.monotonic() + self.resync_interval
+        while self._running:
+            try:
+                doc = subscriber.get(timeout=1)
+            except queue.Empty:
+                doc = None
+
+            if doc is not None:
+                if doc.get("deleted"):
+                    self.discard(str(doc["_id"]))
+                else:
+                    self.put(doc)
+
+            if time.monotonic() >= next_resync:
+                next_resync = time.monotonic() + self.resync_interval
+                try:
+                    self.reload()
+                except Exception as e:
+                    logger.error(f"Workflow cache resync failed: {e}")
@@ -1,31 +1,67 @@
 # processor/workflow_manager.py
+import os
 import threading
-import time
-import asyncio
-from pymongo import MongoClient
+from functools import partial
+from pymongo import MongoClient, ReturnDocument
 from bson.objectid import ObjectId
-from processor.workflows.live_repost_workflow import LiveRepostWorkflow
-from processor.workflows.history_repost_workflow import HistoryRepostWorkflow
+from processor.message_logger import MessageLogger, read_workflow_stats
+from processor.supervisor import WorkflowSupervisor, build_workflow
+from processor.workflow_cache import WorkflowCache
 from processor.workflow_registry import WorkflowRegistry
 from datetime import datetime
 
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_workflow_manager():
+    """
+    The process-wide WorkflowManager, created on first use.
+
+    Flask views and bot handlers share this instance, and with it one MongoDB
+    client, one workflow cache and one supervisor per process.
+    """
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = WorkflowManager(
+                    mongo_uri=os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017/"),
+                    db_name=os.getenv("MONGO_DB_NAME", "social_manager"),
+                )
+    return _manager
+
+
 class WorkflowManager:
-    def __init__(self, mongo_uri="mongodb://127.0.0.1:27017/", db_name="social_manager"):
-        """Initialize the workflow manager."""
+    def __init__(self, mongo_uri="mongodb://127.0.0.1:27017/", db_name="social_manager", distributed=None):
+        """
+        Initialize the workflow manager.
+
+        Args:
+            mongo_uri (str): MongoDB connection string.
+            db_name (str): Database name.
+            distributed (bool, optional): When True the manager only records the
+                desired state of workflows and worker nodes
+                (``python -m processor.worker_node``) run them. Defaults to the
+                WORKFLOW_DISTRIBUTED environment variable.
+        """
+        if distributed is None:
+            distributed = os.getenv("WORKFLOW_DISTRIBUTED", "").lower() in ("1", "true", "yes")
+        self.distributed = distributed
         self.client = MongoClient(mongo_uri)
         self.db_name = db_name  # Add this line
         self.db = self.client[db_name]
         self.collection = self.db["workflows"]
-        self.workflows = {}  # Store active workflow instances
-        self.threads = {}  # Store workflow threads
-        self.registry = WorkflowRegistry()
-        self.registry.discover_workflows()
-        self._load_existing_workflows()
-    
-    def _load_existing_workflows(self):
-        """Load workflows from the database."""
-        for doc in self.collection.find():
-            self.workflows[str(doc["_id"])] = doc
+        self.collection.create_index("updated_at")
+        # Workflow configurations, kept in sync with other processes via change streams
+        self.cache = WorkflowCache(self.collection)
+        self.message_logger = MessageLogger(self.db["workflow_messages"])
+        self.supervisor = WorkflowSupervisor(
+            factory=partial(build_workflow, mongo_uri=mongo_uri, db_name=db_name),
+            on_status_change=self._on_worker_status
+        )
+        self.registry = WorkflowRegistry()  # presets are discovered on first use
+        self.cache.start()
     
     def create_workflow(self, config):
         """
@@ -39,6 +75,7 @@ class WorkflowManager:
         """
         # Ensure config has required fields
         config.setdefault("status", "stopped")
+        config["updated_at"] = datetime.now()
         
         # Insert to database
         result = self.collection.insert_one(config)
@@ -46,7 +83,7 @@ class WorkflowManager:
         
         # Add to memory cache
         config["_id"] = workflow_id
-        self.workflows[workflow_id] = config
+        self.cache.put(config)
         
         return workflow_id
     
@@ -69,14 +106,15 @@ class WorkflowManager:
     
     def create_from_preset(self, preset_id, config):
         """Create a workflow from a preset."""
-        workflow_class = self.registry.get_workflow_class(preset_id)
-        if not workflow_class:
+        # Only the manifest is needed here; the preset class loads when the workflow starts
+        info = self.registry.get_workflow_info(preset_id)
+        if not info:
             return None, f"Preset '{preset_id}' not found"
         
         # Create workflow configuration
         workflow_config = {
             "user_id": config.get("user_id", 1),
-            "type": workflow_class.workflow_type,
+            "type": info.get("workflow_type", "live"),
             "sources": [],
             "destinations": [],
             "is_preset": True,
@@ -109,42 +147,33 @@ class WorkflowManager:
         return workflow_id, "Workflow created successfully"
     
     def start_workflow(self, workflow_id):
-        """Start a workflow by ID."""
-        workflow = self.db.workflows.find_one({"_id": ObjectId(workflow_id)})
+        """Start a workflow by ID in a supervised worker process."""
+        workflow = self.cache.get(workflow_id)
         if not workflow:
-            return False
-            
-        if workflow.get("status") == "running":
+            # Possibly created by another process moments ago
+            workflow = self.collection.find_one({"_id": ObjectId(workflow_id)})
+            if not workflow:
+                return False
+            self.cache.put(workflow)
+
+        if self.distributed:
+            # A worker node picks the workflow up on its next claim cycle
+            if workflow.get("desired_state") != "running":
+                self._set_status(workflow_id, "pending", desired_state="running")
+            return True
+
+        if self.supervisor.is_running(workflow_id):
             return True  # Already running
-            
+
         try:
-            # Check if this is a preset workflow
-            if workflow.get("is_preset") and workflow.get("preset_id"):
-                preset_id = workflow.get("preset_id")
-                workflow_class = self.registry.get_workflow_class(preset_id)
-                if workflow_class:
-                    workflow_instance = workflow_class(workflow)
-                else:
-                    # Fall back to standard workflow types if preset not found
-                    if workflow["type"] == "live":
-                        from processor.workflows.live_repost_workflow import LiveRepostWorkflow
-                        workflow_instance = LiveRepostWorkflow(workflow)
-                    else:
-                        return False
-            else:
-                # Not a preset, use standard workflow types
-                if workflow["type"] == "live":
-                    from processor.workflows.live_repost_workflow import LiveRepostWorkflow
-                    workflow_instance = LiveRepostWorkflow(workflow)
-                else:
-                    return False
-                    
-            # Start the workflow
-            asyncio.create_task(workflow_instance.start())
-            self.active_workflows[str(workflow["_id"])] = workflow_instance
-            self.db.workflows.update_one({"_id": workflow["_id"]}, {"$set": {"status": "running"}})
+            if not self.registry.get_class_for(workflow):
+                print(f"[WorkflowManager] No workflow class for type '{workflow.get('type')}'.")
+                return False
+
+            self.supervisor.start(workflow_id, workflow)
+            self._set_status(workflow_id, "running", desired_state="running")
             return True
-            
+
         except Exception as e:
             print(f"Error starting workflow: {e}")
             import traceback
@@ -161,108 +190,148 @@ class WorkflowManager:
         Returns:
             bool: True if successfully stopped, False otherwise.
         """
-        workflow = self.workflows.get(workflow_id)
+        workflow = self.cache.get(workflow_id)
         if not workflow:
             print(f"[WorkflowManager] Workflow {workflow_id} not found.")
             return False
+
+        if self.distributed:
+            # The owning worker node releases the workflow on its next renewal
+            self._set_status(workflow_id, "stopped", desired_state="stopped")
+            return True
             
-        if workflow.get("status") != "running":
+        if not self.supervisor.is_running(workflow_id):
             print(f"[WorkflowManager] Workflow {workflow_id} is not running.")
+            # Clear a stale "running" status left by a previous process
+            if workflow.get("status") == "running":
+                self._set_status(workflow_id, "stopped", desired_state="stopped")
             return True
             
-        # Get thread and instance
-        thread_info = self.threads.get(workflow_id)
-        if not thread_info:
-            print(f"[WorkflowManager] Thread for workflow {workflow_id} not found.")
-            return False
-            
-        # Stop the workflow
-        asyncio.run(thread_info["instance"].stop())
-        
-        # Update status in database
-        self.collection.update_one(
-            {"_id": ObjectId(workflow_id)}, 
-            {"$set": {"status": "stopped"}}
-        )
-        
-        # Update status in memory
-        workflow["status"] = "stopped"
-        
-        # Remove thread info
-        del self.threads[workflow_id]
+        self.supervisor.stop(workflow_id)
+        self._set_status(workflow_id, "stopped", desired_state="stopped")
         
         print(f"[WorkflowManager] Stopped workflow {workflow_id}")
         return True
+
+    def get_workflow_health(self, workflow_id=None):
+        """Heartbeat and restart information for supervised workflows."""
+        if self.distributed:
+            query = {"desired_state": "running"}
+            if workflow_id:
+                query["_id"] = ObjectId(workflow_id)
+            return {
+                str(doc["_id"]): {
+                    "owner": doc.get("owner"),
+                    "lease_expires_at": doc.get("lease_expires_at"),
+                    "restarts": doc.get("restart_count", 0),
+                    "last_error": doc.get("last_error"),
+                }
+                for doc in self.collection.find(query)
+            }
+        return self.supervisor.health(workflow_id)
+
+    def _set_status(self, workflow_id, status, **extra):
+        """Persist a workflow status change in the database and memory cache."""
+        updates = {"status": status, **extra, "updated_at": datetime.now()}
+        self.collection.update_one({"_id": ObjectId(workflow_id)}, {"$set": updates})
+        self.cache.update(workflow_id, updates)
+
+    def _on_worker_status(self, workflow_id, status, error):
+        """Record worker lifecycle events reported by the supervisor."""
+        if status == "completed":
+            self._set_status(workflow_id, "stopped", desired_state="stopped")
+        elif status == "crashed":
+            self.collection.update_one(
+                {"_id": ObjectId(workflow_id)},
+                {"$set": {"last_error": error, "updated_at": datetime.now()},
+                 "$inc": {"restart_count": 1}}
+            )
+        elif status == "reload_failed":
+            self.collection.update_one(
+                {"_id": ObjectId(workflow_id)},
+                {"$set": {"last_error": f"configuration rejected: {error}", "updated_at": datetime.now()}}
+            )
     
     def get_workflow(self, workflow_id):
-        """Get a workflow by its ID."""
-        return self.workflows.get(workflow_id)
+        """Get a workflow by its ID (served from the in-memory cache)."""
+        return self.cache.get(workflow_id)
+    
+    def list_workflows(self, **filters):
+        """List all workflows, optionally only those matching ``field=value`` filters."""
+        return self.cache.list(**filters)
     
-    def list_workflows(self):
-        """List all workflows."""
-        return list(self.workflows.values())
+    def list_user_workflows(self, telegram_id):
+        """Id, name and status of the workflows owned by a Telegram user."""
+        return [
+            {
+                "id": str(doc.get("_id")),
+                "name": doc.get("name", "<unnamed>"),
+                "status": doc.get("status", "unknown")
+            }
+            for doc in self.cache.list(telegram_id=telegram_id)
+        ]
     
     def update_workflow(self, workflow_id, updates):
-        """Update a workflow's configuration."""
-        if workflow_id not in self.workflows:
+        """
+        Update a workflow's configuration.
+
+        A running workflow receives the new configuration live: locally through
+        the supervisor's command channel, or, in distributed mode, through the
+        ``config_version`` counter that the owning worker node watches.
+        """
+        if workflow_id not in self.cache:
             print(f"[WorkflowManager] Workflow {workflow_id} not found.")
             return False
             
         # Update in database
-        self.collection.update_one(
+        workflow = self.collection.find_one_and_update(
             {"_id": ObjectId(workflow_id)},
-            {"$set": updates}
+            {"$set": {**updates, "updated_at": datetime.now()}, "$inc": {"config_version": 1}},
+            return_document=ReturnDocument.AFTER
         )
+        if not workflow:
+            return False
         
         # Update in memory
-        self.workflows[workflow_id].update(updates)
+        self.cache.put(workflow)
+        
+        # Push the change to the running workflow
+        if not self.distributed and self.supervisor.is_running(workflow_id):
+            self.supervisor.reload(workflow_id, workflow)
         
         return True
     
     def delete_workflow(self, workflow_id):
         """Delete a workflow."""
-        if workflow_id not in self.workflows:
+        workflow = self.cache.get(workflow_id)
+        if not workflow:
             print(f"[WorkflowManager] Workflow {workflow_id} not found.")
             return False
             
         # Stop if running
-        if self.workflows[workflow_id].get("status") == "running":
+        if workflow.get("status") == "running":
             self.stop_workflow(workflow_id)
             
         # Delete from database
         self.collection.delete_one({"_id": ObjectId(workflow_id)})
         
         # Delete from memory
-        del self.workflows[workflow_id]
+        self.cache.discard(workflow_id)
         
         return True
 
     def log_message(self, workflow_id, message_data):
         """
         Log a processed message for a workflow.
+
+        The record is buffered and written in the background by the message logger.
         
         Args:
             workflow_id (str): The workflow ID
             message_data (dict): Data about the processed message
         """
-        # Ensure we have a collection for workflow messages
-        if not hasattr(self, 'message_collection'):
-            self.message_collection = self.db['workflow_messages']
-            
-            # Create indexes if needed
-            self.message_collection.create_index([('workflow_id', 1), ('timestamp', -1)])
-            self.message_collection.create_index('message_key', unique=True)
-        
-        # Add timestamp and workflow_id
-        message_data['timestamp'] = datetime.now()
-        message_data['workflow_id'] = workflow_id
-        
-        # Insert the message, with upsert in case of duplicates
-        try:
-            self.message_collection.update_one(
-                {'message_key': message_data.get('message_key')}, 
-                {'$set': message_data},
-                upsert=True
-            )
-        except Exception as e:
-            print(f"Error logging message: {e}")
+        self.message_logger.log_message(workflow_id, message_data)
+
+    def get_workflow_stats(self, workflow_id=None, hours=24):
+        """Message counters and LLM latency from the hourly rollups."""
+        return read_workflow_stats(self.db, workflow_id, hours)
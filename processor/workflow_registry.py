@@ -1,68 +1,154 @@
 # processor/workflow_registry.py
 
 import os
+import json
 import importlib.util
 import inspect
 import logging
+import threading
 
 logger = logging.getLogger('WorkflowRegistry')
 
+# Discovery results shared by every registry in the process:
+# preset_dir -> (mtime key, presets)
+_discovery_cache = {}
+_discovery_lock = threading.Lock()
+
 class WorkflowRegistry:
-    def __init__(self):
-        """Initialize the workflow registry."""
+    def __init__(self, preset_dir=None):
+        """
+        Initialize the workflow registry.
+
+        Presets are described by a sidecar manifest next to their module
+        (``reposting_live.json`` for ``reposting_live.py``) holding the
+        ``workflow_info`` fields plus ``module`` and ``class``. Discovery only
+        reads manifests; a preset's module is imported the first time its
+        class is needed.
+
+        Args:
+            preset_dir (str, optional): Directory holding the presets.
+        """
         self.preset_workflows = {}
-        self.preset_dir = os.path.join(os.path.dirname(__file__), 'preset_workflows')
+        self.preset_dir = preset_dir or os.path.join(os.path.dirname(__file__), 'preset_workflows')
         
         # Ensure the preset directory exists
         if not os.path.exists(self.preset_dir):
             os.makedirs(self.preset_dir)
             
     def discover_workflows(self):
-        """Scan the preset_workflows directory and register available workflow classes."""
-        logger.info(f"Discovering workflows in {self.preset_dir}")
-        
-        for filename in os.listdir(self.preset_dir):
-            if filename.endswith('.py') and not filename.startswith('__'):
+        """Read the preset manifests, reusing the last result while no preset file changed."""
+        entries = sorted(
+            (filename, os.stat(os.path.join(self.preset_dir, filename)).st_mtime_ns)
+            for filename in os.listdir(self.preset_dir)
+            if filename.endswith(('.json', '.py')) and not filename.startswith('__')
+        )
+        key = tuple(entries)
+
+        with _discovery_lock:
+            cached = _discovery_cache.get(self.preset_dir)
+            if cached and cached[0] == key:
+                self.preset_workflows = cached[1]
+                return self.preset_workflows
+
+            logger.info(f"Discovering workflows in {self.preset_dir}")
+            presets = {}
+            filenames = {filename for filename, _ in entries}
+            for filename in sorted(filenames):
                 try:
-                    module_path = os.path.join(self.preset_dir, filename)
-                    module_name = filename[:-3]  # Remove .py extension
-                    
-                    # Load the module
-                    spec = importlib.util.spec_from_file_location(module_name, module_path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    
-                    # Look for a workflow class
-                    for name, obj in inspect.getmembers(module):
-                        if inspect.isclass(obj) and hasattr(obj, 'workflow_type') and hasattr(obj, 'workflow_info'):
-                            # Register the workflow class
-                            workflow_id = obj.workflow_info.get('id', module_name)
-                            self.preset_workflows[workflow_id] = {
-                                'class': obj,
-                                'info': obj.workflow_info
-                            }
-                            logger.info(f"Registered preset workflow: {workflow_id}")
+                    if filename.endswith('.json'):
+                        workflow_id, preset = self._read_manifest(filename)
+                    elif filename[:-3] + '.json' not in filenames:
+                        workflow_id, preset = self._load_legacy(filename)
+                    else:
+                        continue
+                    if workflow_id:
+                        presets[workflow_id] = preset
+                        logger.info(f"Registered preset workflow: {workflow_id}")
                 except Exception as e:
                     logger.error(f"Error loading workflow from {filename}: {e}")
-                    
+
+            _discovery_cache[self.preset_dir] = (key, presets)
+            self.preset_workflows = presets
         return self.preset_workflows
+
+    def _read_manifest(self, filename):
+        """Register a preset from its JSON manifest without importing it."""
+        with open(os.path.join(self.preset_dir, filename), encoding='utf-8') as f:
+            manifest = json.load(f)
+        module_name = manifest.get('module', filename[:-5])
+        info = {k: v for k, v in manifest.items() if k not in ('module', 'class')}
+        info.setdefault('id', module_name)
+        return info['id'], {
+            'class': None,
+            'class_name': manifest['class'],
+            'module_path': os.path.join(self.preset_dir, module_name + '.py'),
+            'info': info
+        }
+
+    def _load_legacy(self, filename):
+        """Register a preset without a manifest by importing it (slow, runs its side effects)."""
+        logger.warning(f"Preset {filename} has no manifest; importing it to read workflow_info")
+        module = self._import(os.path.join(self.preset_dir, filename))
+        for name, obj in inspect.getmembers(module):
+            if inspect.isclass(obj) and hasattr(obj, 'workflow_type') and hasattr(obj, 'workflow_info'):
+                info = dict(obj.workflow_info, workflow_type=obj.workflow_type)
+                return info.get('id', filename[:-3]), {'class': obj, 'info': info}
+        return None, None
+
+    @staticmethod
+    def _import(module_path):
+        module_name = os.path.splitext(os.path.basename(module_path))[0]
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
         
     def get_preset_workflows(self):
         """Get the list of available preset workflows."""
-        if not self.preset_workflows:
-            self.discover_workflows()
-        return self.preset_workflows
+        return self.discover_workflows()
         
     def get_workflow_class(self, workflow_id):
-        """Get a workflow class by ID."""
-        workflows = self.get_preset_workflows()
-        if workflow_id in workflows:
-            return workflows[workflow_id]['class']
-        return None
+        """Get a workflow class by ID, importing its module on first use."""
+        preset = self.get_preset_workflows().get(workflow_id)
+        if not preset:
+            return None
+        if preset['class'] is None:
+            with _discovery_lock:
+                if preset['class'] is None:
+                    module = self._import(preset['module_path'])
+                    preset['class'] = getattr(module, preset['class_name'])
+        return preset['class']
         
     def get_workflow_info(self, workflow_id):
         """Get workflow metadata by ID."""
         workflows = self.get_preset_workflows()
         if workflow_id in workflows:
             return workflows[workflow_id]['info']
-        return None
\ No newline at end of file
+        return None
+
+    def get_class_for(self, workflow):
+        """
+        Resolve the workflow class for a stored workflow configuration.
+
+        Preset workflows use their registered class; everything else (or a preset
+        that is no longer installed) falls back to the built-in workflow types.
+        """
+        if workflow.get("is_preset") and workflow.get("preset_id"):
+            workflow_class = self.get_workflow_class(workflow["preset_id"])
+            if workflow_class:
+                return workflow_class
+
+        if workflow.get("type") == "live":
+            from processor.workflows.live_repost_workflow import LiveRepostWorkflow
+            return LiveRepostWorkflow
+        if workflow.get("type") == "history":
+            from processor.workflows.history_repost_workflow import HistoryRepostWorkflow
+            return HistoryRepostWorkflow
+        return None
+
+    def create_instance(self, workflow):
+        """Instantiate the workflow described by a stored configuration."""
+        workflow_class = self.get_class_for(workflow)
+        if not workflow_class:
+            return None
+        return workflow_class(workflow)
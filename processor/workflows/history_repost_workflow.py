@@ -4,7 +4,13 @@ import asyncio
 from datetime import datetime
 from telethon import TelegramClient
 from telethon.sessions import StringSession
+from processor.download_manager import DownloadManager
+from processor.media_store import get_media_store
 from processor.openai_utils import OpenAIUtils
+from processor.pipeline_context import PipelineContext
+from processor.pipeline_presets import build_pipeline
+from processor.pipeline_stages import RecentKeys
+from processor.sinks import SinkRouter, build_sinks
 
 class HistoryRepostWorkflow:
     def __init__(self, config):
@@ -37,9 +43,25 @@ class HistoryRepostWorkflow:
             self.api_hash
         )
         
+        # Every destination is posted to concurrently
+        self.router = SinkRouter(build_sinks(config['destinations'], telegram_client=self.client))
+        
+        # Downloads are deduplicated by content and evicted when space runs low
+        self.media_store = get_media_store()
+        self.downloads = DownloadManager(media_store=self.media_store)
+        
         # OpenAI for filtering and text modification
         self.openai_utils = OpenAIUtils()
         
+        # filter -> modify -> download -> post, shared with the live workflow
+        self.pipeline = build_pipeline("history_repost", config, {
+            "ai": self.openai_utils,
+            "router": self.router,
+            "downloads": self.downloads,
+            "media_store": self.media_store,
+            "recent": RecentKeys(),
+        }, name=f"history_repost:{config.get('_id')}")
+        
         # State tracking
         self.running = False
 
@@ -78,39 +100,14 @@ class HistoryRepostWorkflow:
                 
             # Get text from first message
             main_text = messages[0].message or ""
+            context = PipelineContext(f"{channel_id}_{group_id}", main_text, messages=messages, source=str(channel_id))
             
-            # Check filter if configured
-            if self.filter_prompt:
-                passes = await self.openai_utils.filter_content(main_text, self.filter_prompt)
-                if not passes:
-                    print(f"[HistoryRepostWorkflow] Message filtered out: {main_text[:50]}...")
-                    continue
-                    
-            # Modify text if configured
-            if self.mod_prompt:
-                new_text = await self.openai_utils.modify_content(main_text, self.mod_prompt)
+            # Groups are posted one at a time to keep the channel's order
+            status = await self.pipeline.process(context)
+            if status == "filtered_out":
+                print(f"[HistoryRepostWorkflow] Message filtered out: {main_text[:50]}...")
             else:
-                new_text = main_text
-                
-            # Download all media
-            media_paths = []
-            for msg in messages:
-                if msg.media:
-                    try:
-                        path = await msg.download_media()
-                        if path:
-                            media_paths.append(path)
-                    except Exception as e:
-                        print(f"[HistoryRepostWorkflow] Error downloading media: {e}")
-                        
-            # Post to all target channels
-            for target in self.target_channels:
-                await self.post_to_channel(new_text, media_paths, target)
-                
-            # Clean up downloaded media
-            for path in media_paths:
-                if os.path.exists(path):
-                    os.remove(path)
+                print(f"[HistoryRepostWorkflow] {status}, posted to: {context.posted_to}")
                     
             # Add a small delay between posts
             await asyncio.sleep(1)
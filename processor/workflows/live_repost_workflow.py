@@ -1,19 +1,83 @@
 # processor/workflows/live_repost_workflow.py
 import os
 import asyncio
-import time
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from telethon import TelegramClient, events
 from telethon.sessions import StringSession
 from processor.openai_utils import OpenAIUtils
 from processor.deepseek_utils import DeepSeekUtils
+from processor.download_manager import DownloadManager
+from processor.media_store import get_media_store
+from processor.pipeline_context import PipelineContext
+from processor.pipeline_presets import build_pipeline
+from processor.pipeline_stages import RecentKeys
+from processor.sinks import PreparedMediaCache, SinkRouter, build_sinks
+from processor import tracing
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('LiveRepostWorkflow')
 
+def create_ai_utils(config):
+    """Build the AI provider configured for a workflow."""
+    ai_provider_config = config.get('ai_provider', {'name': 'openai'})
+    ai_provider_name = ai_provider_config.get('name', 'openai').lower()
+    ai_model = ai_provider_config.get('model', None)
+    
+    try:
+        if ai_provider_name == 'deepseek':
+            ai_utils = DeepSeekUtils()
+            logger.info(f"Using DeepSeek for AI processing with model: {ai_model}")
+        else:
+            # Default to OpenAI
+            ai_utils = OpenAIUtils(model=ai_model)
+            logger.info(f"Using OpenAI for AI processing with model: {ai_model}")
+    except Exception as e:
+        logger.error(f"Error initializing AI provider: {e}")
+        raise
+    return ai_utils
+
+class WorkflowSettings:
+    """
+    Immutable snapshot of the parts of a workflow configuration that can be
+    changed while the workflow is running.
+
+    Handlers take one snapshot per message, so a reload never mixes old and
+    new prompts or targets within a single message.
+
+    Raises ValueError for a configuration the workflow cannot run with.
+    """
+
+    def __init__(self, config):
+        self.validate(config)
+        self.config = config
+        self.source_channels = [src['name'] for src in config['sources'] if src['type'] == 'telegram']
+        self.target_channels = [dest['name'] for dest in config['destinations'] if dest['type'] == 'telegram']
+        self.destinations = config['destinations']
+        self.filter_prompt = config.get('filter_prompt', '')
+        self.mod_prompt = config.get('mod_prompt', '')
+        self.duplicate_check = config.get('duplicate_check', False)
+        self.preserve_files = config.get('preserve_files', False)
+        self.ai_utils = create_ai_utils(config)
+        self.router = None  # attached by the workflow once its client exists
+        self.pipeline = None  # built by the workflow around the router
+
+    @staticmethod
+    def validate(config):
+        """Check the fields every snapshot relies on."""
+        if not isinstance(config, dict):
+            raise ValueError("configuration must be a mapping")
+        for field in ('sources', 'destinations'):
+            entries = config.get(field)
+            if not isinstance(entries, list) or not entries:
+                raise ValueError(f"'{field}' must be a non-empty list")
+            if not all(isinstance(entry, dict) and entry.get('type') and entry.get('name') for entry in entries):
+                raise ValueError(f"every entry of '{field}' needs a type and a name")
+        if not any(src['type'] == 'telegram' for src in config['sources']):
+            raise ValueError("at least one telegram source is required")
+
 class LiveRepostWorkflow:
     def __init__(self, config):
         """
@@ -24,16 +88,11 @@ class LiveRepostWorkflow:
                           filter_prompt, mod_prompt, etc.
         """
         self.config = config
-        self.source_channels = [src['name'] for src in config['sources'] if src['type'] == 'telegram']
-        self.target_channels = [dest['name'] for dest in config['destinations'] if dest['type'] == 'telegram']
-        self.filter_prompt = config.get('filter_prompt', '')
-        self.mod_prompt = config.get('mod_prompt', '')
-        self.duplicate_check = config.get('duplicate_check', False)
-        self.preserve_files = config.get('preserve_files', False)
+        self.settings = WorkflowSettings(config)
         
-        # Create media directory if it doesn't exist
-        self.media_dir = os.path.join(os.getcwd(), 'data', 'media')
-        os.makedirs(self.media_dir, exist_ok=True)
+        # Downloads are deduplicated by content and evicted when space runs low
+        self.media_store = get_media_store()
+        self.downloads = DownloadManager(media_store=self.media_store)
         
         # Telegram client setup with error handling
         try:
@@ -64,47 +123,26 @@ class LiveRepostWorkflow:
             logger.error(f"Error setting up Telegram client: {e}")
             raise
         
-        # Initialize AI provider based on configuration
-        ai_provider_config = config.get('ai_provider', {'name': 'openai'})
-        ai_provider_name = ai_provider_config.get('name', 'openai').lower()
-        ai_model = ai_provider_config.get('model', None)
+        # Uploads are reused across destinations and configuration reloads
+        self.media_cache = PreparedMediaCache()
         
-        try:
-            if ai_provider_name == 'deepseek':
-                self.ai_utils = DeepSeekUtils()
-                logger.info(f"Using DeepSeek for AI processing with model: {ai_model}")
-            else:
-                # Default to OpenAI
-                self.ai_utils = OpenAIUtils()
-                logger.info(f"Using OpenAI for AI processing with model: {ai_model}")
-        except Exception as e:
-            logger.error(f"Error initializing AI provider: {e}")
-            raise
+        # Set by the worker that runs this workflow
+        self.message_logger = None
         
         # State tracking
         self.running = False
-        self.processed_messages = set()  # For duplicate checking
+        self.processed_messages = RecentKeys()  # For duplicate checking
+        self._attach(self.settings)
 
     async def start(self):
         """Start the live reposting workflow."""
         try:
             self.running = True
-            
-            @self.client.on(events.NewMessage(chats=self.source_channels))
-            async def on_new_message(event):
-                if not self.running:
-                    return
-                await self.handle_new_message(event)
-                
-            @self.client.on(events.Album(chats=self.source_channels))
-            async def on_new_album(event):
-                if not self.running:
-                    return
-                await self.handle_new_album(event)
+            self._register_handlers(self.settings.source_channels)
                 
             # Connect and run
             await self.client.start()
-            logger.info(f"Started monitoring channels: {self.source_channels}")
+            logger.info(f"Started monitoring channels: {self.settings.source_channels}")
             
             # Keep running until stopped
             while self.running:
@@ -114,6 +152,62 @@ class LiveRepostWorkflow:
             logger.error(f"Error in workflow: {e}")
             self.running = False
     
+    def apply_config(self, config):
+        """
+        Swap in a new configuration without reconnecting to Telegram.
+
+        Messages already being processed finish with the settings they started
+        with; the next message picks up the new prompts, targets and filters.
+        Source channel changes only re-register the event handlers.
+
+        The new settings are built completely before anything is swapped, so
+        when the configuration is rejected (ValueError, or any error building
+        its pipeline) the workflow keeps running with its current settings.
+        """
+        new_settings = WorkflowSettings(config)
+        self._attach(new_settings)
+        old_sources = self.settings.source_channels
+        self.config = config
+        self.settings = new_settings
+        
+        if self.running and new_settings.source_channels != old_sources:
+            self.client.remove_event_handler(self.on_new_message)
+            self.client.remove_event_handler(self.on_new_album)
+            self._register_handlers(new_settings.source_channels)
+            logger.info(f"Now monitoring channels: {new_settings.source_channels}")
+        logger.info("Workflow configuration reloaded")
+    
+    def _build_router(self, settings):
+        """Route posts to every configured destination (Telegram, Twitter, ...)."""
+        return SinkRouter(build_sinks(settings.destinations, telegram_client=self.client), cache=self.media_cache)
+    
+    def _attach(self, settings):
+        """Build the router and the live_repost pipeline of a settings snapshot."""
+        settings.router = self._build_router(settings)
+        settings.pipeline = build_pipeline("live_repost", settings.config, {
+            "ai": settings.ai_utils,
+            "router": settings.router,
+            "downloads": self.downloads,
+            "media_store": self.media_store,
+            "recent": self.processed_messages,
+            "progress": self._download_progress,
+        }, name=f"live_repost:{self.config.get('_id')}")
+    
+    def _register_handlers(self, source_channels):
+        """Attach the message and album handlers for the given channels."""
+        self.client.add_event_handler(self.on_new_message, events.NewMessage(chats=source_channels))
+        self.client.add_event_handler(self.on_new_album, events.Album(chats=source_channels))
+    
+    async def on_new_message(self, event):
+        if not self.running:
+            return
+        await self.handle_new_message(event)
+    
+    async def on_new_album(self, event):
+        if not self.running:
+            return
+        await self.handle_new_album(event)
+    
     async def stop(self):
         """Stop the workflow."""
         self.running = False
@@ -123,170 +217,74 @@ class LiveRepostWorkflow:
     
     async def handle_new_message(self, event):
         """Process a single new message."""
-        try:
-            # Skip if part of an album (will be handled by album handler)
-            if event.message.grouped_id:
-                return
-                
-            message_id = event.message.id
-            chat_id = event.chat_id
-            message_key = f"{chat_id}_{message_id}"
-            
-            # Skip if already processed (for duplicate checking)
-            if self.duplicate_check and message_key in self.processed_messages:
-                logger.info(f"Skipping duplicate message {message_key}")
-                return
-                
-            message_text = event.message.message or ""
-            logger.info(f"Processing message: {message_text[:100]}")
-            
-            # Prepare log data
-            log_data = {
-                "message_key": message_key,
-                "source_channel": str(chat_id),
-                "original_text": message_text,
-                "status": "processing",
-                "has_media": bool(event.message.media),
-                "timestamp": datetime.now()
-            }
-            
-            # Log initial processing
-            if hasattr(self, 'workflow_manager'):
-                self.workflow_manager.log_message(str(self.config.get('_id')), log_data)
-            
-            # Add debugging for filter prompt
-            filter_passed = True
-            if self.filter_prompt:
-                logger.info(f"Using filter: {self.filter_prompt[:50]}...")
-                try:
-                    passes = await self.ai_utils.filter_content(message_text, self.filter_prompt)
-                    logger.info(f"Filter result: {passes}")
-                    if not passes:
-                        logger.info(f"Message filtered out: {message_text[:50]}...")
-                        log_data["status"] = "filtered_out"
-                        log_data["filter_result"] = False
-                        if hasattr(self, 'workflow_manager'):
-                            self.workflow_manager.log_message(str(self.config.get('_id')), log_data)
-                        return
-                    logger.info("Message passed filter ✓")
-                    filter_passed = True
-                    log_data["filter_result"] = True
-                except Exception as e:
-                    logger.error(f"Filter error: {e}, allowing message to pass")
-                    log_data["filter_error"] = str(e)
-                    # On error, continue processing
-            
-            # Modify text if configured
-            modified_text = None
-            if self.mod_prompt:
-                logger.info(f"Modifying text with prompt: {self.mod_prompt[:50]}...")
-                try:
-                    new_text = await self.ai_utils.modify_content(message_text, self.mod_prompt)
-                    logger.info(f"Original: {message_text[:50]}... -> Modified: {new_text[:50]}...")
-                    modified_text = new_text
-                    log_data["modified_text"] = new_text
-                except Exception as e:
-                    logger.error(f"Text modification error: {e}")
-                    log_data["mod_error"] = str(e)
-                    modified_text = message_text
-            else:
-                modified_text = message_text
-            
-            # Continue with rest of your implementation...
-            # ...
-            
-            # Update log when posted successfully
-            log_data["status"] = "posted"
-            log_data["posted_to"] = [target for target in self.target_channels]
-            if hasattr(self, 'workflow_manager'):
-                self.workflow_manager.log_message(str(self.config.get('_id')), log_data)
-                
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            # Log error
-            if hasattr(self, 'workflow_manager'):
-                log_data = {
-                    "message_key": message_key if 'message_key' in locals() else f"error_{time.time()}",
-                    "error": str(e),
-                    "status": "error"
-                }
-                self.workflow_manager.log_message(str(self.config.get('_id')), log_data)
+        # Skip if part of an album (will be handled by album handler)
+        if event.message.grouped_id:
+            return
+        message_key = f"{event.chat_id}_{event.message.id}"
+        await self._process(message_key, event.chat_id, event.message.message or "", [event.message])
     
     async def handle_new_album(self, event):
         """Process an album of messages."""
-        try:
-            if not event.messages:
-                return
-                
-            album_id = event.messages[0].grouped_id
-            chat_id = event.chat_id
-            album_key = f"{chat_id}_{album_id}"
-            
-            # Skip if already processed (for duplicate checking)
-            if self.duplicate_check and album_key in self.processed_messages:
-                logger.info(f"Skipping duplicate album {album_key}")
-                return
-                
-            # Use text from first message
-            main_text = event.messages[0].message or ""
-            logger.info(f"Processing new album with text: {main_text[:50]}...")
-            
-            # Check filter if configured
-            if self.filter_prompt:
-                logger.info(f"Applying filter to album with prompt: {self.filter_prompt[:50]}...")
-                passes = await self.ai_utils.filter_content(main_text, self.filter_prompt)
-                if not passes:
-                    logger.info(f"Album filtered out: {main_text[:50]}...")
-                    return
-                logger.info("Album passed filter")
-                    
-            # Modify text if configured
-            if self.mod_prompt:
-                logger.info(f"Modifying album text with prompt: {self.mod_prompt[:50]}...")
-                new_text = await self.ai_utils.modify_content(main_text, self.mod_prompt)
-                logger.info(f"Original: {main_text[:50]}... -> Modified: {new_text[:50]}...")
-            else:
-                new_text = main_text
-                
-            # Download all media
-            media_paths = []
-            timestamp = int(time.time())
-            
-            for idx, msg in enumerate(event.messages):
-                if msg.media:
-                    try:
-                        media_path = await msg.download_media(
-                            file=os.path.join(self.media_dir, f"{timestamp}_{album_id}_{idx}")
-                        )
-                        if media_path:
-                            logger.info(f"Downloaded album media to: {media_path}")
-                            media_paths.append(media_path)
-                    except Exception as e:
-                        logger.error(f"Error downloading album media: {e}")
-                        
-            # Post to all target channels
-            success = False
-            for target in self.target_channels:
-                result = await self.post_to_channel(new_text, media_paths, target)
-                if result:
-                    success = True
-                    
-            # Mark as processed for duplicate checking
-            if success and self.duplicate_check:
-                self.processed_messages.add(album_key)
-                
-            # Clean up downloaded media if not preserving
-            if not self.preserve_files:
-                for path in media_paths:
-                    if os.path.exists(path):
-                        try:
-                            os.remove(path)
-                            logger.info(f"Cleaned up album media file: {path}")
-                        except Exception as e:
-                            logger.error(f"Error removing media file {path}: {e}")
-                            
-        except Exception as e:
-            logger.error(f"Error processing album: {e}")
+        if not event.messages:
+            return
+        album_key = f"{event.chat_id}_{event.messages[0].grouped_id}"
+        # Use text from first message
+        main_text = event.messages[0].message or ""
+        await self._process(album_key, event.chat_id, main_text, event.messages)
+    
+    async def _process(self, message_key, chat_id, text, messages):
+        """Run a message or album through the pipeline of the current settings."""
+        settings = self.settings
+        workflow_id = str(self.config.get('_id'))
+        context = PipelineContext(message_key, text, messages=messages, source=str(chat_id))
+        logger.info(f"Processing {message_key}: {text[:100]}")
+
+        # One trace per message; the pipeline joins it, and every log record
+        # written inside it carries its trace_id
+        with tracing.message_span(message_key, workflow=workflow_id, attributes={"source": str(chat_id)}):
+            # Log initial processing
+            if self.message_logger:
+                self.message_logger.log_message(workflow_id, {
+                    "message_key": message_key,
+                    "source_channel": str(chat_id),
+                    "original_text": text,
+                    "status": "processing",
+                    "has_media": any(getattr(message, 'media', None) for message in messages),
+                    "timestamp": datetime.now(timezone.utc)
+                })
+
+            try:
+                status = await settings.pipeline.process(context)
+            except Exception as e:
+                logger.error(f"Error processing {message_key}: {e}")
+                context.status = "error"
+                context.errors["pipeline"] = str(e)
+                status = context.status
+            logger.info(f"{message_key}: {status} after {', '.join(context.timings)}")
+
+            # Update log with the outcome
+            if self.message_logger:
+                self.message_logger.log_message(workflow_id, self._log_record(context))
+    
+    @staticmethod
+    def _log_record(context):
+        """Message log fields describing the outcome of a pipeline run."""
+        record = dict(context.log, message_key=context.key, status=context.status)
+        record["stage_ms"] = {stage: int(seconds * 1000) for stage, seconds in context.timings.items()}
+        for stage, error in context.errors.items():
+            field = {"filter": "filter_error", "modify": "mod_error"}.get(stage, "error")
+            record[field] = error
+        return record
+    
+    def _download_progress(self, message_key):
+        """Progress callback streaming download progress into the message log."""
+        def report(received, total):
+            if self.message_logger:
+                self.message_logger.log_message(str(self.config.get('_id')), {
+                    "message_key": message_key,
+                    "download_progress": {"received": received, "total": total}
+                })
+        return report
     
     async def post_to_channel(self, text, media_paths, channel):
         """Post content to a Telegram channel."""
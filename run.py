@@ -1,9 +1,10 @@
 # run.py
 
-from flask import Flask
-from web.your_app.views import webapp
+import argparse
 import logging
 import os
+import subprocess
+import sys
 
 # Configure logging
 logging.basicConfig(
@@ -11,7 +12,71 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+# Modules imported by the web UI and bot entry points
+PROFILE_MODULES = ["web.your_app.views", "main"]
+FAILED_MARKER = "import profile failed:"  # written by the profiled interpreter before the traceback
+
+# Imports the modules one by one, naming the one that raised
+PROFILE_SCRIPT = f"""
+import importlib, sys
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except BaseException:
+        print("{FAILED_MARKER}", name, file=sys.stderr)
+        raise
+"""
+
+
+def import_profile(modules=None, top=25):
+    """
+    Print the slowest imports of the entry points.
+
+    The modules are imported in a fresh interpreter with ``-X importtime`` so
+    the report is not skewed by anything already loaded in this process.
+    When an import raises, the failing module and its exception are reported
+    instead of a partial profile.
+
+    Args:
+        modules (list, optional): Modules to import. Defaults to PROFILE_MODULES.
+        top (int): Number of rows to print.
+
+    Returns:
+        int: 0 on success, 1 when an import failed.
+    """
+    modules = modules or PROFILE_MODULES
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT, *modules],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+
+    if result.returncode:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        failed = next((line[len(FAILED_MARKER):].strip() for line in errors if line.startswith(FAILED_MARKER)),
+                      ", ".join(modules))
+        print(f"Import profile failed: could not import {failed}", file=sys.stderr)
+        print(errors[-1] if errors else f"Interpreter exited with code {result.returncode}", file=sys.stderr)
+        return 1
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    total = sum(cumulative for cumulative, _, name in rows if not name.startswith("  "))
+    print(f"Importing {', '.join(modules)} took {total / 1e6:.3f}s")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1e3:10.1f}ms {self_us / 1e3:8.1f}ms  {name.strip()}")
+    return 0
+
+
 def create_app():
+    from flask import Flask
+    from web.your_app.views import webapp
+
     # Point Flask to the correct template directory
     template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web', 'your_app', 'templates')
     static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web', 'your_app', 'static')
@@ -27,6 +92,13 @@ def create_app():
     return app
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the web dashboard.")
+    parser.add_argument("--import-profile", nargs="*", metavar="MODULE", default=None,
+                        help="Report the slowest imports of the entry points (or the given modules) and exit.")
+    args = parser.parse_args()
+    if args.import_profile is not None:
+        sys.exit(import_profile(args.import_profile))
+
     app = create_app()
     # Changed port from 5000 to 5001 to avoid conflict with AirPlay
     app.run(debug=True, host="0.0.0.0", port=5009)
@@ -1,6 +1,5 @@
 import os
 import re
-import requests
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup, NavigableString, Comment, Tag
 
@@ -26,8 +25,9 @@ def download_file(url, download_folder="downloaded_media"):
     filename = sanitize_filename(filename)
     file_path = os.path.join(download_folder, filename)
 
+    import requests
     try:
-        response = requests.get(url, stream=True)
+        response = requests.get(url, stream=True, timeout=30)
         response.raise_for_status()
         with open(file_path, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
@@ -71,21 +71,14 @@ def looks_like_style_or_junk(text):
 
     return False
 
-def scrape_and_download(url):
+def extract_elements(html, base_url):
     """
-    Scrapes the page at `url` for text, images, and video elements.
-    Ignores obviously technical or styling-related text blocks.
-    Downloads media files and returns a combined representation
-    of text + placeholders showing media positions.
+    Parses `html` and returns its content in document order as a list of
+    (type, content) tuples: ("text", text), ("image", absolute_url) and
+    ("video", absolute_url). Ignores obviously technical or styling-related
+    text blocks. Nothing is downloaded.
     """
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"Failed to fetch URL {url}: {e}")
-        return ""
-
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(html, 'html.parser')
 
     # Remove <script>, <style>, and comment nodes entirely:
     for s in soup(["script", "style"]):
@@ -100,7 +93,7 @@ def scrape_and_download(url):
         """
         Recursively traverse the DOM, in document order.
         If text -> store if it doesn't look like junk.
-        If <img> or <video> -> download + store path placeholder.
+        If <img> or <video> -> store the absolute media URL.
         Else -> dive into children.
         """
         for child in node.children:
@@ -113,12 +106,7 @@ def scrape_and_download(url):
                 if child.name == "img":
                     src = child.get("src")
                     if src:
-                        abs_src = urljoin(url, src)
-                        downloaded = download_file(abs_src)
-                        if downloaded:
-                            elements_in_order.append(("image", downloaded))
-                        else:
-                            elements_in_order.append(("image", abs_src))
+                        elements_in_order.append(("image", urljoin(base_url, src)))
                 # Videos
                 elif child.name == "video":
                     video_src = child.get("src")
@@ -128,24 +116,23 @@ def scrape_and_download(url):
                         if source_tag:
                             video_src = source_tag.get("src")
                     if video_src:
-                        abs_src = urljoin(url, video_src)
-                        downloaded = download_file(abs_src)
-                        if downloaded:
-                            elements_in_order.append(("video", downloaded))
-                        else:
-                            elements_in_order.append(("video", abs_src))
+                        elements_in_order.append(("video", urljoin(base_url, video_src)))
                 else:
                     # Recursively dive in
                     traverse(child)
 
     body = soup.body if soup.body else soup
     traverse(body)
+    return elements_in_order
 
-    # Now format them in a text output with placeholders
+def format_elements(elements):
+    """
+    Formats extracted elements as text with placeholders showing media positions.
+    """
     output_lines = []
     media_count = {"image": 0, "video": 0}
 
-    for elem_type, content in elements_in_order:
+    for elem_type, content in elements:
         if elem_type == "text":
             output_lines.append(content)
         elif elem_type == "image":
@@ -157,6 +144,31 @@ def scrape_and_download(url):
 
     return "\n".join(output_lines)
 
+def scrape_and_download(url):
+    """
+    Scrapes the page at `url` for text, images, and video elements.
+    Downloads media files and returns a combined representation
+    of text + placeholders showing media positions.
+
+    Blocking; async callers should use processor.web_scraper.WebScraper.
+    """
+    import requests
+    try:
+        response = requests.get(url, timeout=15)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"Failed to fetch URL {url}: {e}")
+        return ""
+
+    from processor.html_extract import extract
+
+    elements = []
+    for elem_type, content in extract(response.text, url):
+        if elem_type in ("image", "video"):
+            content = download_file(content) or content
+        elements.append((elem_type, content))
+    return format_elements(elements)
+
 if __name__ == "__main__":
     test_url = "https://decrypt.co/298869/7-breakout-crypto-games-2024"
     result_text = scrape_and_download(test_url)
@@ -0,0 +1,192 @@
+# test_repositories.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+pytest.importorskip("motor")
+
+from bson.objectid import ObjectId
+
+from config import repositories as repositories_module
+from config.repositories import Repositories, SyncRepositories
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, limit):
+        self.docs = self.docs[:limit]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+    def __aiter__(self):
+        async def iterate():
+            for doc in self.docs:
+                yield doc
+        return iterate()
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the repositories."""
+
+    def __init__(self):
+        self.docs = []
+
+    def _matches(self, doc, query):
+        return all(doc.get(key) == value for key, value in query.items())
+
+    def _project(self, doc, projection):
+        if not projection:
+            return dict(doc)
+        return {key: value for key, value in doc.items() if key == "_id" or key in projection}
+
+    async def find_one(self, query, projection=None):
+        for doc in self.docs:
+            if self._matches(doc, query):
+                return self._project(doc, projection)
+        return None
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([self._project(doc, projection) for doc in self.docs
+                           if self._matches(doc, query or {})])
+
+    async def create_index(self, keys, **kwargs):
+        pass
+
+    async def update_one(self, query, update, upsert=False):
+        doc = next((doc for doc in self.docs if self._matches(doc, query)), None)
+        if doc is None:
+            if not upsert:
+                return
+            doc = dict(query)
+            self.docs.append(doc)
+            doc.update(update.get("$setOnInsert", {}))
+        doc.update(update.get("$set", {}))
+        for key, value in update.get("$max", {}).items():
+            doc[key] = max(doc.get(key, value), value)
+        for path, value in update.get("$push", {}).items():
+            parent = doc
+            *parents, field = path.split(".")
+            for name in parents:
+                parent = parent.setdefault(name, {})
+            parent.setdefault(field, []).append(value)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection()
+        return collection
+
+
+class FakeMotorClient:
+    instances = []
+
+    def __init__(self, server, uri, **kwargs):
+        self.server = server
+        self.kwargs = kwargs
+        FakeMotorClient.instances.append(self)
+
+    def __getitem__(self, db_name):
+        return self.server.setdefault(db_name, FakeDatabase())
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # Shared by every client, like one MongoDB deployment
+    databases = {}
+    FakeMotorClient.instances = []
+    monkeypatch.setattr(repositories_module, "AsyncIOMotorClient",
+                        lambda uri, **kwargs: FakeMotorClient(databases, uri, **kwargs))
+    return databases
+
+
+def test_one_pooled_client_per_event_loop(server):
+    repositories = Repositories("mongodb://test", "test_db")
+
+    async def use():
+        await repositories.users.register(1, "alice")
+        await repositories.workflows.list_for_user(1)
+        return repositories._db()
+
+    first = asyncio.run(use())
+    assert len(FakeMotorClient.instances) == 1
+    assert FakeMotorClient.instances[0].kwargs["maxPoolSize"] == repositories_module.MAX_POOL_SIZE
+
+    # A new loop gets its own client, since Motor clients are loop-bound
+    second = asyncio.run(use())
+    assert len(FakeMotorClient.instances) == 2
+    assert first is second  # same database on the shared deployment
+
+
+def test_watermarks_never_move_backwards(server):
+    repositories = Repositories("mongodb://test", "test_db")
+
+    async def run():
+        await repositories.watermarks.save("source", posts=10, stories=5, rate=0.01)
+        await repositories.watermarks.save("source", posts=7, stories=8)
+        return await repositories.watermarks.load_all()
+
+    stored = asyncio.run(run())
+    assert stored["source"]["posts"] == 10
+    assert stored["source"]["stories"] == 8
+    assert stored["source"]["rate"] == 0.01
+
+
+def test_list_for_user_returns_only_their_workflows(server):
+    repositories = Repositories("mongodb://test", "test_db")
+    mine = ObjectId()
+    server.setdefault("test_db", FakeDatabase())["workflows"].docs.extend([
+        {"_id": mine, "telegram_id": 1, "name": "repost", "status": "running", "sources": []},
+        {"_id": ObjectId(), "telegram_id": 1},
+        {"_id": ObjectId(), "telegram_id": 2, "name": "other", "status": "stopped"},
+    ])
+
+    async def run():
+        return await repositories.workflows.list_for_user(1)
+
+    workflows = asyncio.run(run())
+
+    assert workflows[0] == {"id": str(mine), "name": "repost", "status": "running"}
+    assert workflows[1]["name"] == "<unnamed>" and workflows[1]["status"] == "unknown"
+    assert len(workflows) == 2
+
+
+def test_sync_facade_round_trip_used_by_config_db(server, monkeypatch):
+    pytest.importorskip("dotenv")
+    from config import db
+
+    facade = SyncRepositories(Repositories("mongodb://test", "test_db"))
+    monkeypatch.setattr(db, "sync_repositories", facade)
+
+    db.register_user(1, "alice")
+    db.register_user(1, "renamed")
+    db.add_account(1, "twitter", {"username": "alice_tw"})
+    db.add_account(1, "twitter", {"username": "alice_alt"})
+    db.remove_account(1, "twitter", 0)
+
+    assert db.get_accounts(1) == {"telegram": [], "twitter": [{"username": "alice_alt"}], "openai": []}
+    assert server["test_db"]["users"].docs[0]["username"] == "alice"
+    assert db.get_workflows(1) == []
+    # Every call ran on the facade's own loop, through a single client
+    assert len(FakeMotorClient.instances) == 1
+
+
+def test_config_db_keeps_its_blocking_collections():
+    pytest.importorskip("dotenv")
+    from config import db
+
+    assert db.users.name == "users"
+    assert db.workflows_col.name == "workflows"
+    assert db.db.name == repositories_module.DB_NAME
@@ -0,0 +1,133 @@
+# test_album_aggregator.py
+import asyncio
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor.album_aggregator import AlbumAggregator, album_key
+
+
+class FakeMessage:
+    def __init__(self, message_id, grouped_id=None, chat_id=-100):
+        self.id = message_id
+        self.grouped_id = grouped_id
+        self.chat_id = chat_id
+
+
+def drain(queue):
+    albums = []
+    while not queue.empty():
+        albums.append(queue.get_nowait())
+    return albums
+
+
+def test_keys_do_not_collide():
+    keys = {
+        album_key(FakeMessage(1)),
+        album_key(FakeMessage(2)),
+        album_key(FakeMessage(1, chat_id=-200)),
+        album_key(FakeMessage(3, grouped_id=77)),
+        album_key(FakeMessage(4, grouped_id=77)),
+    }
+    assert len(keys) == 4
+
+
+def test_single_messages_are_queued_at_once():
+    async def run():
+        aggregator = AlbumAggregator(window=10)
+        await aggregator.add(FakeMessage(1))
+        await aggregator.add(FakeMessage(2))
+        return drain(aggregator.queue)
+
+    albums = asyncio.run(run())
+
+    assert [album.key for album in albums] == ["single_-100_1", "single_-100_2"]
+    assert all(album.grouped_id is None for album in albums)
+
+
+def test_album_is_emitted_once_after_the_window():
+    async def run():
+        aggregator = AlbumAggregator(window=0.05, max_wait=5)
+        for message_id in (3, 1, 2):
+            await aggregator.add(FakeMessage(message_id, grouped_id=7))
+            await asyncio.sleep(0.02)
+        assert aggregator.queue.empty()   # every part restarted the window
+        await asyncio.sleep(0.1)
+        return aggregator, drain(aggregator.queue)
+
+    aggregator, albums = asyncio.run(run())
+
+    [album] = albums
+    assert album.key == "album_-100_7"
+    assert [message.id for message in album.messages] == [1, 2, 3]
+    assert len(aggregator) == 0
+
+
+def test_album_is_emitted_when_full_or_held_too_long():
+    async def run():
+        aggregator = AlbumAggregator(window=5, max_wait=0.05, max_size=2)
+        await aggregator.add(FakeMessage(1, grouped_id=1))
+        await aggregator.add(FakeMessage(2, grouped_id=1))
+        full = drain(aggregator.queue)
+        await aggregator.add(FakeMessage(3, grouped_id=2))
+        await asyncio.sleep(0.1)
+        return full, drain(aggregator.queue)
+
+    full, expired = asyncio.run(run())
+
+    assert [len(album.messages) for album in full] == [2]
+    assert [album.key for album in expired] == ["album_-100_2"]
+
+
+def test_pending_albums_are_bounded():
+    async def run():
+        aggregator = AlbumAggregator(window=5, max_pending=2)
+        for grouped_id in (1, 2, 3):
+            await aggregator.add(FakeMessage(grouped_id, grouped_id=grouped_id))
+        early = drain(aggregator.queue)
+        pending = len(aggregator)
+        await aggregator.flush()
+        return early, pending, drain(aggregator.queue)
+
+    early, pending, flushed = asyncio.run(run())
+
+    assert [album.key for album in early] == ["album_-100_1"]
+    assert pending == 2
+    assert [album.key for album in flushed] == ["album_-100_2", "album_-100_3"]
+
+
+def test_late_parts_get_their_own_key():
+    async def run():
+        aggregator = AlbumAggregator(window=0.02)
+        await aggregator.add(FakeMessage(1, grouped_id=9))
+        await asyncio.sleep(0.05)
+        await aggregator.add(FakeMessage(2, grouped_id=9))
+        await asyncio.sleep(0.05)
+        return drain(aggregator.queue)
+
+    albums = asyncio.run(run())
+
+    assert [album.key for album in albums] == ["album_-100_9", "album_-100_9_2"]
+
+
+def test_consume_processes_each_group_once():
+    processed = []
+
+    async def process(album):
+        processed.append(album.key)
+        if album.key.endswith("_2"):
+            raise RuntimeError("failed")
+
+    async def run():
+        aggregator = AlbumAggregator(window=0.01)
+        consumer = asyncio.ensure_future(aggregator.consume(process, concurrency=2))
+        for message_id in (1, 2, 3):
+            await aggregator.add(FakeMessage(message_id))
+        await aggregator.queue.join()
+        consumer.cancel()
+
+    asyncio.run(run())
+
+    assert sorted(processed) == ["single_-100_1", "single_-100_2", "single_-100_3"]
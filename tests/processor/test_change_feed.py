@@ -0,0 +1,70 @@
+# test_change_feed.py
+import os
+import sys
+import time
+from datetime import datetime
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import OperationFailure
+
+from processor.change_feed import ChangeFeed
+
+
+class FakeCursor(list):
+    def sort(self, *args):
+        return self
+
+
+class StandaloneCollection:
+    """Collection on a server without change streams."""
+
+    def __init__(self):
+        self.documents = []
+        self.queries = 0
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    def find(self, query):
+        self.queries += 1
+        since = query["updated_at"]["$gt"]
+        return FakeCursor(doc for doc in self.documents if doc["updated_at"] > since)
+
+
+def test_publish_routes_by_key():
+    feed = ChangeFeed(StandaloneCollection())
+    feed._ensure_thread = lambda: None
+    wf1 = feed.subscribe("wf1")
+    everything = feed.subscribe()
+
+    feed.publish({"_id": 1, "workflow_id": "wf1"})
+    feed.publish({"_id": 2, "workflow_id": "wf2"})
+
+    assert wf1.get_nowait()["_id"] == 1
+    assert wf1.empty()
+    assert [everything.get_nowait()["_id"] for _ in range(2)] == [1, 2]
+
+
+def test_falls_back_to_a_single_poller():
+    collection = StandaloneCollection()
+    feed = ChangeFeed(collection, poll_interval=0.05)
+    first = feed.subscribe("wf1")
+    second = feed.subscribe("wf1")
+
+    time.sleep(0.1)
+    collection.documents.append({"_id": 1, "workflow_id": "wf1", "updated_at": datetime.now()})
+    try:
+        assert first.get(timeout=2)["_id"] == 1
+        assert second.get(timeout=2)["_id"] == 1
+        time.sleep(0.2)
+        # The overlap window re-reads the document but it is delivered once
+        assert first.empty()
+        assert feed.mode == "polling"
+    finally:
+        feed.close()
@@ -0,0 +1,101 @@
+# test_download_manager.py
+import asyncio
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor.download_manager import REQUEST_SIZE, DownloadManager
+from processor.media_store import MediaStore
+
+
+class Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeClient:
+    def __init__(self, data):
+        self.data = data
+        self.requests = 0
+
+    async def iter_download(self, document, offset, stride, limit, request_size, file_size):
+        for _ in range(limit):
+            self.requests += 1
+            await asyncio.sleep(0)
+            yield self.data[offset:offset + request_size]
+            offset += stride
+
+
+class FakeMessage:
+    active = {}
+    peak = {}
+
+    def __init__(self, msg_id, data, dc_id=2, delay=0.02):
+        self.id = msg_id
+        self.data = data
+        self.delay = delay
+        self.media = True
+        self.photo = None
+        self.document = Obj(id=1000 + msg_id, dc_id=dc_id)
+        self.file = Obj(size=len(data), ext=".jpg")
+        self.client = FakeClient(data)
+
+    async def download_media(self, file=None, progress_callback=None):
+        dc = self.document.dc_id
+        FakeMessage.active[dc] = FakeMessage.active.get(dc, 0) + 1
+        FakeMessage.peak[dc] = max(FakeMessage.peak.get(dc, 0), FakeMessage.active[dc])
+        await asyncio.sleep(self.delay)
+        FakeMessage.active[dc] -= 1
+        path = f"{file}.jpg"
+        with open(path, "wb") as f:
+            f.write(self.data)
+        if progress_callback:
+            progress_callback(len(self.data), len(self.data))
+        return path
+
+
+def test_album_downloads_concurrently_within_dc_limit(tmp_path):
+    FakeMessage.active, FakeMessage.peak = {}, {}
+    messages = [FakeMessage(i, bytes([i]) * 100, dc_id=2 if i < 6 else 4) for i in range(10)]
+    reports = []
+    manager = DownloadManager(max_concurrent=8, max_per_dc=3)
+    files = [str(tmp_path / f"album_{i}") for i in range(10)]
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        paths = await manager.download_all(messages, files=files, progress=lambda r, t: reports.append((r, t)))
+        return paths, asyncio.get_running_loop().time() - started
+
+    paths, elapsed = asyncio.run(run())
+    assert paths == [f"{f}.jpg" for f in files]
+    assert FakeMessage.peak == {2: 3, 4: 3}
+    assert elapsed < 10 * 0.02
+    assert reports[-1] == (1000, 1000)
+
+
+def test_large_documents_use_parallel_streams(tmp_path):
+    data = os.urandom(REQUEST_SIZE * 5 + 1234)
+    message = FakeMessage(1, data)
+    manager = DownloadManager(parallel_threshold=REQUEST_SIZE, streams=3)
+
+    path = asyncio.run(manager.download(message, file=str(tmp_path / "video")))
+    assert path.endswith("video.jpg")
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert message.client.requests == 6
+
+
+def test_stored_media_is_not_downloaded_again(tmp_path):
+    store = MediaStore(str(tmp_path))
+    manager = DownloadManager(media_store=store)
+    first = FakeMessage(7, b"x" * 50)
+    again = FakeMessage(7, b"x" * 50, delay=None)  # would fail if downloaded
+
+    async def run():
+        return await manager.download(first, "a"), await manager.download(again, "b")
+
+    one, two = asyncio.run(run())
+    assert one == two
+    assert one.startswith(store.objects_dir)
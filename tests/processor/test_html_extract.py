@@ -0,0 +1,50 @@
+# test_html_extract.py
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+pytest.importorskip("lxml")
+
+from processor.html_extract import extract_elements, looks_like_junk
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "html")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_main_content_is_selected_and_boilerplate_dropped():
+    elements = extract_elements(load("news_article.html"), "https://example.com/news/1", max_chars=100000)
+    text = "\n".join(content for kind, content in elements if kind == "text")
+    media = [element for element in elements if element[0] != "text"]
+
+    assert text.startswith("Weekly crypto market report")
+    for boilerplate in ("Section 3", "Related story", "Share on", "Comment 1", "Copyright", "tracking comment"):
+        assert boilerplate not in text
+    assert media[0] == ("image", "https://example.com/media/chart-3.png")
+    assert media[-1] == ("video", "https://example.com/media/interview.mp4")
+
+
+def test_output_is_bounded():
+    elements = extract_elements(load("news_article.html"), "https://example.com", max_chars=500, max_media=1)
+    assert sum(len(content) for kind, content in elements if kind == "text") == 500
+    assert len([kind for kind, _ in elements if kind != "text"]) <= 1
+
+
+def test_deep_dom_does_not_recurse():
+    elements = extract_elements(load("deep_nesting.html"), "https://example.com")
+    assert len(elements) == 5
+
+
+def test_junk_filter():
+    assert looks_like_junk(".cls-1{fill:#fff}")
+    assert looks_like_junk("{};{};{};{}")
+    assert looks_like_junk(":root{--main-color:#000}")
+    assert not looks_like_junk("Bitcoin rallied after the report was published.")
+    assert extract_elements("   ", "https://example.com") == []
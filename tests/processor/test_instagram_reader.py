@@ -0,0 +1,149 @@
+# test_instagram_reader.py
+import asyncio
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor import instagram_utils
+from processor.instagram_sessions import InstagramSessionPool
+from processor.instagram_utils import InstagramReader
+from processor.poll_scheduler import AdaptivePollScheduler
+
+
+class LoginRequired(Exception):
+    pass
+
+
+class FakeClient:
+    rejected = set()  # usernames whose next call fails with LoginRequired
+
+    def __init__(self):
+        self.username = None
+        self.saves = 0
+
+    def load_settings(self, path):
+        pass
+
+    def dump_settings(self, path):
+        self.saves += 1
+
+    def login(self, username, password):
+        self.username = username
+
+    def login_anonymous(self):
+        self.username = "anonymous"
+
+    def _check(self):
+        if self.username in FakeClient.rejected:
+            FakeClient.rejected.discard(self.username)
+            raise LoginRequired("login_required")
+
+    def user_id_from_username(self, username):
+        return f"id-{username}"
+
+    def user_medias(self, user_id, amount):
+        self._check()
+        return []
+
+    def user_stories(self, user_id):
+        return []
+
+    def photo_upload(self, path, caption):
+        self._check()
+        return "posted"
+
+
+class FakeWatermarks:
+    def __init__(self):
+        self.saved = []
+
+    async def save(self, username, posts, stories, rate=None):
+        self.saved.append((username, posts, stories, rate))
+
+
+class FakeRepositories:
+    def __init__(self):
+        self.watermarks = FakeWatermarks()
+
+
+def make_reader(tmp_path, monkeypatch):
+    monkeypatch.setattr(instagram_utils, "session_errors", lambda: (LoginRequired,))
+    FakeClient.rejected = set()
+    pool = InstagramSessionPool(session_dir=str(tmp_path), client_factory=FakeClient)
+    return InstagramReader(["source"], [{"username": "dest", "password": "pw"}],
+                           session_pool=pool, repositories=FakeRepositories())
+
+
+def test_rejected_poll_session_is_replaced_on_the_next_poll(tmp_path, monkeypatch):
+    reader = make_reader(tmp_path, monkeypatch)
+
+    async def run():
+        first = await reader.sessions.get_client()
+        FakeClient.rejected.add("anonymous")
+        try:
+            await reader.poll_source("source")
+        except LoginRequired:
+            pass
+        else:
+            raise AssertionError("the rejected session should fail the poll")
+        assert await reader.poll_source("source") == 0
+        return first, await reader.sessions.get_client()
+
+    first, second = asyncio.run(run())
+    assert second is not first
+
+
+def test_rejected_destination_logs_in_again(tmp_path, monkeypatch):
+    reader = make_reader(tmp_path, monkeypatch)
+    media = tmp_path / "photo.jpg"
+    media.write_bytes(b"jpg")
+
+    async def run():
+        await reader.login_all()
+        first = reader.destination_clients[0]
+        reader.post_router.sinks[0].max_attempts = 1
+        FakeClient.rejected.add("dest")
+        await reader._fan_out(reader.post_router, "caption", str(media))
+        return first
+
+    first = asyncio.run(run())
+    assert reader.destination_clients[0] is not first
+    assert reader.post_router.sinks[0].client is reader.destination_clients[0]
+
+
+def test_refreshed_sessions_are_saved_on_an_interval(tmp_path, monkeypatch):
+    reader = make_reader(tmp_path, monkeypatch)
+    monkeypatch.setattr(instagram_utils, "SESSION_SAVE_INTERVAL", 0)
+
+    async def run():
+        client = await reader.sessions.get_client()
+        saves = client.saves
+        await reader.poll_source("source")
+        return client.saves - saves
+
+    assert asyncio.run(run()) == 1
+
+
+def test_quiet_source_saves_its_decayed_rate_after_every_poll(tmp_path, monkeypatch):
+    reader = make_reader(tmp_path, monkeypatch)
+    reader.scheduler = AdaptivePollScheduler(min_interval=60, max_interval=3600, rng=lambda: 0.5)
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+        if len(sleeps) > 3:
+            raise asyncio.CancelledError()
+
+    monkeypatch.setattr(instagram_utils.asyncio, "sleep", sleep)
+    try:
+        asyncio.run(reader._poll_forever("source"))
+    except asyncio.CancelledError:
+        pass
+
+    saved = reader.repositories.watermarks.saved
+    rates = [rate for _, _, _, rate in saved]
+    assert len(saved) == 3
+    assert rates == sorted(rates, reverse=True) and rates[-1] < rates[0]
+    assert rates[-1] == reader.scheduler.rate("source")
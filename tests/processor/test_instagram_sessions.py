@@ -0,0 +1,73 @@
+# test_instagram_sessions.py
+import asyncio
+import json
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor.instagram_sessions import InstagramSessionPool
+
+
+class FakeClient:
+    instances = []
+
+    def __init__(self):
+        self.settings = {}
+        self.logins = 0
+        self.lookups = 0
+        FakeClient.instances.append(self)
+
+    def load_settings(self, path):
+        with open(path) as f:
+            self.settings = json.load(f)
+
+    def dump_settings(self, path):
+        with open(path, "w") as f:
+            json.dump(self.settings, f)
+
+    def login(self, username, password):
+        self.logins += 1
+        self.settings.setdefault("session", f"cookie-{username}")
+
+    def login_anonymous(self):
+        self.logins += 1
+
+    def user_id_from_username(self, username):
+        self.lookups += 1
+        return f"id-{username}"
+
+
+def test_one_login_per_account_and_resumed_session(tmp_path):
+    FakeClient.instances = []
+    pool = InstagramSessionPool(session_dir=str(tmp_path), client_factory=FakeClient)
+
+    async def run():
+        clients = await asyncio.gather(*(pool.get_client("dest", "pw") for _ in range(5)))
+        return clients, await pool.get_client()
+
+    clients, anonymous = asyncio.run(run())
+    assert len({id(c) for c in clients}) == 1
+    assert anonymous is not clients[0]
+    assert len(FakeClient.instances) == 2
+
+    # A new pool (process restart) loads the stored session settings
+    restarted = InstagramSessionPool(session_dir=str(tmp_path), client_factory=FakeClient)
+    client = asyncio.run(restarted.get_client("dest", "pw"))
+    assert client.settings == {"session": "cookie-dest"}
+
+
+def test_user_ids_are_resolved_once_and_persisted(tmp_path):
+    pool = InstagramSessionPool(session_dir=str(tmp_path), client_factory=FakeClient)
+    client = FakeClient()
+
+    async def run(p):
+        return [await p.user_id(client, "source") for _ in range(3)]
+
+    assert asyncio.run(run(pool)) == ["id-source"] * 3
+    assert client.lookups == 1
+
+    restarted = InstagramSessionPool(session_dir=str(tmp_path), client_factory=FakeClient)
+    assert asyncio.run(run(restarted)) == ["id-source"] * 3
+    assert client.lookups == 1
@@ -0,0 +1,82 @@
+# test_live_repost_reload.py
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+pytest.importorskip("telethon")
+pytest.importorskip("requests")
+
+from processor.media_store import MediaStore
+from processor.workflows import live_repost_workflow
+from processor.workflows.live_repost_workflow import LiveRepostWorkflow
+
+
+class FakeClient:
+    def __init__(self):
+        self.handlers = []
+        self.reconnects = 0
+
+    def add_event_handler(self, callback, event):
+        self.handlers.append((callback.__name__, tuple(event.chats)))
+
+    def remove_event_handler(self, callback):
+        self.handlers = [handler for handler in self.handlers if handler[0] != callback.__name__]
+
+    async def start(self):
+        self.reconnects += 1
+
+    async def disconnect(self):
+        self.reconnects += 1
+
+    def is_connected(self):
+        return True
+
+
+def config(*sources, **extra):
+    return dict({
+        "_id": "wf1",
+        "sources": [{"type": "telegram", "name": name} for name in sources],
+        "destinations": [{"type": "telegram", "name": "@target"}],
+    }, **extra)
+
+
+@pytest.fixture
+def workflow(tmp_path, monkeypatch):
+    monkeypatch.setenv("TELEGRAM_API_ID", "1")
+    monkeypatch.setenv("TELEGRAM_API_HASH", "hash")
+    monkeypatch.setenv("TELEGRAM_SESSION_STRING", "session")
+    monkeypatch.setattr(live_repost_workflow, "get_media_store", lambda: MediaStore(str(tmp_path)))
+    monkeypatch.setattr(live_repost_workflow, "StringSession", lambda session: None)
+    monkeypatch.setattr(live_repost_workflow, "TelegramClient", lambda *args, **kwargs: FakeClient())
+
+    instance = LiveRepostWorkflow(config("@a"))
+    instance.running = True
+    instance._register_handlers(instance.settings.source_channels)
+    return instance
+
+
+def test_reload_swaps_handlers_and_settings_without_reconnecting(workflow):
+    client = workflow.client
+
+    workflow.apply_config(config("@b", "@c", filter_prompt="crypto only?"))
+
+    assert workflow.client is client and client.reconnects == 0
+    assert sorted(client.handlers) == [("on_new_album", ("@b", "@c")), ("on_new_message", ("@b", "@c"))]
+    assert workflow.settings.source_channels == ["@b", "@c"]
+    assert workflow.settings.pipeline.stage_names == ["filter", "download", "post"]
+
+
+def test_bad_config_is_rejected_and_the_old_settings_kept(workflow):
+    settings = workflow.settings
+    handlers = list(workflow.client.handlers)
+
+    with pytest.raises(ValueError):
+        workflow.apply_config({"_id": "wf1", "sources": [{"type": "telegram", "name": "@b"}]})
+
+    assert workflow.settings is settings
+    assert workflow.client.handlers == handlers
+    assert workflow.running
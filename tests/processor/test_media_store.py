@@ -0,0 +1,57 @@
+# test_media_store.py
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor.media_store import MediaStore
+
+
+def download(store, content, name="photo.jpg"):
+    path = store.temp_path(name)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = MediaStore(str(tmp_path))
+    first = store.add(download(store, b"a" * 100, "one.jpg"), key="telegram:1")
+    second = store.add(download(store, b"a" * 100, "two.jpg"), key="telegram:2")
+
+    assert first == second
+    assert os.path.basename(first).endswith(".jpg")
+    assert store.total_bytes() == 100
+    assert os.listdir(store.tmp_dir) == []
+    # Both aliases resolve without downloading again
+    assert store.lookup("telegram:2") == first
+    assert store.lookup("telegram:3") is None
+
+
+def test_gc_evicts_least_recently_used_unreferenced_objects(tmp_path):
+    store = MediaStore(str(tmp_path), max_bytes=250)
+    old = store.add(download(store, b"1" * 100), key="old")
+    held = store.add(download(store, b"2" * 100), key="held")
+    store.release([old])
+    recent = store.add(download(store, b"3" * 100), key="recent")
+    store.release([recent])
+
+    # 300 bytes > 250: the oldest unreferenced object goes, the held one stays
+    assert not os.path.exists(old)
+    assert os.path.exists(held) and os.path.exists(recent)
+    assert store.lookup("old") is None
+    assert store.total_bytes() == 200
+
+    # Releasing counts as a use: ``recent`` is now the least recently used
+    store.release([held])
+    store.add(download(store, b"4" * 100))
+    assert not os.path.exists(recent)
+    assert os.path.exists(held)
+
+
+def test_index_is_shared_between_instances(tmp_path):
+    writer = MediaStore(str(tmp_path))
+    path = writer.add(download(writer, b"shared"), key="url:https://example.com/a.png")
+    reader = MediaStore(str(tmp_path))
+    assert reader.lookup("url:https://example.com/a.png") == path
@@ -0,0 +1,112 @@
+# test_message_logger.py
+import os
+import sys
+from datetime import timezone
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+pytest.importorskip("pymongo")
+
+from processor.message_logger import MessageLogger
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection(self)
+        return self[name]
+
+
+class FakeCollection:
+    def __init__(self, database=None):
+        self.database = database if database is not None else FakeDatabase()
+        self.batches = []
+        self.indexes = []
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+
+    def index_information(self):
+        return {}
+
+    def bulk_write(self, operations, ordered=True):
+        self.batches.append(operations)
+
+
+def test_updates_to_one_message_are_coalesced():
+    collection = FakeCollection()
+    message_logger = MessageLogger(collection, flush_interval=60)
+
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "processing"})
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "posted", "posted_to": ["@a"]})
+    message_logger.log_message("wf1", {"message_key": "1_11", "status": "processing"})
+    message_logger.close()
+
+    assert len(collection.batches) == 1
+    assert len(collection.batches[0]) == 2
+
+
+def test_hourly_rollup_counts_status_transitions():
+    collection = FakeCollection()
+    message_logger = MessageLogger(collection, flush_interval=60)
+
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "processing"})
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "posted",
+                                       "llm_calls": 2, "llm_latency_ms": 300})
+    message_logger.log_message("wf1", {"message_key": "1_11", "status": "processing"})
+    message_logger.log_message("wf1", {"message_key": "1_11", "status": "filtered_out"})
+    message_logger.close()
+
+    stats_batches = collection.database["workflow_stats_hourly"].batches
+    assert len(stats_batches) == 1
+    increments = stats_batches[0][0]._doc["$inc"]
+    assert increments == {"received": 2, "posted": 1, "filtered_out": 1,
+                          "llm_calls": 2, "llm_latency_ms": 300}
+
+
+def test_same_message_key_is_kept_per_workflow():
+    collection = FakeCollection()
+    message_logger = MessageLogger(collection, flush_interval=60)
+
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "processing"})
+    message_logger.log_message("wf2", {"message_key": "1_10", "status": "processing"})
+    message_logger.close()
+
+    queries = [op._filter for op in collection.batches[0]]
+    assert {q["workflow_id"] for q in queries} == {"wf1", "wf2"}
+    assert all(q["message_key"] == "1_10" for q in queries)
+
+
+def test_transitions_are_versioned_and_replays_ignored():
+    collection = FakeCollection()
+    message_logger = MessageLogger(collection, flush_interval=60)
+
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "processing"})
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "posted"})
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "posted"})
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "processing"})
+    message_logger.close()
+
+    (operation,) = collection.batches[0]
+    assert operation._filter["version"] == {"$not": {"$gte": 2}}
+    assert operation._doc["$set"]["status"] == "posted"
+    history = operation._doc["$push"]["history"]["$each"]
+    assert [(h["status"], h["version"]) for h in history] == [("processing", 1), ("posted", 2)]
+
+    increments = collection.database["workflow_stats_hourly"].batches[0][0]._doc["$inc"]
+    assert increments == {"received": 1, "posted": 1}
+
+
+def test_timestamps_and_rollup_hours_are_utc():
+    collection = FakeCollection()
+    message_logger = MessageLogger(collection, flush_interval=60)
+
+    message_logger.log_message("wf1", {"message_key": "1_10", "status": "processing"})
+    message_logger.close()
+
+    [operation] = collection.batches[0]
+    assert operation._doc["$set"]["timestamp"].tzinfo is timezone.utc
+    [rollup] = collection.database["workflow_stats_hourly"].batches[0]
+    assert rollup._filter["hour"].utcoffset().total_seconds() == 0
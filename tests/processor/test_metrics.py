@@ -0,0 +1,90 @@
+# test_metrics.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from prometheus_client import REGISTRY
+
+from processor import metrics
+from processor.pipeline import Pipeline, Stage
+from processor.pipeline_context import PipelineContext
+from processor.sinks import Sink, SinkRouter
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class RecordingSink(Sink):
+    name = "test:@channel"
+    platform = "test"
+
+    async def publish(self, text, prepared):
+        return "ok"
+
+
+def test_pipeline_records_stage_latency_outcomes_and_failures():
+    async def passes(context):
+        return True
+
+    async def broken(context):
+        raise ConnectionError("down")
+
+    labels = {"workflow": "wf-metrics", "stage": "filter", "provider": "openai", "destination": ""}
+    before = sample("sma_stage_duration_seconds_count", **labels)
+
+    pipeline = Pipeline([Stage("filter", passes, provider="openai"), Stage("post", broken)],
+                        name="live_repost", workflow="wf-metrics")
+    asyncio.run(pipeline.process(PipelineContext("1", "hello")))
+
+    assert sample("sma_stage_duration_seconds_count", **labels) == before + 1
+    assert sample("sma_messages_total", workflow="wf-metrics", status="error") >= 1
+    assert sample("sma_stage_failures_total", workflow="wf-metrics", stage="post") >= 1
+    assert sample("sma_pipeline_in_flight", workflow="wf-metrics") == 0
+    assert metrics.current_workflow.get() == ""
+
+
+def test_sinks_are_timed_per_destination_with_the_pipeline_workflow():
+    router = SinkRouter([RecordingSink()])
+
+    async def post(context):
+        await router.publish(context.text)
+
+    labels = {"workflow": "wf-sinks", "stage": "post", "provider": "test", "destination": "test:@channel"}
+    before = sample("sma_stage_duration_seconds_count", **labels)
+
+    asyncio.run(Pipeline([Stage("post", post)], workflow="wf-sinks").process(PipelineContext("1", "hello")))
+
+    assert sample("sma_stage_duration_seconds_count", **labels) == before + 1
+
+
+def test_tokens_and_queue_depth():
+    class Usage:
+        prompt_tokens = 12
+        completion_tokens = 3
+
+    metrics.count_tokens("openai", "gpt-test", Usage(), workflow="wf-tokens")
+    metrics.count_tokens("deepseek", "deepseek-chat", {"prompt_tokens": 5}, workflow="wf-tokens")
+    metrics.count_tokens("openai", "gpt-test", None, workflow="wf-tokens")
+    metrics.set_queue_depth("queue_manager", 4)
+
+    tokens = {"workflow": "wf-tokens", "provider": "openai", "model": "gpt-test"}
+    assert sample("sma_llm_tokens_total", kind="prompt", **tokens) == 12
+    assert sample("sma_llm_tokens_total", kind="completion", **tokens) == 3
+    assert sample("sma_llm_tokens_total", workflow="wf-tokens", provider="deepseek",
+                  model="deepseek-chat", kind="prompt") == 5
+    assert sample("sma_queue_depth", queue="queue_manager") == 4
+
+
+def test_render_exposes_the_text_format():
+    body, content_type = metrics.render()
+
+    assert content_type.startswith("text/plain")
+    assert b"sma_stage_duration_seconds" in body
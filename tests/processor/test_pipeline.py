@@ -0,0 +1,244 @@
+# test_pipeline.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor.pipeline import Pipeline, Stage
+from processor.pipeline_context import PipelineContext
+from processor.pipeline_presets import build_pipeline
+from processor.pipeline_stages import RecentKeys
+
+
+class FakeAI:
+    def __init__(self, passes=True, fail=False):
+        self.passes = passes
+        self.fail = fail
+        self.calls = []
+
+    async def filter_content(self, text, prompt):
+        self.calls.append(("filter", text))
+        if self.fail:
+            raise TimeoutError("provider down")
+        return self.passes
+
+    async def modify_content(self, text, prompt):
+        self.calls.append(("modify", text))
+        return text.upper()
+
+
+class FakeRouter:
+    def __init__(self, error=None):
+        self.error = error
+        self.published = []
+
+    async def publish(self, text, media_paths=None):
+        self.published.append((text, list(media_paths or [])))
+        return {"telegram:@target": self.error or "ok"}
+
+    @staticmethod
+    def succeeded(results):
+        return [name for name, result in results.items() if not isinstance(result, BaseException)]
+
+
+class FakeStore:
+    def __init__(self):
+        self.released = []
+
+    def release(self, paths):
+        self.released.extend(paths)
+
+
+def test_stages_run_in_order_and_record_timings():
+    order = []
+
+    def stage(name):
+        async def run(context):
+            order.append(name)
+        return Stage(name, run)
+
+    context = PipelineContext("1", "hello")
+    status = asyncio.run(Pipeline([stage("a"), None, stage("b")]).process(context))
+
+    assert status == "done"
+    assert order == ["a", "b"]
+    assert list(context.timings) == ["a", "b"]
+
+
+def test_dropping_stops_the_item_and_cleanup_still_runs():
+    cleaned = []
+
+    async def drop(context):
+        return False
+
+    async def never(context):
+        raise AssertionError("not reached")
+
+    async def cleanup(context):
+        cleaned.append(context.key)
+
+    pipeline = Pipeline([Stage("drop", drop), Stage("never", never)], cleanup=[cleanup])
+    status = asyncio.run(pipeline.process(PipelineContext("1", "hello")))
+
+    assert status == "filtered_out"
+    assert cleaned == ["1"]
+    assert pipeline.stats()["drop"]["dropped"] == 1
+    assert "never" in pipeline.stats() and pipeline.stats()["never"]["processed"] == 0
+
+
+def test_failing_stages_are_retried_then_fail_the_item():
+    attempts = []
+
+    async def flaky(context):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("reset")
+
+    async def broken(context):
+        raise ConnectionError("down")
+
+    context = PipelineContext("1", "hello")
+    pipeline = Pipeline([
+        Stage("flaky", flaky, attempts=3, retry_delay=0),
+        Stage("broken", broken, attempts=2, retry_delay=0),
+    ])
+    status = asyncio.run(pipeline.process(context))
+
+    assert len(attempts) == 3
+    assert status == "error"
+    assert context.errors == {"broken": "down"}
+    assert pipeline.stats()["flaky"]["retries"] == 2
+    assert pipeline.stats()["broken"]["failed"] == 1
+
+
+def test_optional_stage_failures_are_skipped():
+    async def broken(context):
+        raise ConnectionError("down")
+
+    context = PipelineContext("1", "hello")
+    status = asyncio.run(Pipeline([Stage("broken", broken, required=False)]).process(context))
+
+    assert status == "done"
+    assert context.errors == {"broken": "down"}
+
+
+def test_stage_concurrency_is_limited():
+    running = []
+    peak = []
+
+    async def slow(context):
+        running.append(context.key)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(context.key)
+
+    pipeline = Pipeline([Stage("slow", slow, concurrency=2)])
+
+    async def run():
+        await asyncio.gather(*(pipeline.process(PipelineContext(str(i), "")) for i in range(6)))
+
+    asyncio.run(run())
+
+    assert max(peak) == 2
+    assert pipeline.stats()["slow"]["processed"] == 6
+
+
+def test_run_consumes_a_queue():
+    seen = []
+
+    async def record(context):
+        seen.append(context.key)
+
+    pipeline = Pipeline([Stage("record", record)])
+
+    async def run():
+        queue = asyncio.Queue()
+        for key in ("a", "b", "c"):
+            queue.put_nowait(PipelineContext(key, ""))
+        worker = asyncio.ensure_future(pipeline.run(queue, workers=2))
+        await queue.join()
+        worker.cancel()
+
+    asyncio.run(run())
+
+    assert sorted(seen) == ["a", "b", "c"]
+
+
+def test_preset_leaves_out_unconfigured_stages():
+    router = FakeRouter()
+    pipeline = build_pipeline("live_repost", {}, {"ai": FakeAI(), "router": router})
+
+    assert pipeline.stage_names == ["post"]
+
+
+def test_live_repost_preset_filters_rewrites_posts_and_dedups():
+    ai = FakeAI()
+    router = FakeRouter()
+    store = FakeStore()
+    config = {"filter_prompt": "ok?", "mod_prompt": "shout", "duplicate_check": True,
+              "pipeline": {"concurrency": {"filter": 1}}}
+    pipeline = build_pipeline("live_repost", config, {
+        "ai": ai, "router": router, "media_store": store, "recent": RecentKeys(),
+    })
+
+    async def run():
+        first = PipelineContext("1_1", "hello", ["/tmp/a.jpg"])
+        second = PipelineContext("1_1", "hello")
+        return first, await pipeline.process(first), second, await pipeline.process(second)
+
+    first, first_status, second, second_status = asyncio.run(run())
+
+    assert pipeline.stage_names == ["dedup", "filter", "modify", "post"]
+    assert pipeline.stages[1].concurrency == 1
+    assert first_status == "posted"
+    assert router.published == [("HELLO", ["/tmp/a.jpg"])]
+    assert first.log["posted_to"] == ["telegram:@target"]
+    assert first.log["llm_calls"] == 2
+    assert store.released == ["/tmp/a.jpg"]
+    assert second_status == "filtered_out"
+    assert second.log["filter_reason"] == "duplicate"
+
+
+def test_filter_errors_let_content_through_and_post_failures_are_errors():
+    router = FakeRouter(error=ConnectionError("flood wait"))
+    pipeline = build_pipeline("processor", {"filter_prompt": "ok?"}, {"ai": FakeAI(fail=True), "router": router})
+
+    context = PipelineContext("1", "hello")
+    status = asyncio.run(pipeline.process(context))
+
+    assert status == "error"
+    assert context.errors["filter"] == "provider down"
+    assert "flood wait" in context.log["error"]
+
+
+def test_prefilter_and_custom_stages():
+    ai = FakeAI()
+    queued = []
+
+    def queue_stage(config, services):
+        async def enqueue(context):
+            queued.append(context.output_text)
+        return Stage("queue", enqueue)
+
+    config = {"filter_prompt": "ok?", "prefilter": {"min_length": 5, "blocked_words": ["casino"]}}
+    pipeline = build_pipeline("processor", config, {"ai": ai, "router": FakeRouter()},
+                              factories={"post": queue_stage})
+
+    async def run():
+        return [await pipeline.process(PipelineContext(str(i), text))
+                for i, text in enumerate(["hi", "best casino bonus", "market update"])]
+
+    statuses = asyncio.run(run())
+
+    assert statuses == ["filtered_out", "filtered_out", "done"]
+    assert queued == ["market update"]
+    assert ai.calls == [("filter", "market update")]
+
+
+def test_unknown_stage_is_rejected():
+    with pytest.raises(ValueError):
+        build_pipeline("processor", {"pipeline": {"stages": ["teleport"]}}, {"router": FakeRouter()})
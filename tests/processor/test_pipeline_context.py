@@ -0,0 +1,81 @@
+# test_pipeline_context.py
+import asyncio
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor.pipeline_context import FULL_INPUT_FILE, ORIGINAL_MESSAGE_FILE, PipelineContext
+
+
+class FakeHistory:
+    def __init__(self, fail=False):
+        self.records = []
+        self.fail = fail
+
+    async def save(self, record):
+        if self.fail:
+            raise ConnectionError("no database")
+        self.records.append(record)
+
+
+def test_aggregated_content_holds_every_analysis():
+    context = PipelineContext("1", "Bitcoin at https://example.com/a")
+    context.add_media_analysis("/tmp/album/1_0.jpg", "A price chart")
+    context.add_link_analysis("https://example.com/a", "An article about ETFs")
+
+    content = context.aggregated_content()
+
+    assert content.startswith("----- Original Message -----\nBitcoin at https://example.com/a")
+    assert "----- Analysis for media file: 1_0.jpg -----\nA price chart" in content
+    assert "----- Analysis for link: https://example.com/a -----\nAn article about ETFs" in content
+    assert content.index("A price chart") < content.index("An article about ETFs")
+
+
+def test_aggregated_content_without_analyses():
+    content = PipelineContext("1", "Hello").aggregated_content()
+
+    assert "No media files attached." in content
+    assert "No URLs found in the original message." in content
+
+
+def test_artifacts_are_written_on_flush(tmp_path):
+    async def run():
+        context = PipelineContext("1", "Hello", dir_name=str(tmp_path / "1"))
+        context.persist(ORIGINAL_MESSAGE_FILE, context.text)
+        context.persist(FULL_INPUT_FILE, context.aggregated_content())
+        await context.flush()
+        return context
+
+    context = asyncio.run(run())
+
+    assert (tmp_path / "1" / ORIGINAL_MESSAGE_FILE).read_text(encoding="utf-8") == "Hello"
+    assert (tmp_path / "1" / FULL_INPUT_FILE).read_text(encoding="utf-8") == context.aggregated_content()
+
+
+def test_save_records_to_history(tmp_path):
+    media = tmp_path / "1_0.jpg"
+    media.write_bytes(b"x" * 10)
+    history = FakeHistory()
+
+    async def run():
+        context = PipelineContext("42", "Hello", [str(media)], history=history)
+        context.tweet_text = "Hello world"
+        context.posted_to = ["twitter"]
+        await context.save()
+
+    asyncio.run(run())
+
+    [record] = history.records
+    assert record["_id"] == "42"
+    assert record["media"] == [{"file_extension": ".jpg", "file_size": 10}]
+    assert record["tweet_text"] == "Hello world"
+    assert record["posted_to"] == ["twitter"]
+
+
+def test_history_failures_do_not_raise():
+    async def run():
+        await PipelineContext("1", "Hello", history=FakeHistory(fail=True)).save()
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+# test_poll_scheduler.py
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor.poll_scheduler import AdaptivePollScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(clock, rng=lambda: 0.5):
+    # rng 0.5 means no jitter
+    return AdaptivePollScheduler(min_interval=60, max_interval=3600, clock=clock, rng=rng)
+
+
+def poll(scheduler, clock, key, new_items):
+    delay = scheduler.record(key, new_items)
+    clock.now += delay
+    return delay
+
+
+def test_quiet_source_slows_down_gradually_and_busy_source_stays_fast():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    scheduler.add("quiet")
+    scheduler.add("busy")
+
+    quiet = [poll(scheduler, clock, "quiet", 0) for _ in range(30)]
+    assert quiet[0] == 60
+    assert all(a <= b for a, b in zip(quiet, quiet[1:]))
+    assert quiet[2] < 3600
+    assert quiet[-1] == 3600
+
+    busy = [poll(scheduler, clock, "busy", 3) for _ in range(10)]
+    assert set(busy) == {60}
+
+
+def test_rate_follows_posting_frequency():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    scheduler.add("hourly")
+    # Settle on one post per hour: the interval converges to half an hour
+    delay = poll(scheduler, clock, "hourly", 0)
+    for _ in range(60):
+        delay = scheduler.record("hourly", delay / 3600)
+        clock.now += delay
+    assert 1700 < delay < 1900
+
+
+def test_jitter_bounds_and_initial_spread():
+    clock = FakeClock()
+    low = make_scheduler(clock, rng=lambda: 0.0)
+    high = make_scheduler(clock, rng=lambda: 0.999999)
+    assert low.add("a") == 0
+    assert low.record("a", 0) == 60 * 0.8
+    assert round(high.record("a", 0), 3) == 60 * 1.2
+
+
+def test_failures_back_off_and_resumed_rate_is_used():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    scheduler.add("flaky")
+    assert [scheduler.record_failure("flaky") for _ in range(3)] == [120, 240, 480]
+    assert scheduler.record("flaky", 0) == 60
+
+    resumed = make_scheduler(clock)
+    resumed.add("slow", rate=0.5 / 1200)
+    assert resumed.record("slow", 0) == 1200
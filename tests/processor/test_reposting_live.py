@@ -1,2 +1,46 @@
 # test_reposting_live.py
-# Placeholder for test_reposting_live.py
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+pytest.importorskip("telethon")
+pytest.importorskip("requests")
+
+from processor.media_store import MediaStore
+from processor.workflow_registry import WorkflowRegistry
+from processor.workflows import live_repost_workflow
+from processor.workflows.live_repost_workflow import LiveRepostWorkflow
+
+
+class FakeClient:
+    def add_event_handler(self, callback, event):
+        pass
+
+
+def test_preset_runs_the_live_repost_pipeline(tmp_path, monkeypatch):
+    monkeypatch.setenv("TELEGRAM_API_ID", "1")
+    monkeypatch.setenv("TELEGRAM_API_HASH", "hash")
+    monkeypatch.setenv("TELEGRAM_SESSION_STRING", "session")
+    monkeypatch.setattr(live_repost_workflow, "get_media_store", lambda: MediaStore(str(tmp_path)))
+    monkeypatch.setattr(live_repost_workflow, "StringSession", lambda session: None)
+    monkeypatch.setattr(live_repost_workflow, "TelegramClient", lambda *args, **kwargs: FakeClient())
+
+    # As stored by WorkflowManager.create_from_preset
+    workflow = WorkflowRegistry().create_instance({
+        "_id": "wf1",
+        "type": "live",
+        "is_preset": True,
+        "preset_id": "telegram_reposting",
+        "sources": [{"type": "telegram", "name": "@source"}],
+        "destinations": [{"type": "telegram", "name": "@target"}],
+        "filter_prompt": "Acceptable to post?",
+    })
+
+    assert type(workflow).__name__ == "TelegramRepostingWorkflow"
+    assert isinstance(workflow, LiveRepostWorkflow)
+    assert workflow.settings.source_channels == ["@source"]
+    assert workflow.settings.pipeline.stage_names == ["filter", "download", "post"]
@@ -0,0 +1,91 @@
+# test_sinks.py
+import asyncio
+import os
+import sys
+import time
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor.sinks import PreparedMediaCache, Sink, SinkRouter
+
+
+class FakeSink(Sink):
+    media_ttl = 60
+
+    def __init__(self, name, delay=0.0, failures=0, namespace="fake"):
+        super().__init__()
+        self.name = name
+        self.delay = delay
+        self.failures = failures
+        self.media_namespace = namespace
+        self.uploads = []
+        self.published = []
+
+    async def prepare_file(self, path):
+        self.uploads.append(path)
+        await asyncio.sleep(self.delay)
+        return f"handle:{os.path.basename(path)}"
+
+    async def publish(self, text, prepared):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("temporary failure")
+        self.published.append((text, prepared))
+        return "ok"
+
+
+def test_sinks_are_published_to_concurrently():
+    sinks = [FakeSink(f"sink{i}", delay=0.2, namespace=f"ns{i}") for i in range(5)]
+    router = SinkRouter(sinks)
+
+    started = time.perf_counter()
+    results = asyncio.run(router.publish("hello"))
+    elapsed = time.perf_counter() - started
+
+    assert results == {f"sink{i}": "ok" for i in range(5)}
+    assert elapsed < 0.6  # about one sink's latency, not five
+
+
+def test_failing_sink_is_retried_without_blocking_others():
+    flaky = FakeSink("flaky", failures=1)
+    broken = FakeSink("broken", failures=10)
+    healthy = FakeSink("healthy")
+    router = SinkRouter([flaky, broken, healthy], retry_delay=0.01)
+
+    results = asyncio.run(router.publish("hello"))
+
+    assert results["flaky"] == "ok"
+    assert isinstance(results["broken"], ConnectionError)
+    assert SinkRouter.succeeded(results) == ["flaky", "healthy"]
+
+
+def test_prepared_media_is_shared_between_sinks(tmp_path):
+    image = tmp_path / "photo.jpg"
+    image.write_bytes(b"jpeg")
+    first = FakeSink("first", delay=0.05)
+    second = FakeSink("second", delay=0.05)
+    router = SinkRouter([first, second], cache=PreparedMediaCache())
+
+    async def run():
+        await router.publish("one", [str(image)])
+        await router.publish("two", [str(image)])
+
+    asyncio.run(run())
+
+    assert len(first.uploads) + len(second.uploads) == 1
+    assert first.published[1] == ("two", ["handle:photo.jpg"])
+
+
+def test_rate_limit_spaces_publishes():
+    sink = FakeSink("limited")
+    sink.min_interval = 0.1
+    router = SinkRouter([sink])
+
+    async def run():
+        await asyncio.gather(router.publish("a"), router.publish("b"), router.publish("c"))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    assert time.perf_counter() - started >= 0.2
@@ -0,0 +1,123 @@
+# test_supervisor.py
+import asyncio
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor import supervisor
+from processor.supervisor import WorkflowSupervisor
+
+
+class DummyWorkflow:
+    def __init__(self, config):
+        self.config = config
+        self.running = False
+
+    async def start(self):
+        self.running = True
+        while self.running:
+            await asyncio.sleep(0.05)
+
+    async def stop(self):
+        self.running = False
+
+    def apply_config(self, config):
+        if "sources" not in config:
+            raise ValueError("'sources' must be a non-empty list")
+        self.config = config
+
+
+def dummy_factory(config):
+    return DummyWorkflow(config)
+
+
+def wait_for(predicate, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def test_restart_after_crash_and_stop():
+    events = []
+    supervisor = WorkflowSupervisor(
+        factory=dummy_factory,
+        heartbeat_interval=0.2,
+        heartbeat_timeout=5,
+        backoff_base=0.1,
+        on_status_change=lambda wf_id, status, error: events.append(status),
+    )
+    try:
+        supervisor.start("wf1", {"type": "live"})
+        first_pid = supervisor.health("wf1")["wf1"]["pid"]
+        assert wait_for(lambda: supervisor.health("wf1")["wf1"]["last_heartbeat"] > supervisor.health("wf1")["wf1"]["started_at"])
+
+        os.kill(first_pid, signal.SIGKILL)
+        assert wait_for(lambda: supervisor.health("wf1")["wf1"]["pid"] != first_pid
+                        and supervisor.health("wf1")["wf1"]["alive"])
+        assert "crashed" in events and "restarted" in events
+        assert supervisor.health("wf1")["wf1"]["restarts"] == 1
+
+        assert supervisor.stop("wf1")
+        assert not supervisor.is_running("wf1")
+    finally:
+        supervisor.shutdown()
+
+
+def test_rejected_reload_keeps_the_worker_and_its_config():
+    events = []
+    supervisor = WorkflowSupervisor(
+        factory=dummy_factory,
+        heartbeat_interval=0.2,
+        heartbeat_timeout=5,
+        on_status_change=lambda wf_id, status, error: events.append((status, error)),
+    )
+    try:
+        supervisor.start("wf1", {"type": "live", "sources": ["a"]})
+        pid = supervisor.health("wf1")["wf1"]["pid"]
+
+        assert supervisor.reload("wf1", {"type": "live"})
+        assert wait_for(lambda: events)
+        assert events == [("reload_failed", "'sources' must be a non-empty list")]
+        assert supervisor._workers["wf1"].config == {"type": "live", "sources": ["a"]}
+
+        assert supervisor.reload("wf1", {"type": "live", "sources": ["b"]})
+        assert wait_for(lambda: supervisor._workers["wf1"].config["sources"] == ["b"])
+
+        health = supervisor.health("wf1")["wf1"]
+        assert health["alive"] and health["pid"] == pid and health["restarts"] == 0
+    finally:
+        supervisor.shutdown()
+
+
+def test_stop_read_while_the_workflow_finishes_is_not_lost(monkeypatch):
+    finishing = threading.Event()
+
+    class FinishingWorkflow:
+        def __init__(self, config):
+            pass
+
+        async def start(self):
+            while not finishing.is_set():
+                await asyncio.sleep(0.01)
+
+    def read_command(command_queue, timeout=1):
+        # The stop arrives just as the workflow returns
+        finishing.set()
+        time.sleep(0.2)
+        return ("stop", None)
+
+    monkeypatch.setattr(supervisor, "_read_command", read_command)
+    outcome = asyncio.run(supervisor._run_worker(
+        "wf1", {"type": "live"}, FinishingWorkflow, queue.Queue(), queue.Queue(), heartbeat_interval=60
+    ))
+
+    assert outcome == "stopped"
@@ -0,0 +1,112 @@
+# test_tracing.py
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor import tracing
+from processor.pipeline import Pipeline, Stage
+from processor.pipeline_context import PipelineContext
+
+
+class FakeCollection:
+    def __init__(self, name="workflow_messages"):
+        self.name = name
+        self.database = self
+        self.batches = []
+
+    def __getitem__(self, name):
+        return FakeCollection(name)
+
+    def create_index(self, keys, **kwargs):
+        pass
+
+    def index_information(self):
+        return {}
+
+    def bulk_write(self, operations, ordered=True):
+        self.batches.append(operations)
+
+
+@pytest.fixture
+def spans(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure(file_path=str(path), endpoint=None)
+
+    def read():
+        tracing.flush()
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    yield read
+    tracing.configure(file_path=None, endpoint=None)
+
+
+def test_tracing_is_off_without_an_exporter():
+    tracing.configure(file_path=None, endpoint=None)
+
+    with tracing.message_span("1") as trace_id, tracing.span("download") as current:
+        assert trace_id is None and current is None
+    assert tracing.current_trace_id() is None
+
+
+def test_one_trace_per_message_with_stage_and_llm_spans(spans):
+    class Usage:
+        prompt_tokens = 20
+        completion_tokens = 1
+
+    async def llm(context):
+        with tracing.llm_span("filter", "openai", "gpt-test") as span:
+            tracing.record_usage(span, Usage())
+
+    pipeline = Pipeline([Stage("filter", llm, provider="openai")], workflow="wf1")
+
+    async def run():
+        first = PipelineContext("1_10", "hello")
+        # A workflow handler opening the trace first: the pipeline joins it
+        with tracing.message_span("1_11", workflow="wf1") as handler_trace:
+            second = PipelineContext("1_11", "hello")
+            await pipeline.process(second)
+        await pipeline.process(first)
+        return first, second, handler_trace
+
+    first, second, handler_trace = asyncio.run(run())
+    recorded = spans()
+
+    assert second.trace_id == handler_trace
+    assert first.trace_id and first.trace_id != second.trace_id
+    by_trace = {}
+    for span in recorded:
+        by_trace.setdefault(span["context"]["trace_id"][2:], []).append(span["name"])
+    assert sorted(by_trace[first.trace_id]) == ["llm filter", "message", "stage filter"]
+    assert sorted(by_trace[second.trace_id]) == ["llm filter", "message", "stage filter"]
+
+    llm_span = next(span for span in recorded if span["name"] == "llm filter")
+    assert llm_span["attributes"]["gen_ai.request.model"] == "gpt-test"
+    assert llm_span["attributes"]["gen_ai.usage.input_tokens"] == 20
+    root = next(span for span in recorded if span["name"] == "message")
+    assert root["parent_id"] is None
+    assert root["attributes"]["message.status"] == "done"
+
+
+def test_log_records_carry_the_trace_id_and_writes_link_to_it(spans):
+    pytest.importorskip("pymongo")
+    from processor.message_logger import MessageLogger
+
+    collection = FakeCollection()
+    message_logger = MessageLogger(collection, flush_interval=60)
+    with tracing.message_span("1_10", workflow="wf1") as trace_id:
+        message_logger.log_message("wf1", {"message_key": "1_10", "status": "processing"})
+    message_logger.close()
+
+    [operation] = collection.batches[0]
+    assert operation._doc["$set"]["trace_id"] == trace_id
+    [write] = [span for span in spans() if span["name"] == "db workflow_messages"]
+    assert write["attributes"]["db.operation.batch.size"] == 1
+    assert [link["context"]["trace_id"][2:] for link in write["links"]] == [trace_id]
@@ -0,0 +1,84 @@
+# test_tweet_generation.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import main
+from processor.pipeline import Pipeline, Stage
+from processor.pipeline_context import PipelineContext
+
+
+class FakeOpenAI:
+    def __init__(self, content=None, error=None):
+        self.content = content
+        self.error = error
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        if self.error:
+            raise self.error
+
+        class Message:
+            content = self.content
+
+        class Choice:
+            message = Message()
+
+        class Response:
+            choices = [Choice()]
+            usage = None
+
+        return Response()
+
+
+def run_generation(monkeypatch, openai):
+    monkeypatch.setattr(main, "get_openai", lambda: openai)
+    posted = []
+
+    async def post(context):
+        posted.append(context.output_text)
+
+    context = PipelineContext("1", "raw source text")
+    pipeline = Pipeline([Stage("generate", main.generate_stage), Stage("post", post)], name="tweet_generation")
+    status = asyncio.run(pipeline.process(context))
+    return status, context, posted
+
+
+@pytest.mark.parametrize("openai", [
+    FakeOpenAI(error=TimeoutError("provider down")),
+    FakeOpenAI(content="   "),
+    FakeOpenAI(content=None),
+])
+def test_failed_generation_never_posts_the_source_text(monkeypatch, openai):
+    status, context, posted = run_generation(monkeypatch, openai)
+
+    assert status == "error"
+    assert "generate" in context.errors
+    assert posted == []
+
+
+def test_generated_tweet_is_posted(monkeypatch):
+    status, context, posted = run_generation(monkeypatch, FakeOpenAI(content=" gm 🚀 "))
+
+    assert status == "done"
+    assert posted == ["gm 🚀"]
+
+
+def test_history_skips_the_current_message_not_the_newest_one(tmp_path):
+    for name, text, mtime in [("older", "old news", 100), ("current", "this message", 200),
+                              ("concurrent", "other message in progress", 300)]:
+        folder = tmp_path / name
+        folder.mkdir()
+        original = folder / "original_message.txt"
+        original.write_text(text)
+        os.utime(original, (mtime, mtime))
+
+    recent = main.fetch_recent_tweet_history(history_dir=str(tmp_path), exclude="current")
+
+    assert [entry["text"] for entry in recent] == ["other message in progress", "old news"]
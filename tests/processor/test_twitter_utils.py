@@ -0,0 +1,98 @@
+# test_twitter_utils.py
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor import twitter_utils
+from processor.twitter_utils import TwitterPoster
+
+
+class FakeApi:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.simple_uploads = 0
+        self.segments = []
+        self.finalized = []
+
+    def media_upload(self, path):
+        time.sleep(self.delay)
+        with self.lock:
+            self.simple_uploads += 1
+            return SimpleNamespace(media_id=100 + self.simple_uploads)
+
+    def chunked_upload_init(self, total_bytes, media_type, media_category=None):
+        return SimpleNamespace(media_id=999)
+
+    def chunked_upload_append(self, media_id, chunk, segment_index):
+        with self.lock:
+            self.segments.append((segment_index, len(chunk)))
+
+    def chunked_upload_finalize(self, media_id):
+        self.finalized.append(media_id)
+        return SimpleNamespace(media_id=media_id, processing_info=None)
+
+
+def make_poster(api):
+    poster = object.__new__(TwitterPoster)  # skip building real tweepy clients
+    poster.api_v1 = api
+    return poster
+
+
+def test_images_upload_concurrently_and_are_cached(tmp_path):
+    twitter_utils._media_ids.clear()
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"image{i}.jpg"
+        path.write_bytes(f"image {i}".encode())
+        paths.append(str(path))
+    api = FakeApi(delay=0.2)
+    poster = make_poster(api)
+
+    async def upload_all():
+        return await asyncio.gather(*(poster.upload_media(p) for p in paths))
+
+    started = time.perf_counter()
+    media_ids = asyncio.run(upload_all())
+    assert time.perf_counter() - started < 0.6
+    assert len(set(media_ids)) == 4
+
+    # Same content again: served from the media id cache
+    assert asyncio.run(poster.upload_media(paths[0])) == media_ids[0]
+    assert api.simple_uploads == 4
+
+
+def test_video_uses_chunked_upload(tmp_path, monkeypatch):
+    twitter_utils._media_ids.clear()
+    monkeypatch.setattr(twitter_utils, "CHUNK_SIZE", 10)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"x" * 35)
+    api = FakeApi()
+
+    media_id = asyncio.run(make_poster(api).upload_media(str(video)))
+
+    assert media_id == 999
+    assert sorted(api.segments) == [(0, 10), (1, 10), (2, 10), (3, 5)]
+    assert api.finalized == [999]
+    assert api.simple_uploads == 0
+
+
+def test_media_id_cache_drops_expired_entries_and_stays_bounded(tmp_path, monkeypatch):
+    twitter_utils._media_ids.clear()
+    monkeypatch.setattr(twitter_utils, "MEDIA_ID_CACHE_SIZE", 3)
+    twitter_utils._media_ids[("token", "expired")] = (1, time.time() - 1)
+    poster = make_poster(FakeApi())
+
+    for i in range(5):
+        path = tmp_path / f"image{i}.jpg"
+        path.write_bytes(f"image {i}".encode())
+        asyncio.run(poster.upload_media(str(path)))
+
+    assert len(twitter_utils._media_ids) == 3
+    assert ("token", "expired") not in twitter_utils._media_ids
@@ -0,0 +1,88 @@
+# test_vision.py
+import asyncio
+import base64
+import io
+import os
+import sys
+import time
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+Image = pytest.importorskip("PIL.Image")
+
+from processor.vision import ImageAnalyzer
+
+
+class Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeCompletions:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+
+    async def create(self, model, messages):
+        self.calls.append(messages)
+        content = f"analysis {len(self.calls)}"
+        await asyncio.sleep(self.delay)
+        return Obj(choices=[Obj(message=Obj(content=content))])
+
+
+def fake_client(delay=0.05):
+    return Obj(chat=Obj(completions=FakeCompletions(delay)))
+
+
+def save_chart(path, size=(2000, 1500), seed=0, fmt="PNG"):
+    image = Image.new("RGB", size, "white")
+    for x in range(size[0]):
+        height = int((x * (seed + 3)) % size[1])
+        for y in range(height, size[1], 7):
+            image.putpixel((x, y), (x % 255, 100, 200))
+    image.save(path, format=fmt)
+    return str(path)
+
+
+def sent_image(call):
+    url = call[0]["content"][1]["image_url"]["url"]
+    return Image.open(io.BytesIO(base64.b64decode(url.split(",", 1)[1])))
+
+
+def test_images_are_analyzed_concurrently_and_downscaled(tmp_path):
+    client = fake_client()
+    analyzer = ImageAnalyzer(client=client, max_side=512)
+    paths = [save_chart(tmp_path / f"chart{i}.png", size=(800, 600), seed=i * 11) for i in range(4)]
+
+    started = time.perf_counter()
+    results = asyncio.run(analyzer.analyze_many(paths))
+    elapsed = time.perf_counter() - started
+
+    assert sorted(results) == [f"analysis {i}" for i in range(1, 5)]
+    assert len(client.chat.completions.calls) == 4
+    assert elapsed < 4 * 0.05 + 0.5
+    image = sent_image(client.chat.completions.calls[0])
+    assert image.format == "JPEG"
+    assert max(image.size) == 512
+
+
+def test_same_and_near_duplicate_images_are_analyzed_once(tmp_path):
+    client = fake_client()
+    analyzer = ImageAnalyzer(client=client)
+    original = save_chart(tmp_path / "chart.png", size=(1200, 900))
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(open(original, "rb").read())
+    # The same chart re-posted smaller and re-compressed
+    with Image.open(original) as image:
+        image.resize((600, 450)).save(tmp_path / "repost.jpg", quality=70)
+
+    async def run():
+        first = await asyncio.gather(analyzer.analyze(original), analyzer.analyze(str(copy)))
+        return first + [await analyzer.analyze(str(tmp_path / "repost.jpg"))]
+
+    results = asyncio.run(run())
+    assert results == ["analysis 1"] * 3
+    assert len(client.chat.completions.calls) == 1
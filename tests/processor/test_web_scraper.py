@@ -0,0 +1,112 @@
+# test_web_scraper.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+web = pytest.importorskip("aiohttp.web")
+pytest.importorskip("bs4")
+
+from processor.media_store import MediaStore
+from processor.web_scraper import WebScraper
+
+PAGE = """<html><body><p>First paragraph of the article.</p>
+<img src="/img/a.png"><p>Second paragraph of the article.</p><img src="/img/a.png"></body></html>"""
+
+
+async def serve(handlers):
+    app = web.Application()
+    for path, handler in handlers.items():
+        app.router.add_get(path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def test_revalidates_with_etag_and_dedupes_media(tmp_path):
+    hits = {"page": 0, "not_modified": 0, "image": 0}
+
+    async def page(request):
+        hits["page"] += 1
+        if request.headers.get("If-None-Match") == '"v1"':
+            hits["not_modified"] += 1
+            return web.Response(status=304)
+        return web.Response(text=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def image(request):
+        hits["image"] += 1
+        return web.Response(body=b"\x89PNG" + b"0" * 100, content_type="image/png")
+
+    async def run():
+        runner, base = await serve({"/article": page, "/img/a.png": image})
+        scraper = WebScraper(fresh_for=0, download_media=True, media_store=MediaStore(str(tmp_path)))
+        try:
+            first, second = await scraper.scrape_many([f"{base}/article", f"{base}/article"])
+            third = await scraper.scrape(f"{base}/article")
+        finally:
+            await scraper.close()
+            await runner.cleanup()
+        return first, second, third
+
+    (first, first_media), (second, _), (third, _) = asyncio.run(run())
+    assert first == second == third
+    assert "Second paragraph" in first
+    assert first.count(str(tmp_path)) == 2
+    assert len(first_media) == 1 and first_media[0] in first
+    # Concurrent requests share one fetch, the later one is revalidated
+    assert hits == {"page": 2, "not_modified": 1, "image": 1}
+
+
+def test_page_size_is_capped():
+    async def huge(request):
+        return web.Response(text="<p>" + "x" * 100000 + "</p>", content_type="text/html")
+
+    async def run():
+        runner, base = await serve({"/huge": huge})
+        scraper = WebScraper(max_page_bytes=1000)
+        try:
+            return await scraper.fetch(f"{base}/huge")
+        finally:
+            await scraper.close()
+            await runner.cleanup()
+
+    page = asyncio.run(run())
+    assert page.truncated
+    assert len(page.text) == 1000
+
+
+def test_scraped_media_is_kept_until_released(tmp_path):
+    async def page(request):
+        return web.Response(text=PAGE, content_type="text/html")
+
+    async def image(request):
+        return web.Response(body=b"\x89PNG" + b"0" * 100, content_type="image/png")
+
+    # Over budget from the first file: anything unreferenced is deleted at once
+    store = MediaStore(str(tmp_path), max_bytes=1)
+
+    async def run():
+        runner, base = await serve({"/article": page, "/img/a.png": image})
+        scraper = WebScraper(download_media=True, media_store=store)
+        try:
+            (first, first_media), (second, second_media) = await scraper.scrape_many(
+                [f"{base}/article", f"{base}/article?again"]
+            )
+            # Another caller finishing must not delete the file still in use
+            await scraper.release(first_media)
+            assert os.path.exists(second_media[0])
+            await scraper.release(second_media)
+            return second_media[0]
+        finally:
+            await scraper.close()
+            await runner.cleanup()
+
+    path = asyncio.run(run())
+    assert not os.path.exists(path)
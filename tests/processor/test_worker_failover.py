@@ -0,0 +1,104 @@
+# test_worker_failover.py
+# Local multi-process harness: two worker nodes share one MongoDB and the
+# survivor must take over the workflow when its owner is killed.
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+pymongo = pytest.importorskip("pymongo")
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017/")
+DB_NAME = "social_manager_failover_test"
+
+
+class DummyWorkflow:
+    def __init__(self, config):
+        self.running = False
+
+    async def start(self):
+        self.running = True
+        while self.running:
+            await asyncio.sleep(0.05)
+
+    async def stop(self):
+        self.running = False
+
+
+def dummy_factory(config):
+    return DummyWorkflow(config)
+
+
+def run_node(worker_id):
+    from processor.supervisor import WorkflowSupervisor
+    from processor.worker_node import WorkerNode
+
+    node = WorkerNode(
+        mongo_uri=MONGO_URI,
+        db_name=DB_NAME,
+        worker_id=worker_id,
+        capacity=5,
+        lease_seconds=2,
+        renew_interval=0.5,
+        supervisor=WorkflowSupervisor(factory=dummy_factory, heartbeat_interval=0.2),
+    )
+    node.run()
+
+
+def wait_for(predicate, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.2)
+    return None
+
+
+@pytest.fixture
+def workflows():
+    client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except Exception:
+        pytest.skip("MongoDB is not available")
+    client.drop_database(DB_NAME)
+    yield client[DB_NAME]["workflows"]
+    client.drop_database(DB_NAME)
+
+
+def test_failover_to_surviving_worker(workflows):
+    workflow_id = workflows.insert_one({"type": "live", "desired_state": "running"}).inserted_id
+
+    ctx = multiprocessing.get_context("spawn")
+    nodes = {name: ctx.Process(target=run_node, args=(name,)) for name in ("node-a", "node-b")}
+    for process in nodes.values():
+        process.start()
+
+    try:
+        first_owner = wait_for(lambda: workflows.find_one({"_id": workflow_id}).get("owner"))
+        assert first_owner in nodes
+
+        os.kill(nodes[first_owner].pid, signal.SIGKILL)
+        survivor = "node-b" if first_owner == "node-a" else "node-a"
+
+        new_owner = wait_for(
+            lambda: workflows.find_one({"_id": workflow_id}).get("owner") == survivor
+        )
+        assert new_owner, "surviving worker did not take over the workflow"
+
+        workflows.update_one({"_id": workflow_id}, {"$set": {"desired_state": "stopped"}})
+        released = wait_for(lambda: workflows.find_one({"_id": workflow_id}).get("owner") is None)
+        assert released
+    finally:
+        for process in nodes.values():
+            if process.is_alive():
+                process.terminate()
+            process.join(5)
@@ -0,0 +1,81 @@
+# test_worker_node.py
+import os
+import sys
+import threading
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+pytest.importorskip("pymongo")
+
+from bson.objectid import ObjectId
+
+from processor import worker_node
+from processor.worker_node import WorkerNode
+
+
+class FakeCollection:
+    def __init__(self):
+        self.updates = []
+
+    def create_index(self, keys, **kwargs):
+        pass
+
+    def update_one(self, query, update):
+        self.updates.append((query, update))
+
+    def update_many(self, query, update):
+        pass
+
+    def find(self, query):
+        return [{"_id": _id, "owner": "node", "desired_state": "running"} for _id in query["_id"]["$in"]]
+
+    def find_one_and_update(self, *args, **kwargs):
+        return None
+
+
+class FakeClient:
+    def __init__(self, uri):
+        self.collection = FakeCollection()
+
+    def __getitem__(self, name):
+        return {"workflows": self.collection}
+
+
+class FakeSupervisor:
+    on_status_change = None
+
+    def start(self, workflow_id, config):
+        pass
+
+    def stop(self, workflow_id):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+def test_status_events_are_applied_by_the_run_loop(monkeypatch):
+    monkeypatch.setattr(worker_node, "MongoClient", FakeClient)
+    node = WorkerNode(worker_id="node", supervisor=FakeSupervisor())
+    done, crashed = str(ObjectId()), str(ObjectId())
+    node.owned = {done: 0, crashed: 0}
+
+    # Reported from the supervisor's monitor thread
+    reporter = threading.Thread(target=lambda: (
+        node.supervisor.on_status_change(done, "completed", None),
+        node.supervisor.on_status_change(crashed, "crashed", "boom"),
+    ))
+    reporter.start()
+    reporter.join()
+
+    assert set(node.owned) == {done, crashed}
+    assert node.collection.updates == []
+
+    node.tick()
+
+    assert list(node.owned) == [crashed]
+    assert [update["$set"].get("desired_state") for _, update in node.collection.updates] == ["stopped", None]
+    assert node.collection.updates[1][1]["$set"]["last_error"] == "boom"
@@ -0,0 +1,74 @@
+# test_workflow_cache.py
+import os
+import sys
+import time
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+pytest.importorskip("pymongo")
+
+from processor.change_feed import ChangeFeed
+from processor.workflow_cache import WorkflowCache
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.finds = 0
+
+    def find(self, query=None):
+        self.finds += 1
+        return list(self.documents)
+
+
+class ManualFeed(ChangeFeed):
+    """Change feed whose events are published by the test."""
+
+    def _ensure_thread(self):
+        pass
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_reads_are_served_from_memory_and_follow_changes():
+    collection = FakeCollection([{"_id": "a", "status": "stopped", "telegram_id": 1}])
+    feed = ManualFeed(collection, key_field="_id")
+    cache = WorkflowCache(collection, feed=feed)
+    cache.start()
+    try:
+        assert cache.get("a")["status"] == "stopped"
+        assert cache.list(telegram_id=1) == [cache.get("a")]
+        version = cache.version
+
+        feed.publish({"_id": "a", "status": "running", "telegram_id": 1})
+        assert wait_for(lambda: cache.get("a")["status"] == "running")
+        assert cache.version > version
+
+        feed.publish({"_id": "a", "deleted": True})
+        assert wait_for(lambda: "a" not in cache)
+        assert collection.finds == 1
+    finally:
+        cache.close()
+
+
+def test_local_updates_apply_immediately():
+    collection = FakeCollection([{"_id": "a", "status": "stopped"}])
+    cache = WorkflowCache(collection, feed=ManualFeed(collection, key_field="_id"))
+    cache.reload()
+
+    cache.update("a", {"status": "running"})
+    cache.put({"_id": "b", "status": "stopped"})
+    cache.discard("missing")
+
+    assert cache.get("a")["status"] == "running"
+    assert {doc["_id"] for doc in cache.list()} == {"a", "b"}
@@ -0,0 +1,55 @@
+# test_workflow_registry.py
+import json
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from processor.workflow_registry import WorkflowRegistry
+
+PRESET_MODULE = """
+import os
+open(os.path.join(os.path.dirname(__file__), "imported.marker"), "w").close()
+
+class DemoWorkflow:
+    workflow_type = "live"
+"""
+
+
+def write_preset(preset_dir, name="Demo"):
+    (preset_dir / "demo.py").write_text(PRESET_MODULE)
+    (preset_dir / "demo.json").write_text(json.dumps({
+        "id": "demo", "module": "demo", "class": "DemoWorkflow",
+        "workflow_type": "live", "name": name,
+    }))
+
+
+def test_listing_reads_manifests_without_importing(tmp_path):
+    write_preset(tmp_path)
+    registry = WorkflowRegistry(str(tmp_path))
+
+    presets = registry.get_preset_workflows()
+
+    assert presets["demo"]["info"]["name"] == "Demo"
+    assert registry.get_workflow_info("demo")["workflow_type"] == "live"
+    assert not (tmp_path / "imported.marker").exists()
+
+    workflow_class = registry.get_workflow_class("demo")
+    assert workflow_class.__name__ == "DemoWorkflow"
+    assert (tmp_path / "imported.marker").exists()
+
+
+def test_discovery_is_cached_until_a_file_changes(tmp_path):
+    write_preset(tmp_path)
+    first = WorkflowRegistry(str(tmp_path)).discover_workflows()
+    assert WorkflowRegistry(str(tmp_path)).discover_workflows() is first
+
+    manifest = tmp_path / "demo.json"
+    write_preset(tmp_path, name="Renamed")
+    stat = manifest.stat()
+    os.utime(manifest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    refreshed = WorkflowRegistry(str(tmp_path)).discover_workflows()
+    assert refreshed is not first
+    assert refreshed["demo"]["info"]["name"] == "Renamed"
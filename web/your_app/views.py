@@ -7,14 +7,31 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response
 import asyncio
-from processor.workflow_manager import WorkflowManager
+import json
+import queue
+from processor.workflow_manager import get_workflow_manager
+from processor.change_feed import ChangeFeed
+from processor import metrics
 from bson.objectid import ObjectId
 from datetime import datetime
 
 webapp = Blueprint('webapp', __name__)
-workflow_manager = WorkflowManager()
+# The workflow manager and message feed are created on first request, so
+# importing the blueprint does not connect to MongoDB or load presets.
+_message_feed = None
+
+
+def get_message_feed():
+    """One change stream per Flask process, shared by every connected dashboard."""
+    global _message_feed
+    if _message_feed is None:
+        _message_feed = ChangeFeed(get_workflow_manager().db["workflow_messages"])
+    return _message_feed
+
+SSE_KEEPALIVE = 15  # seconds between keep-alive comments on idle streams
+TRACE_UI_URL = os.getenv("TRACE_UI_URL", "")  # trace viewer prefix, e.g. http://localhost:16686/trace/
 
 def validate_workflow_config(config):
     """Validate workflow configuration before creation."""
@@ -42,14 +59,15 @@ def validate_workflow_config(config):
 @webapp.route('/')
 def dashboard():
     """Dashboard with workflow stats and controls."""
-    active_count = sum(1 for wf in workflow_manager.list_workflows() if wf.get("status") == "running")
-    total_count = len(workflow_manager.list_workflows())
-    return render_template('dashboard.html', active_count=active_count, total_count=total_count)
+    active_count = sum(1 for wf in get_workflow_manager().list_workflows() if wf.get("status") == "running")
+    total_count = len(get_workflow_manager().list_workflows())
+    stats = get_workflow_manager().get_workflow_stats()
+    return render_template('dashboard.html', active_count=active_count, total_count=total_count, stats=stats)
 
 @webapp.route('/workflows/')
 def list_workflows():
     """List all workflows."""
-    workflows = workflow_manager.list_workflows()
+    workflows = get_workflow_manager().list_workflows()
     return render_template('workflows.html', workflows=workflows)
 
 @webapp.route('/workflows/new', methods=["GET", "POST"])
@@ -92,11 +110,11 @@ def create_workflow():
                 return render_template("new_workflow.html")
             
             # Create the workflow
-            workflow_id = workflow_manager.create_workflow(workflow_config)
+            workflow_id = get_workflow_manager().create_workflow(workflow_config)
             
             # Start immediately if requested
             if request.form.get("start_immediately") == "on":
-                success = workflow_manager.start_workflow(workflow_id)
+                success = get_workflow_manager().start_workflow(workflow_id)
                 if success:
                     flash("Workflow created and started successfully", "success")
                 else:
@@ -117,7 +135,7 @@ def create_workflow():
 def start_workflow(workflow_id):
     """Start a specific workflow."""
     try:
-        success = workflow_manager.start_workflow(workflow_id)
+        success = get_workflow_manager().start_workflow(workflow_id)
         if success:
             flash("Workflow started successfully", "success")
         else:
@@ -130,7 +148,7 @@ def start_workflow(workflow_id):
 def start_workflow_form():
     """Display form to start a new workflow."""
     try:
-        workflows = workflow_manager.list_workflows()
+        workflows = get_workflow_manager().list_workflows()
         
         # Check if there are any stopped workflows available to start
         has_available = any(wf.get('status') == 'stopped' for wf in workflows)
@@ -146,7 +164,7 @@ def start_workflow_form():
 def stop_workflow(workflow_id):
     """Stop a specific workflow."""
     try:
-        success = workflow_manager.stop_workflow(workflow_id)
+        success = get_workflow_manager().stop_workflow(workflow_id)
         if success:
             flash("Workflow stopped successfully", "success")
         else:
@@ -159,7 +177,7 @@ def stop_workflow(workflow_id):
 def delete_workflow(workflow_id):
     """Delete a specific workflow."""
     try:
-        success = workflow_manager.delete_workflow(workflow_id)
+        success = get_workflow_manager().delete_workflow(workflow_id)
         if success:
             flash("Workflow deleted successfully", "success")
         else:
@@ -171,17 +189,12 @@ def delete_workflow(workflow_id):
 @webapp.route('/workflows/edit/<workflow_id>', methods=["GET", "POST"])
 def edit_workflow(workflow_id):
     """Edit an existing workflow."""
-    workflow = workflow_manager.get_workflow(workflow_id)
+    workflow = get_workflow_manager().get_workflow(workflow_id)
     if not workflow:
         flash("Workflow not found", "error")
         return redirect(url_for('webapp.list_workflows'))
     
     if request.method == "POST":
-        # Only allow updating certain fields when workflow is stopped
-        if workflow.get("status") == "running":
-            flash("Stop the workflow before editing", "error")
-            return redirect(url_for('webapp.list_workflows'))
-            
         # Extract form data and update the workflow
         updates = {
             "filter_prompt": request.form.get("filter_prompt", ""),
@@ -194,9 +207,12 @@ def edit_workflow(workflow_id):
             }
         }
         
-        # Update the workflow
-        workflow_manager.update_workflow(workflow_id, updates)
-        flash("Workflow updated successfully", "success")
+        # Update the workflow; a running workflow picks the change up live
+        get_workflow_manager().update_workflow(workflow_id, updates)
+        if workflow.get("status") == "running":
+            flash("Workflow updated and reloaded without restarting", "success")
+        else:
+            flash("Workflow updated successfully", "success")
         return redirect(url_for('webapp.list_workflows'))
     
     return render_template("edit_workflow.html", workflow=workflow)
@@ -216,16 +232,45 @@ def manage_accounts():
 @webapp.route('/workflows/messages/<workflow_id>')
 def workflow_messages(workflow_id):
     """View messages processed by a specific workflow."""
-    workflow = workflow_manager.get_workflow(workflow_id)
+    workflow = get_workflow_manager().get_workflow(workflow_id)
     if not workflow:
         flash("Workflow not found", "error")
         return redirect(url_for('webapp.list_workflows'))
     
     # Get messages from the database - FIXED CODE HERE
-    db = workflow_manager.db  # Use .db instead of .client[workflow_manager.db_name]
+    db = get_workflow_manager().db  # Use .db instead of .client[workflow_manager.db_name]
     messages = list(db.workflow_messages.find({"workflow_id": workflow_id}).sort("timestamp", -1).limit(100))
+    stats = get_workflow_manager().get_workflow_stats(workflow_id)
     
-    return render_template('workflow_messages.html', workflow=workflow, messages=messages)
+    return render_template('workflow_messages.html', workflow=workflow, messages=messages, stats=stats,
+                           trace_url=TRACE_UI_URL)
+
+@webapp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint for the pipelines of every workflow process."""
+    rendered = metrics.render()
+    if rendered is None:
+        return Response("prometheus_client is not installed\n", status=503, mimetype='text/plain')
+    body, content_type = rendered
+    return Response(body, headers={'Content-Type': content_type})
+
+@webapp.route('/api/workflows/health')
+def api_workflow_health():
+    """API endpoint with heartbeat and restart information for running workflows."""
+    return jsonify(workflows=get_workflow_manager().get_workflow_health())
+
+def _serialize_message(msg):
+    """Make a workflow_messages document JSON serializable."""
+    msg = dict(msg)
+    msg["_id"] = str(msg["_id"])
+    for field in ("timestamp", "updated_at"):
+        if isinstance(msg.get(field), datetime):
+            msg[field] = msg[field].isoformat()
+    msg["history"] = [
+        dict(entry, at=entry["at"].isoformat() if isinstance(entry.get("at"), datetime) else entry.get("at"))
+        for entry in msg.get("history", [])
+    ]
+    return msg
 
 @webapp.route('/api/workflows/messages/<workflow_id>')
 def api_workflow_messages(workflow_id):
@@ -233,21 +278,40 @@ def api_workflow_messages(workflow_id):
     last_id = request.args.get('last_id')
     
     # Fixed code here
-    db = workflow_manager.db  # Use .db instead of .client[workflow_manager.db_name]
+    db = get_workflow_manager().db  # Use .db instead of .client[workflow_manager.db_name]
     query = {"workflow_id": workflow_id}
     if last_id:
         query["_id"] = {"$gt": ObjectId(last_id)}
     
-    messages = list(db.workflow_messages.find(query).sort("timestamp", -1).limit(20))
+    # Sort on the cursor field so no message between polls is skipped
+    messages = list(db.workflow_messages.find(query).sort("_id", -1).limit(20))
     
-    # Convert to serializable format
-    result = []
-    for msg in messages:
-        msg["_id"] = str(msg["_id"])
-        msg["timestamp"] = msg["timestamp"].isoformat() if isinstance(msg["timestamp"], datetime) else msg["timestamp"]
-        result.append(msg)
-    
-    return jsonify(messages=result)
+    return jsonify(messages=[_serialize_message(msg) for msg in messages])
+
+@webapp.route('/api/workflows/messages/<workflow_id>/stream')
+def api_workflow_messages_stream(workflow_id):
+    """Server-Sent Events stream of new and updated messages for a workflow."""
+    message_feed = get_message_feed()
+    subscriber = message_feed.subscribe(workflow_id)
+
+    def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    msg = subscriber.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(_serialize_message(msg), default=str)}\n\n"
+        finally:
+            # Runs when the client disconnects and the generator is closed
+            message_feed.unsubscribe(subscriber, workflow_id)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
 
 # Add at the end of views.py for testing purposes only
 if __name__ == "__main__":